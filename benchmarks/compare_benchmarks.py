@@ -0,0 +1,102 @@
+"""Compares two benchmark result files and flags regressions.
+
+Example:
+    python benchmarks/compare_benchmarks.py baseline.jsonl candidate.jsonl
+"""
+import argparse
+import json
+import sys
+
+
+CONFIGURATION_KEYS = ['model', 'engine', 'precision', 'n_items', 'n_people', 
+                      'n_categories', 'n_factors', 'n_tune', 'n_samples', 
+                      'n_processors']
+
+# Metric name and whether larger values are better
+METRICS = [('build_model_time', False), ('compile_time', False),
+           ('tune_time', False), ('sample_time', False), ('fit_time', False),
+           ('sampling_time', False), ('ess_per_second', True),
+           ('peak_rss_mb', False), ('difficulty_rmse', False),
+           ('discrimination_rmse', False)]
+
+
+def load_records(file_path):
+    """Latest record of every configuration in a json lines file."""
+    records = dict()
+    with open(file_path) as file_handle:
+        for line in file_handle:
+            if not line.strip():
+                continue
+
+            record = json.loads(line)
+            if 'error' in record:
+                continue
+
+            # Records from before the precision axis ran in float64
+            record.setdefault('precision', 'float64')
+            key = tuple(record.get(name) for name in CONFIGURATION_KEYS)
+            records[key] = record
+
+    return records
+
+
+def compare_records(baseline, candidate, tolerance=0.2):
+    """Relative changes of the metrics shared by both files.
+
+    Args:
+        baseline: dictionary of configuration keys and records
+        candidate: dictionary of configuration keys and records
+        tolerance: (float) relative change flagged as a regression
+
+    Returns:
+        rows: list of (configuration, metric, baseline, candidate,
+              relative change, regression) tuples
+    """
+    rows = list()
+    for key in sorted(set(baseline) & set(candidate), key=str):
+        configuration = dict(zip(CONFIGURATION_KEYS, key))
+
+        for metric, larger_is_better in METRICS:
+            old_value = baseline[key].get(metric)
+            new_value = candidate[key].get(metric)
+
+            if not old_value or new_value is None:
+                continue
+
+            change = (new_value - old_value) / abs(old_value)
+            if larger_is_better:
+                change *= -1
+
+            rows.append((configuration, metric, old_value, new_value,
+                         change, change > tolerance))
+
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative change counted as a regression')
+    args = parser.parse_args(argv)
+
+    rows = compare_records(load_records(args.baseline),
+                           load_records(args.candidate), args.tolerance)
+
+    n_regressions = 0
+    for configuration, metric, old_value, new_value, change, regression in rows:
+        n_regressions += regression
+        label = 'REGRESSION' if regression else 'ok'
+        print(f"{label:>10} {configuration['model']:>7} {configuration['engine']:>5} "
+              f"{configuration['n_items']:>5}x{configuration['n_people']:<7} "
+              f"{metric:>20}: {old_value:10.4g} -> {new_value:10.4g} "
+              f"({change:+.1%} worse)")
+
+    print(f"{n_regressions} regressions in {len(rows)} comparisons")
+
+    return 1 if n_regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
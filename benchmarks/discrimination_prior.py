@@ -0,0 +1,133 @@
+"""Compares the bounded and shifted Rayleigh discrimination priors.
+
+Fits the same 2PL datasets with the discrimination prior written as
+pm.Bound(Rayleigh, lower=0.25), the previous definition, and as
+ShiftedRayleigh with the log offset transform. Every fit records the
+smallest bulk ESS of the item parameters per second of sampling, the
+number of divergences and the mean step size as json lines.
+
+Example:
+    python benchmarks/discrimination_prior.py --items 10 40 --people 500 \\
+        --output prior.jsonl
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+
+import numpy as np
+
+from run_benchmarks import (synthetic_parameters, synthetic_dataset,
+                            effective_sample_size, recovery_error)
+
+
+PRIORS = ['bound', 'shifted']
+
+
+def twopl_with_prior(dataset, prior):
+    """2PL model of the package with the chosen discrimination prior."""
+    import pymc3 as pm
+    from girth_mcmc.distributions import (Rayleigh, ShiftedRayleigh,
+                                          LogitBernoulli)
+
+    n_items, n_people = dataset.shape
+
+    with pm.Model() as model:
+        sigma_difficulty = pm.HalfNormal('Difficulty_SD', sigma=1, shape=1)
+        difficulty = pm.Normal("Difficulty", mu=0,
+                               sigma=sigma_difficulty, shape=n_items)
+
+        rayleigh_scale = pm.Lognormal("Rayleigh_Scale", mu=0, sigma=1/4, shape=1)
+        if prior == 'bound':
+            discrimination = pm.Bound(Rayleigh, lower=0.25)(
+                name='Discrimination', beta=rayleigh_scale, offset=0.25,
+                shape=n_items)
+
+        else:
+            discrimination = ShiftedRayleigh('Discrimination', beta=rayleigh_scale,
+                                             offset=0.25, shape=n_items)
+
+        ability = pm.Normal("Ability", mu=0, sigma=1, shape=n_people)
+        kernel = discrimination[:, None] * (ability[None, :] - difficulty[:, None])
+        LogitBernoulli("Log_Likelihood", logit_p=kernel, observed=dataset)
+
+    return model
+
+
+def run_configuration(configuration):
+    """Fits one dataset with one prior.
+
+    Args:
+        configuration: dictionary with prior, n_items, n_people, n_tune,
+                       n_samples, n_chains and seed
+
+    Returns:
+        record: dictionary of the sampling time, ESS per second,
+                divergences, step size and recovery errors
+    """
+    import pymc3 as pm
+
+    parameters = synthetic_parameters('2pl', configuration['n_items'],
+                                      configuration['n_people'], 2, 1,
+                                      configuration['seed'])
+    dataset = synthetic_dataset('2pl', parameters, configuration['seed'])
+    model = twopl_with_prior(dataset, configuration['prior'])
+
+    n_chains = configuration['n_chains']
+    with model:
+        start_time = time.perf_counter()
+        trace = pm.sample(configuration['n_samples'] // n_chains,
+                          tune=configuration['n_tune'], chains=n_chains,
+                          cores=n_chains, random_seed=configuration['seed'],
+                          progressbar=False, compute_convergence_checks=False,
+                          return_inferencedata=False)
+        sampling_time = time.perf_counter() - start_time
+
+    results = {'Difficulty': trace['Difficulty'].mean(axis=0),
+               'Discrimination': trace['Discrimination'].mean(axis=0),
+               'Ability': trace['Ability'].mean(axis=0)}
+
+    record = dict(configuration)
+    record['sampling_time'] = sampling_time
+    record['ess_min'] = effective_sample_size(trace)
+    record['ess_per_second'] = record['ess_min'] / sampling_time
+    record['divergences'] = int(trace.get_sampler_stats('diverging').sum())
+    record['step_size'] = float(trace.get_sampler_stats('step_size').mean())
+    record.update(recovery_error('2pl', parameters, results))
+
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--priors', nargs='+', default=PRIORS, choices=PRIORS)
+    parser.add_argument('--items', nargs='+', type=int, default=[10, 40])
+    parser.add_argument('--people', nargs='+', type=int, default=[500])
+    parser.add_argument('--n-tune', type=int, default=1000)
+    parser.add_argument('--n-samples', type=int, default=2000)
+    parser.add_argument('--n-chains', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=20210611)
+    parser.add_argument('--output', default=None,
+                        help='json lines file, results are appended')
+    args = parser.parse_args(argv)
+
+    output = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        for n_items, n_people, prior in itertools.product(args.items, args.people,
+                                                          args.priors):
+            configuration = {'prior': prior, 'n_items': n_items,
+                             'n_people': n_people, 'n_tune': args.n_tune,
+                             'n_samples': args.n_samples,
+                             'n_chains': args.n_chains, 'seed': args.seed}
+
+            output.write(json.dumps(run_configuration(configuration)) + '\n')
+            output.flush()
+
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
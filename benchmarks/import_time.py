@@ -0,0 +1,70 @@
+"""Measures the import time of the lightweight girth_mcmc modules.
+
+Every measurement imports the package in a fresh interpreter, the median
+is compared against the budget and the run fails when the budget is
+exceeded or when PyMC3 / Theano are loaded by the import.
+
+Example:
+    python benchmarks/import_time.py --budget 1.0 --repeats 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+# Modules needed to validate options, read results and score abilities
+LIGHT_MODULES = ['girth_mcmc', 'girth_mcmc.utils', 'girth_mcmc.scoring']
+
+# Backends that must only load on the first model build
+HEAVY_MODULES = ['pymc3', 'theano', 'arviz', 'scipy.stats']
+
+_MEASUREMENT = """
+import json, sys, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'import_time': elapsed,
+                  'heavy_modules': [name for name in {heavy} if name in sys.modules]}}))
+"""
+
+
+def measure_import(modules=LIGHT_MODULES, heavy_modules=HEAVY_MODULES):
+    """Imports the modules in a fresh interpreter.
+
+    Returns:
+        measurement: dictionary with the import_time in seconds and the
+                     heavy_modules that were loaded
+    """
+    script = _MEASUREMENT.format(imports='\n'.join(f'import {name}' for name in modules),
+                                 heavy=repr(list(heavy_modules)))
+    output = subprocess.run([sys.executable, '-c', script], check=True,
+                            capture_output=True, text=True).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='largest median import time in seconds')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    measurements = [measure_import() for _ in range(args.repeats)]
+    median_time = statistics.median(measurement['import_time']
+                                    for measurement in measurements)
+    heavy_modules = sorted(set().union(*(measurement['heavy_modules']
+                                         for measurement in measurements)))
+
+    record = {'import_time': median_time, 'budget': args.budget,
+              'heavy_modules': heavy_modules}
+    print(json.dumps(record))
+
+    if median_time > args.budget or heavy_modules:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""Benchmarks GirthMCMC across models, dataset sizes and engines.
+
+Every configuration runs in a fresh process so the peak resident memory
+belongs to that configuration alone. Results are written as json lines,
+one record per configuration. Passing both precisions compares the speed
+and parameter recovery of float32 models against float64.
+
+Example:
+    python benchmarks/run_benchmarks.py --models rasch 2pl grm \\
+        --items 10 40 --people 500 5000 --output results.jsonl
+
+    python benchmarks/run_benchmarks.py --models 2pl grm --engines pymc \\
+        --precisions float64 float32 --output precision.jsonl
+"""
+import argparse
+from importlib import metadata
+import itertools
+import json
+import multiprocessing
+import platform
+import sys
+
+import numpy as np
+
+
+MODELS = ['rasch', '1pl', '2pl', '3pl', 'grm', 'pcm',
+          '2pl_md', 'grm_md', 'pcm_md']
+ENGINES = ['pymc', 'gibbs', 'vi']
+PRECISIONS = ['float64', 'float32']
+GIBBS_MODELS = ['rasch', '1pl', '2pl']
+POLYTOMOUS_MODELS = ['grm', 'pcm', 'grm_md', 'pcm_md']
+MULTIDIMENSIONAL_MODELS = ['2pl_md', 'grm_md', 'pcm_md']
+
+
+def synthetic_parameters(model, n_items, n_people, n_categories, n_factors, seed):
+    """Creates the true parameters of a benchmark dataset.
+
+    Args:
+        model: (string) key of the GirthMCMC model table
+        n_items: (int) number of items
+        n_people: (int) number of participants
+        n_categories: (int) number of categories in polytomous models
+        n_factors: (int) number of factors in multidimensional models
+        seed: (int) seed of the random generator
+
+    Returns:
+        parameters: dictionary of the true parameters
+    """
+    rng = np.random.default_rng(seed)
+    multidimensional = model in MULTIDIMENSIONAL_MODELS
+
+    if multidimensional:
+        discrimination = rng.uniform(-1.5, 1.5, (n_items, n_factors))
+        ability = rng.standard_normal((n_factors, n_people))
+
+    else:
+        discrimination = 0.89 * np.sqrt(-2 * np.log(rng.uniform(size=n_items)))
+        ability = rng.standard_normal(n_people)
+
+    if model == 'rasch':
+        discrimination = np.ones(n_items)
+
+    elif model == '1pl':
+        discrimination = np.full(n_items, 1.32)
+
+    if model in POLYTOMOUS_MODELS:
+        difficulty = np.sort(rng.standard_normal((n_items, n_categories - 1)), 1)
+
+    else:
+        difficulty = rng.standard_normal(n_items)
+
+    guessing = rng.uniform(0, 0.05, n_items) if model == '3pl' else None
+
+    return {'Discrimination': discrimination, 'Difficulty': difficulty,
+            'Ability': ability, 'Guessing': guessing}
+
+
+def synthetic_dataset(model, parameters, seed):
+    """Generates responses with girth.synthetic."""
+    from girth.synthetic import (create_synthetic_irt_dichotomous,
+                                 create_synthetic_irt_polytomous)
+    np.random.seed(seed)
+
+    if model in POLYTOMOUS_MODELS:
+        synthetic_model = {'grm': 'grm', 'pcm': 'pcm',
+                           'grm_md': 'grm_md', 'pcm_md': 'grm_md'}[model]
+        return create_synthetic_irt_polytomous(parameters['Difficulty'],
+                                               parameters['Discrimination'],
+                                               parameters['Ability'],
+                                               model=synthetic_model, seed=seed)
+
+    kwargs = dict()
+    if parameters['Guessing'] is not None:
+        kwargs['guessing'] = parameters['Guessing']
+
+    return create_synthetic_irt_dichotomous(parameters['Difficulty'],
+                                            parameters['Discrimination'],
+                                            parameters['Ability'],
+                                            seed=seed, **kwargs)
+
+
+def recovery_error(model, parameters, results):
+    """Root mean square error of the recovered parameters.
+
+    Multidimensional solutions are only identified up to a rotation so
+    only the ability correlation of unidimensional models is reported.
+    """
+    if model in MULTIDIMENSIONAL_MODELS:
+        return {'difficulty_rmse': None, 'discrimination_rmse': None,
+                'ability_correlation': None}
+
+    difficulty = np.asarray(results['Difficulty'])
+    discrimination = np.asarray(results.get('Discrimination', 1.0))
+    true_discrimination = parameters['Discrimination']
+
+    return {
+        'difficulty_rmse': float(np.sqrt(np.mean(
+            np.square(difficulty - parameters['Difficulty'])))),
+        'discrimination_rmse': float(np.sqrt(np.mean(
+            np.square(discrimination - true_discrimination)))),
+        'ability_correlation': float(np.corrcoef(results['Ability'],
+                                                 parameters['Ability'])[0, 1])
+        }
+
+
+def effective_sample_size(trace):
+    """Smallest bulk effective sample size over the item parameters."""
+    import arviz
+
+    item_names = [name for name in ['Difficulty', 'Discrimination',
+                                    'Thresholds', 'Guessing']
+                  if name in trace.varnames]
+
+    if not item_names:
+        return None
+
+    draws = {name: np.stack([trace.get_values(name, chains=[chain], combine=False)
+                             for chain in trace.chains])
+             for name in item_names}
+    ess = arviz.ess(arviz.convert_to_inference_data(draws))
+
+    return float(min(ess[name].values.min() for name in item_names))
+
+
+def run_configuration(configuration):
+    """Runs a single benchmark configuration.
+
+    Args:
+        configuration: dictionary with model, engine, precision, n_items, 
+                       n_people, n_categories, n_factors, n_tune, n_samples,
+                       n_processors and seed
+
+    Returns:
+        record: dictionary of timings, effective sample sizes, memory
+                and recovery errors
+    """
+    from girth_mcmc import GirthMCMC
+    from girth_mcmc.utils import peak_memory
+
+    model = configuration['model']
+    engine = configuration['engine']
+
+    parameters = synthetic_parameters(model, configuration['n_items'],
+                                      configuration['n_people'],
+                                      configuration['n_categories'],
+                                      configuration['n_factors'],
+                                      configuration['seed'])
+    dataset = synthetic_dataset(model, parameters, configuration['seed'])
+
+    model_args = None
+    if model in POLYTOMOUS_MODELS:
+        model_args = (configuration['n_categories'],)
+
+    if model in MULTIDIMENSIONAL_MODELS:
+        model_args = (configuration['n_factors'],)
+
+        if model in POLYTOMOUS_MODELS:
+            model_args = (configuration['n_categories'],
+                          configuration['n_factors'])
+
+    options = {'n_tune': configuration['n_tune'],
+               'n_samples': configuration['n_samples'],
+               'n_processors': configuration['n_processors'],
+               'engine': 'gibbs' if engine == 'gibbs' else 'pymc',
+               'variational_inference': engine == 'vi',
+               'variational_samples': configuration['n_tune'] * 4,
+               'precision': configuration['precision']}
+    girth_model = GirthMCMC(model=model, model_args=model_args, options=options)
+
+    kwargs = {'random_seed': configuration['seed']}
+    if engine != 'gibbs':
+        kwargs['progressbar'] = False
+
+    if engine == 'pymc':
+        kwargs['compute_convergence_checks'] = False
+
+    results = girth_model(dataset, **kwargs)
+
+    record = dict(configuration)
+    for phase in ['build_model', 'initial_guess', 'compile', 'tune', 'sample',
+                  'fit', 'summarize']:
+        timing = girth_model.timings.get(phase)
+        record[f'{phase}_time'] = timing['wall_time'] if timing else None
+
+    record['sampling_time'] = sum(record[f'{phase}_time'] or 0
+                                  for phase in ['tune', 'sample', 'fit'])
+    record['ess_min'] = None
+    record['ess_per_second'] = None
+
+    if engine == 'pymc':
+        record['ess_min'] = effective_sample_size(girth_model.trace)
+        record['ess_per_second'] = record['ess_min'] / record['sampling_time']
+
+    record.update(recovery_error(model, parameters, results))
+    record['peak_rss_mb'] = peak_memory()
+
+    return record
+
+
+def _queue_configuration(configuration, queue):
+    """Runs a configuration and puts the record or the error in the queue."""
+    try:
+        queue.put(run_configuration(configuration))
+
+    except Exception as error:
+        queue.put(dict(configuration, error=repr(error)))
+
+
+def _run_isolated(context, configuration):
+    """Runs a configuration in a new (non daemonic) process.
+
+    pm.sample starts its own processes for the chains which daemonic
+    pool workers aren't allowed to do.
+    """
+    queue = context.Queue()
+    process = context.Process(target=_queue_configuration,
+                              args=(configuration, queue))
+    process.start()
+    record = queue.get()
+    process.join()
+
+    return record
+
+
+def benchmark_grid(models, engines, items, people, categories, factors,
+                   precisions=('float64',)):
+    """Configurations of the benchmark grid.
+
+    Engines are skipped for models they don't support and the number
+    of categories / factors only varies for the models that use them.
+    The gibbs engine is written in NumPy and only runs in float64.
+    """
+    for model, engine, precision in itertools.product(models, engines, precisions):
+        if engine == 'gibbs' and (model not in GIBBS_MODELS or precision != 'float64'):
+            continue
+
+        if engine == 'vi' and model in MULTIDIMENSIONAL_MODELS:
+            continue
+
+        model_categories = categories if model in POLYTOMOUS_MODELS else [2]
+        model_factors = factors if model in MULTIDIMENSIONAL_MODELS else [1]
+
+        for n_items, n_people, n_categories, n_factors in itertools.product(
+                items, people, model_categories, model_factors):
+            yield {'model': model, 'engine': engine, 'precision': precision,
+                   'n_items': n_items, 'n_people': n_people, 
+                   'n_categories': n_categories, 'n_factors': n_factors}
+
+
+def environment():
+    """Versions of the machine and packages for the records."""
+    record = {'python': platform.python_version(),
+              'platform': platform.platform(),
+              'processor': platform.processor(),
+              'cpu_count': multiprocessing.cpu_count()}
+
+    for package in ['girth_mcmc', 'girth', 'numpy', 'pymc3', 'theano-pymc']:
+        try:
+            record[package] = metadata.version(package)
+
+        except metadata.PackageNotFoundError:
+            record[package] = None
+
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', nargs='+', default=MODELS, choices=MODELS)
+    parser.add_argument('--engines', nargs='+', default=ENGINES, choices=ENGINES)
+    parser.add_argument('--precisions', nargs='+', default=['float64'],
+                        choices=PRECISIONS)
+    parser.add_argument('--items', nargs='+', type=int, default=[10, 40])
+    parser.add_argument('--people', nargs='+', type=int, default=[500, 2000])
+    parser.add_argument('--categories', nargs='+', type=int, default=[3, 5])
+    parser.add_argument('--factors', nargs='+', type=int, default=[2])
+    parser.add_argument('--n-tune', type=int, default=1000)
+    parser.add_argument('--n-samples', type=int, default=2000)
+    parser.add_argument('--n-processors', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=20210611)
+    parser.add_argument('--output', default=None,
+                        help='json lines file, results are appended')
+    args = parser.parse_args(argv)
+
+    machine = environment()
+
+    # Spawned processes start without the memory of the parent
+    context = multiprocessing.get_context('spawn')
+
+    output = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        for configuration in benchmark_grid(args.models, args.engines,
+                                            args.items, args.people,
+                                            args.categories, args.factors,
+                                            args.precisions):
+            configuration.update(n_tune=args.n_tune, n_samples=args.n_samples,
+                                 n_processors=args.n_processors, seed=args.seed)
+
+            record = _run_isolated(context, configuration)
+
+            record['environment'] = machine
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
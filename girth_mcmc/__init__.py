@@ -1 +1,10 @@
-from .girth_class import GirthMCMC
\ No newline at end of file
+__all__ = ['GirthMCMC']
+
+
+def __getattr__(name):
+    """Loads the estimator, and with it PyMC3 and Theano, on first use."""
+    if name == 'GirthMCMC':
+        from .girth_class import GirthMCMC
+        return GirthMCMC
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
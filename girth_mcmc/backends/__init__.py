@@ -0,0 +1,3 @@
+from .summary import *
+from .streaming import *
+from .memmap import *
@@ -0,0 +1,105 @@
+import os
+import tempfile
+
+import numpy as np
+from pymc3.backends import NDArray
+from pymc3.backends.base import BaseTrace, MultiTrace
+
+
+__all__ = ['MemmapTrace', 'memmap_multitrace']
+
+
+class MemmapTrace(NDArray):
+    """Trace backend writing draws to memory mapped .npy files.
+
+    Every variable of a chain is stored in <directory>/chain_<n>/<name>.npy,
+    only the pages being written or read are held in memory. Sampler
+    statistics are small and kept in memory.
+
+    Parameters:
+        directory: (string) folder holding the chains
+        chain: (int) chain number of the trace
+        model: pymc model being sampled
+        temporary_directory: tempfile.TemporaryDirectory of the folder, it
+                             is removed once no trace holds it
+        vars: variables to store, model.unobserved_RVs when None
+    """
+    def __init__(self, directory, chain=0, model=None, temporary_directory=None,
+                 vars=None):
+        """Constructor method for the trace."""
+        super().__init__(model=model, vars=vars)
+        self.directory = directory
+        self.chain = chain
+        self._temporary_directory = temporary_directory
+
+    def setup(self, draws, chain, sampler_vars=None):
+        """Creates the memory mapped files of the chain."""
+        BaseTrace.setup(self, draws, chain, sampler_vars)
+        self.chain = chain
+        self.draws = draws
+        self.draw_idx = 0
+
+        chain_directory = os.path.join(self.directory, f"chain_{chain}")
+        os.makedirs(chain_directory, exist_ok=True)
+
+        self.samples = dict()
+        for varname, shape in self.var_shapes.items():
+            file_path = os.path.join(chain_directory, f"{varname}.npy")
+            self.samples[varname] = np.lib.format.open_memmap(
+                file_path, mode='w+', dtype=self.var_dtypes[varname],
+                shape=(draws,) + shape)
+
+        self._stats = None
+        if sampler_vars is not None:
+            self._stats = [{varname: np.zeros(draws, dtype=dtype)
+                            for varname, dtype in sampler.items()}
+                           for sampler in sampler_vars]
+
+    def close(self):
+        """Flushes the draws to disk."""
+        for values in self.samples.values():
+            values.flush()
+
+        super().close()
+
+    def _slice(self, idx):
+        """Slices the draws, the slice keeps the folder of the memory maps.
+
+        pm.sample drops the tuning draws with a slice, the NDArray slice
+        would lose the folder and with it the temporary directory.
+        """
+        idx = slice(*idx.indices(len(self)))
+
+        sliced = MemmapTrace(self.directory, self.chain, self.model, 
+                             self._temporary_directory, self.vars)
+        sliced.samples = {varname: values[idx] for varname, values in self.samples.items()}
+        sliced.sampler_vars = self.sampler_vars
+        sliced.draw_idx = (idx.stop - idx.start) // idx.step
+
+        if self._stats is not None:
+            sliced._stats = [{varname: values[idx] for varname, values in stats.items()}
+                             for stats in self._stats]
+
+        return sliced
+
+
+def memmap_multitrace(n_chains, directory=None, model=None):
+    """Creates a memory mapped trace for every chain.
+
+    Args:
+        n_chains: (int) number of chains to sample
+        directory: (string) folder to write the draws, when None a 
+                   temporary folder is created and removed with the traces
+        model: pymc model being sampled
+
+    Returns:
+        trace: MultiTrace to pass into pm.sample
+    """
+    temporary_directory = None
+    if directory is None:
+        # pm.sample returns a new MultiTrace, the chains share the folder
+        temporary_directory = tempfile.TemporaryDirectory(prefix='girth_mcmc_')
+        directory = temporary_directory.name
+
+    return MultiTrace([MemmapTrace(directory, chain, model, temporary_directory)
+                       for chain in range(n_chains)])
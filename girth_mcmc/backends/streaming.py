@@ -0,0 +1,100 @@
+from pymc3.backends import NDArray
+from pymc3.backends.base import MultiTrace
+
+
+__all__ = ['StreamingTrace', 'streaming_multitrace']
+
+
+class StreamingTrace(NDArray):
+    """Trace backend that summarizes draws as they arrive.
+
+    Parameters:
+        summary: PosteriorSummary updated with every post tuning draw
+        summary_function: compiled function of a sampler point returning
+                          the values to summarize
+        summary_names: names of the values returned by summary_function
+        n_tune: number of tuning draws to skip
+        keep_draws: (boolean) also store the raw draws, only the summary
+                    is kept when False
+        chain: (int) chain number of the trace
+        model: pymc model being sampled
+    """
+    def __init__(self, summary, summary_function, summary_names, n_tune,
+                 keep_draws=True, chain=0, model=None):
+        """Constructor method for the trace."""
+        super().__init__(model=model)
+        self.summary = summary
+        self.summary_function = summary_function
+        self.summary_names = summary_names
+        self.n_tune = n_tune
+        self.keep_draws = keep_draws
+        self.chain = chain
+        self._last_point = None
+
+        if not keep_draws:
+            self.supports_sampler_stats = False
+
+    def setup(self, draws, chain, sampler_vars=None):
+        """Perform chain-specific setup."""
+        if self.keep_draws:
+            return super().setup(draws, chain, sampler_vars)
+
+        self._set_sampler_vars(sampler_vars)
+        self._is_base_setup = True
+        self.chain = chain
+        self.draws = draws
+
+    def record(self, point, sampler_stats=None):
+        """Summarizes a sampling iteration."""
+        if self.draw_idx >= self.n_tune:
+            self.summary.update(dict(zip(self.summary_names,
+                                         self.summary_function(point))))
+
+        if self.keep_draws:
+            return super().record(point, sampler_stats)
+
+        self._last_point = point
+        self.draw_idx += 1
+
+    def close(self):
+        if self.keep_draws:
+            super().close()
+
+    def __len__(self):
+        return self.draw_idx
+
+    def _slice(self, idx):
+        if self.keep_draws:
+            return super()._slice(idx)
+
+        # No draws to slice, the summary already skipped the tuning draws
+        return self
+
+    def point(self, idx):
+        if self.keep_draws:
+            return super().point(idx)
+
+        return self._last_point
+
+
+def streaming_multitrace(summary, tensors, n_chains, n_tune, keep_draws=True,
+                         model=None):
+    """Creates a streaming trace for every chain.
+
+    Args:
+        summary: PosteriorSummary shared by all the chains
+        tensors: dictionary of names and model tensors to summarize
+        n_chains: (int) number of chains to sample
+        n_tune: (int) number of tuning draws in each chain
+        keep_draws: (boolean) also store the raw draws
+        model: pymc model being sampled
+
+    Returns:
+        trace: MultiTrace to pass into pm.sample
+    """
+    summary_names = list(tensors.keys())
+    summary_function = model.fastfn(list(tensors.values()))
+
+    return MultiTrace([StreamingTrace(summary, summary_function, summary_names,
+                                      n_tune, keep_draws, chain, model)
+                       for chain in range(n_chains)])
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+__all__ = ['PosteriorSummary']
+
+
+class PosteriorSummary(object):
+    """Constant memory summary of posterior draws.
+
+    Means and variances are accumulated with Welford's algorithm and
+    quantiles are tracked with the P-squared estimator, one set of five
+    markers for every element of every variable.
+
+    Parameters:
+        quantiles: (tuple) probabilities of the quantiles to track
+    """
+    def __init__(self, quantiles=(0.025, 0.5, 0.975)):
+        """Constructor method for the summary."""
+        self.quantiles = np.asarray(quantiles, dtype=float)
+        self.n_draws = 0
+        self._shapes = dict()
+        self._means = dict()
+        self._squares = dict()
+        self._buffers = dict()
+        self._heights = dict()
+        self._positions = dict()
+
+        # Desired marker positions and their increments
+        probability = self.quantiles[None, :, None]
+        self._increments = np.concatenate([np.zeros_like(probability),
+                                           probability / 2, probability,
+                                           (1 + probability) / 2,
+                                           np.ones_like(probability)])
+        self._desired = 1 + 4 * self._increments
+
+    @property
+    def varnames(self):
+        return list(self._shapes.keys())
+
+    def update(self, draw):
+        """Adds a posterior draw to the summary.
+
+        Args:
+            draw: dictionary of variable names and values
+        """
+        self.n_draws += 1
+        if self.n_draws > 5:
+            self._desired += self._increments
+
+        for name, value in draw.items():
+            value = np.asarray(value, dtype=float)
+
+            if name not in self._shapes:
+                self._shapes[name] = value.shape
+                self._means[name] = np.zeros(value.size)
+                self._squares[name] = np.zeros(value.size)
+                self._buffers[name] = list()
+
+            value = value.ravel()
+
+            # Welford update of the moments
+            delta = value - self._means[name]
+            self._means[name] += delta / self.n_draws
+            self._squares[name] += delta * (value - self._means[name])
+
+            if name in self._heights:
+                self._update_markers(name, value)
+
+            else:
+                self._buffers[name].append(value)
+
+                # Markers start from the first five draws
+                if len(self._buffers[name]) == 5:
+                    heights = np.sort(self._buffers[name], axis=0)
+                    self._heights[name] = np.repeat(heights[:, None, :],
+                                                    self.quantiles.size, axis=1)
+                    self._positions[name] = np.ones_like(self._heights[name])
+                    self._positions[name] *= np.arange(1, 6)[:, None, None]
+                    del self._buffers[name]
+
+    def _update_markers(self, name, value):
+        """P-squared update of the quantile markers of one variable."""
+        heights = self._heights[name]
+        positions = self._positions[name]
+
+        # Extreme markers track the min / max
+        heights[0] = np.minimum(heights[0], value)
+        heights[4] = np.maximum(heights[4], value)
+
+        positions[1:4] += value < heights[1:4]
+        positions[4] += 1
+
+        # Adjust the middle markers toward their desired positions
+        for ndx in range(1, 4):
+            offset = self._desired[ndx] - positions[ndx]
+            upper_gap = positions[ndx + 1] - positions[ndx]
+            lower_gap = positions[ndx - 1] - positions[ndx]
+
+            move = ((offset >= 1) & (upper_gap > 1)) | ((offset <= -1) & (lower_gap < -1))
+            if not move.any():
+                continue
+
+            step = np.sign(offset)
+
+            # Piecewise parabolic prediction
+            parabolic = (heights[ndx] + step / (positions[ndx + 1] - positions[ndx - 1]) *
+                         ((positions[ndx] - positions[ndx - 1] + step) *
+                          (heights[ndx + 1] - heights[ndx]) / upper_gap +
+                          (positions[ndx + 1] - positions[ndx] - step) *
+                          (heights[ndx] - heights[ndx - 1]) / -lower_gap))
+
+            # Linear prediction when the parabola isn't monotonic
+            neighbor_height = np.where(step > 0, heights[ndx + 1], heights[ndx - 1])
+            neighbor_gap = np.where(step > 0, upper_gap, lower_gap)
+            linear = heights[ndx] + step * (neighbor_height - heights[ndx]) / neighbor_gap
+
+            valid = (heights[ndx - 1] < parabolic) & (parabolic < heights[ndx + 1])
+            new_height = np.where(valid, parabolic, linear)
+
+            heights[ndx] = np.where(move, new_height, heights[ndx])
+            positions[ndx] += np.where(move, step, 0)
+
+    def mean(self, name):
+        """Posterior mean of a variable."""
+        return self._means[name].reshape(self._shapes[name])
+
+    def sd(self, name):
+        """Posterior standard deviation of a variable."""
+        variance = self._squares[name] / max(self.n_draws - 1, 1)
+        return np.sqrt(variance).reshape(self._shapes[name])
+
+    def quantile(self, name):
+        """Posterior quantiles of a variable.
+
+        Args:
+            name: variable name
+
+        Returns:
+            quantiles: [n_quantiles, ...] estimates for each tracked probability
+        """
+        if name in self._heights:
+            estimates = self._heights[name][2]
+
+        else:
+            estimates = np.quantile(self._buffers[name], self.quantiles, axis=0)
+
+        return estimates.reshape((self.quantiles.size,) + self._shapes[name])
+
+    def mean_trace(self):
+        """Posterior means as a single draw trace for the parameter functions."""
+        return {name: self.mean(name)[None] for name in self.varnames}
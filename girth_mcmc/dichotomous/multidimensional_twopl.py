@@ -4,20 +4,25 @@ import theano
 
 from theano import tensor as tt
 
+from girth import INVALID_RESPONSE
 from girth.multidimensional import initial_guess_md
-from girth_mcmc.utils import get_discrimination_indices
+from girth_mcmc.utils import (get_discrimination_indices, data_container,
+                              observed_log_likelihood, has_missing_responses,
+                              posterior_mean)
+from girth_mcmc.distributions import LogitBernoulli
 
 
 __all__= ["multidimensional_twopl_model", "multidimensional_twopl_parameters",
           "multidimensional_twopl_initial_guess"]
 
 
-def multidimensional_twopl_model(dataset, n_factors):
+def multidimensional_twopl_model(dataset, n_factors, store_kernel=True):
     """Defines the mcmc model for multidimensional 2PL logistic estimation.
     
     Args:
         dataset: [n_items, n_participants] 2d array of measured responses
         n_factors: (int) number of factors to extract
+        store_kernel: (boolean) store the probability kernel for every draw
 
     Returns:
         model: PyMC3 model to run
@@ -58,10 +63,24 @@ def multidimensional_twopl_model(dataset, n_factors):
         kernel = pm.math.dot(discrimination, ability)
         kernel += difficulty[:, None]
 
-        probabilities = pm.Deterministic("PL_Kernel", pm.math.invlogit(kernel))
+        probabilities = pm.math.invlogit(kernel)
+
+        if store_kernel:
+            probabilities = pm.Deterministic("PL_Kernel", probabilities)
         
-        # Compute the log likelihood
-        log_likelihood = pm.Bernoulli("Log_Likelihood", p=probabilities, observed=observed)
+        # Compute the log likelihood from the log odds, stable in float32
+        if has_missing_responses(observed):
+            log_likelihood = observed_log_likelihood(
+                LogitBernoulli, observed, lambda item, person: 
+                {'logit_p': (discrimination[item] * ability[:, person].T).sum(axis=1) 
+                            + difficulty[item]})
+
+        else:
+            log_likelihood = LogitBernoulli("Log_Likelihood", logit_p=kernel, 
+                                            observed=data_container("Observed", observed))
+
+    # Handle to recompute the kernel from stored draws
+    twopl_pymc_model.pl_kernel = probabilities
 
     return twopl_pymc_model
 
@@ -75,22 +94,22 @@ def multidimensional_twopl_parameters(trace):
     Return:
         return_dictionary: dictionary of found parameters
     """
-    difficulty = trace['Difficulty'].mean(0)
+    difficulty = posterior_mean(trace, 'Difficulty')
     n_items = difficulty.shape[0]
     
-    diagonal_entries = trace['Diagonal Discrimination'].mean(0)
+    diagonal_entries = posterior_mean(trace, 'Diagonal Discrimination')
     n_factors = diagonal_entries.shape[0]
     
     diagonal_indices, lower_indices = get_discrimination_indices(n_items, n_factors)
     
     discrimination = np.zeros((n_items, n_factors))
-    discrimination[lower_indices] = trace['Lower Discrimination'].mean(0)
-    discrimination[diagonal_indices] = trace['Diagonal Discrimination'].mean(0)
+    discrimination[lower_indices] = posterior_mean(trace, 'Lower Discrimination')
+    discrimination[diagonal_indices] = diagonal_entries
 
     return {'Discrimination': discrimination,
             'Difficulty': difficulty,
-            'Ability': trace['Ability'].mean(0).T,
-            'Difficulty Sigma': trace['Difficulty_SD'].mean()}    
+            'Ability': posterior_mean(trace, 'Ability').T,
+            'Difficulty Sigma': posterior_mean(trace, 'Difficulty_SD').mean()}    
 
 
 def multidimensional_twopl_initial_guess(dataset, n_factors):
@@ -104,7 +123,9 @@ def multidimensional_twopl_initial_guess(dataset, n_factors):
         estimated_discrimination: estimated discrimination parameters
     """
     n_items = dataset.shape[0]
-    estimated_discrimination = initial_guess_md(dataset, n_factors)
+    # Girth tags missing responses with a fill value
+    estimated_discrimination = initial_guess_md(np.ma.filled(dataset, INVALID_RESPONSE), 
+                                                n_factors)
 
     # Reformat into parameters for estimation
     diagonal_indices, lower_indices = get_discrimination_indices(n_items, n_factors)
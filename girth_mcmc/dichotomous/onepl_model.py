@@ -1,16 +1,21 @@
 import pymc3 as pm
 
-from girth_mcmc.distributions import Rayleigh
+from girth_mcmc.utils import (data_container, posterior_mean,
+                              observed_log_likelihood, has_missing_responses,
+                              classical_test_statistics, classical_discrimination,
+                              classical_thresholds)
+from girth_mcmc.distributions import ShiftedRayleigh, LogitBernoulli
 
 
-__all__ = ['onepl_model', 'onepl_parameters']
+__all__ = ['onepl_model', 'onepl_parameters', 'onepl_initial_guess']
 
 
-def onepl_model(dataset):
+def onepl_model(dataset, store_kernel=True):
     """Defines the mcmc model for one parameter logistic estimation.
     
     Args:
         dataset: [n_items, n_participants] 2d array of measured responses
+        store_kernel: (boolean) store the probability kernel for every draw
 
     Returns:
         model: PyMC3 model to run
@@ -30,15 +35,28 @@ def onepl_model(dataset):
 
         # Discrimination multilevel prior
         rayleigh_scale = pm.Lognormal("Rayleigh_Scale", mu=0, sigma=1/4, shape=1)
-        discrimination = pm.Bound(Rayleigh, lower=0.25)(name='Discrimination', 
-                                  beta=rayleigh_scale, offset=0.25, shape=1)
+        discrimination = ShiftedRayleigh('Discrimination', beta=rayleigh_scale, 
+                                         offset=0.25, shape=1)
 
         # Compute the probabilities
         kernel = discrimination * (ability[None, :] - difficulty[:, None])
-        probabilities = pm.Deterministic("PL_Kernel", pm.math.invlogit(kernel))
+        probabilities = pm.math.invlogit(kernel)
 
-        # Get the log likelihood
-        log_likelihood = pm.Bernoulli("Log_Likelihood", p=probabilities, observed=observed)
+        if store_kernel:
+            probabilities = pm.Deterministic("PL_Kernel", probabilities)
+
+        # Get the log likelihood from the log odds, stable in float32
+        if has_missing_responses(observed):
+            log_likelihood = observed_log_likelihood(
+                LogitBernoulli, observed, lambda item, person: 
+                {'logit_p': discrimination * (ability[person] - difficulty[item])})
+
+        else:
+            log_likelihood = LogitBernoulli("Log_Likelihood", logit_p=kernel, 
+                                            observed=data_container("Observed", observed))
+
+    # Handle to recompute the kernel from stored draws
+    onepl_pymc_model.pl_kernel = probabilities
 
     return onepl_pymc_model
    
@@ -52,9 +70,28 @@ def onepl_parameters(trace):
     Return:
         return_dictionary: dictionary of found parameters
     """
-    return {'Discrimination': trace['Discrimination'].mean(),
-            'Difficulty': trace['Difficulty'].mean(0),
-            'Ability': trace['Ability'].mean(0),
-            'Difficulty Sigma': trace['Difficulty_SD'].mean(),
-            'Rayleigh Scale': trace['Rayleigh_Scale'].mean()
-            }
\ No newline at end of file
+    return {'Discrimination': posterior_mean(trace, 'Discrimination').mean(),
+            'Difficulty': posterior_mean(trace, 'Difficulty'),
+            'Ability': posterior_mean(trace, 'Ability'),
+            'Difficulty Sigma': posterior_mean(trace, 'Difficulty_SD').mean(),
+            'Rayleigh Scale': posterior_mean(trace, 'Rayleigh_Scale').mean()
+            }
+
+
+def onepl_initial_guess(dataset):
+    """Classical estimates to start the sampler.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+
+    Returns:
+        initial_guess: dictionary of start values
+    """
+    proportions, item_rest, ability = classical_test_statistics(dataset)
+
+    # A single discrimination is shared by every item
+    discrimination = classical_discrimination(item_rest).mean(keepdims=True)
+
+    return {'Discrimination': discrimination,
+            'Difficulty': classical_thresholds(proportions[:, 0], discrimination),
+            'Ability': ability}
@@ -1,13 +1,20 @@
 import pymc3 as pm
 
-__all__ = ['rasch_model', 'rasch_parameters']
+from girth_mcmc.utils import (data_container, posterior_mean,
+                              observed_log_likelihood, has_missing_responses,
+                              classical_test_statistics, classical_thresholds)
+from girth_mcmc.distributions import LogitBernoulli
 
 
-def rasch_model(dataset):
+__all__ = ['rasch_model', 'rasch_parameters', 'rasch_initial_guess']
+
+
+def rasch_model(dataset, store_kernel=True):
     """Defines the mcmc model for Rasch estimation.
     
     Args:
         dataset: [n_items, n_participants] 2d array of measured responses
+        store_kernel: (boolean) store the probability kernel for every draw
 
     Returns:
         model: PyMC3 model to run
@@ -27,10 +34,23 @@ def rasch_model(dataset):
 
         # Compute the probabilities
         kernel = ability[None, :] - difficulty[:, None]
-        probabilities = pm.Deterministic("PL_Kernel", pm.math.invlogit(kernel))
+        probabilities = pm.math.invlogit(kernel)
+
+        if store_kernel:
+            probabilities = pm.Deterministic("PL_Kernel", probabilities)
+
+        # Get the log likelihood from the log odds, stable in float32
+        if has_missing_responses(observed):
+            log_likelihood = observed_log_likelihood(
+                LogitBernoulli, observed, lambda item, person: 
+                {'logit_p': ability[person] - difficulty[item]})
 
-        # Get the log likelihood
-        log_likelihood = pm.Bernoulli("Log_Likelihood", p=probabilities, observed=observed)
+        else:
+            log_likelihood = LogitBernoulli("Log_Likelihood", logit_p=kernel, 
+                                            observed=data_container("Observed", observed))
+
+    # Handle to recompute the kernel from stored draws
+    rasch_pymc_model.pl_kernel = probabilities
 
     return rasch_pymc_model
 
@@ -44,8 +64,22 @@ def rasch_parameters(trace):
     Return:
         return_dictionary: dictionary of found parameters
     """
-    return {'Difficulty': trace['Difficulty'].mean(0),
-            'Ability': trace['Ability'].mean(0),
-            'Difficulty_sigma': trace['Difficulty_SD'].mean()
+    return {'Difficulty': posterior_mean(trace, 'Difficulty'),
+            'Ability': posterior_mean(trace, 'Ability'),
+            'Difficulty_sigma': posterior_mean(trace, 'Difficulty_SD').mean()
             }
-   
\ No newline at end of file
+
+
+def rasch_initial_guess(dataset):
+    """Classical estimates to start the sampler.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+
+    Returns:
+        initial_guess: dictionary of start values
+    """
+    proportions, _, ability = classical_test_statistics(dataset)
+
+    return {'Difficulty': classical_thresholds(proportions[:, 0], 1.0),
+            'Ability': ability}
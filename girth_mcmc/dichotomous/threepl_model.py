@@ -1,16 +1,35 @@
 import pymc3 as pm
+from pymc3.theanof import floatX
+from theano import tensor as tt
 
-from girth_mcmc.distributions import Rayleigh
+from girth_mcmc.utils import (gauss_hermite_quadrature, one_hot_responses,
+                              data_container, posterior_mean, observed_log_likelihood,
+                              has_missing_responses, classical_test_statistics,
+                              classical_discrimination, classical_thresholds)
+from girth_mcmc.distributions import (ShiftedRayleigh, GuessingLogitBernoulli, 
+                                      log_sigmoid, marginal_log_joint, 
+                                      marginal_log_likelihood, marginal_eap, 
+                                      marginal_posterior_variance, 
+                                      minibatch_marginal_likelihood)
 
 
-__all__ = ["threepl_model", "threepl_parameters"]
+__all__ = ["threepl_model", "threepl_parameters", "threepl_initial_guess"]
 
 
-def threepl_model(dataset):
+def threepl_model(dataset, store_kernel=True, quadrature_points=None, weights=None,
+                  minibatch_size=None):
     """Defines the mcmc model for three parameter logistic estimation.
     
     Args:
         dataset: [n_items, n_participants] 2d array of measured responses
+        store_kernel: (boolean) store the probability kernel for every draw
+        quadrature_points: (int) integrate ability out of the likelihood 
+                           with this many quadrature points, abilities are
+                           sampled when None
+        weights: [n_participants] frequency weight of each response pattern,
+                 needs quadrature_points
+        minibatch_size: (int) estimate the marginal likelihood from random
+                        minibatches of participants, needs quadrature_points
 
     Returns:
         model: PyMC3 model to run
@@ -20,9 +39,6 @@ def threepl_model(dataset):
 
     threepl_pymc_model = pm.Model()
     with threepl_pymc_model:
-        # Ability Parameters (Standardized Normal)
-        ability = pm.Normal("Ability", mu=0, sigma=1, shape=n_people)
-
         # Difficuly multilevel prior
         sigma_difficulty = pm.HalfNormal('Difficulty_SD', sigma=1, shape=1)
         difficulty = pm.Normal("Difficulty", mu=0, 
@@ -30,25 +46,86 @@ def threepl_model(dataset):
 
         # Discrimination multilevel prior
         rayleigh_scale = pm.Lognormal("Rayleigh_Scale", mu=0, sigma=1/4, shape=1)
-        discrimination = pm.Bound(Rayleigh, lower=0.25)(name='Discrimination', 
-                                  beta=rayleigh_scale, offset=0.25, shape=n_items)
+        discrimination = ShiftedRayleigh('Discrimination', beta=rayleigh_scale, 
+                                         offset=0.25, shape=n_items)
 
-        # guessing prior
+        # guessing prior, bounded to keep log1p(-guessing) finite
         exponential_lambda = pm.TruncatedNormal('Exponential_Scale',
                                                 mu=15, sigma=2, shape=1,
                                                 lower=10, upper=20)
-        guessing = pm.Exponential('Guessing', lam=exponential_lambda, 
-                                  shape=n_items)
-
-        # Compute the probabilities
-        kernel = ability[None, :] - difficulty[:, None]
-        kernel *= discrimination[:, None]
-        probabilities = pm.Deterministic("PL_Kernel", guessing[:, None] + 
-                                         (1 - guessing[:, None]) * 
-                                         pm.math.invlogit(kernel))
-
-        # Get the log likelihood
-        log_likelihood = pm.Bernoulli("Log_Likelihood", p=probabilities, observed=observed)
+        bounded_exponential = pm.Bound(pm.Exponential, lower=0., upper=1.)
+        guessing = bounded_exponential('Guessing', lam=exponential_lambda, 
+                                       shape=n_items, testval=0.05)
+
+        if quadrature_points:
+            # Integrate ability out on a fixed grid
+            nodes, node_weights = gauss_hermite_quadrature(quadrature_points)
+            kernel = floatX(nodes)[None, :] - difficulty[:, None]
+            kernel *= discrimination[:, None]
+
+            # log(c + (1 - c) * invlogit(kernel)) by log-sum-exp
+            log_guessing = tt.log(guessing)[:, None]
+            log_not_guessing = tt.log1p(-guessing)[:, None]
+            log_probabilities = tt.stack([log_not_guessing + log_sigmoid(-kernel), 
+                                          pm.math.logaddexp(log_guessing, 
+                                                            log_not_guessing + 
+                                                            log_sigmoid(kernel))], 
+                                         axis=1)
+
+            # Get the marginal log likelihood
+            one_hot = one_hot_responses(observed, 2)
+            responses = data_container("Responses", one_hot)
+            log_joint = marginal_log_joint(log_probabilities, responses, node_weights)
+
+            # Random participants at every evaluation scaled to the dataset
+            if minibatch_size:
+                log_marginal = minibatch_marginal_likelihood(log_probabilities, one_hot, 
+                                                             node_weights, minibatch_size, 
+                                                             weights)
+
+            else:
+                log_marginal = marginal_log_likelihood(log_joint)
+
+                if weights is not None:
+                    log_marginal *= data_container("Pattern_Weights", floatX(weights))
+
+            log_likelihood = pm.Potential("Log_Likelihood", log_marginal.sum())
+
+        else:
+            # Ability Parameters (Standardized Normal)
+            ability = pm.Normal("Ability", mu=0, sigma=1, shape=n_people)
+
+            # Compute the probabilities
+            kernel = ability[None, :] - difficulty[:, None]
+            kernel *= discrimination[:, None]
+            probabilities = (guessing[:, None] + (1 - guessing[:, None]) * 
+                             pm.math.invlogit(kernel))
+
+            if store_kernel:
+                probabilities = pm.Deterministic("PL_Kernel", probabilities)
+
+            # Get the log likelihood from the log odds, stable in float32
+            if has_missing_responses(observed):
+                log_likelihood = observed_log_likelihood(
+                    GuessingLogitBernoulli, observed, lambda item, person: 
+                    {'logit_p': discrimination[item] * 
+                                (ability[person] - difficulty[item]),
+                     'guessing': guessing[item]})
+
+            else:
+                log_likelihood = GuessingLogitBernoulli("Log_Likelihood", logit_p=kernel, 
+                                                        guessing=guessing[:, None],
+                                                        observed=data_container("Observed", 
+                                                                                observed))
+
+    if quadrature_points:
+        # Handle to recover abilities from stored draws
+        threepl_pymc_model.ability_eap = marginal_eap(log_joint, nodes)
+        threepl_pymc_model.ability_variance = marginal_posterior_variance(log_joint, nodes)
+
+    else:
+        # Handle to recompute the kernel from stored draws
+        threepl_pymc_model.pl_kernel = probabilities
 
     return threepl_pymc_model
    
@@ -62,11 +139,28 @@ def threepl_parameters(trace):
     Return:
         return_dictionary: dictionary of found parameters
     """
-    return {'Discrimination': trace['Discrimination'].mean(0),
-            'Difficulty': trace['Difficulty'].mean(0),
-            'Guessing': trace['Guessing'].mean(0),
-            'Ability': trace['Ability'].mean(0),
-            'Difficulty Sigma': trace['Difficulty_SD'].mean(),
-            'Rayleigh Scale': trace['Rayleigh_Scale'].mean(),
-            'Guessing Lambda': trace['Exponential_Scale'].mean()
-            }
\ No newline at end of file
+    return {'Discrimination': posterior_mean(trace, 'Discrimination'),
+            'Difficulty': posterior_mean(trace, 'Difficulty'),
+            'Guessing': posterior_mean(trace, 'Guessing'),
+            'Ability': posterior_mean(trace, 'Ability'),
+            'Difficulty Sigma': posterior_mean(trace, 'Difficulty_SD').mean(),
+            'Rayleigh Scale': posterior_mean(trace, 'Rayleigh_Scale').mean(),
+            'Guessing Lambda': posterior_mean(trace, 'Exponential_Scale').mean()
+            }
+
+
+def threepl_initial_guess(dataset):
+    """Classical estimates to start the sampler.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+
+    Returns:
+        initial_guess: dictionary of start values
+    """
+    proportions, item_rest, ability = classical_test_statistics(dataset)
+    discrimination = classical_discrimination(item_rest)
+
+    return {'Discrimination': discrimination,
+            'Difficulty': classical_thresholds(proportions[:, 0], discrimination),
+            'Ability': ability}
@@ -1,2 +1,6 @@
 from .rayleigh import *
-from .partial_credit import *
\ No newline at end of file
+from .partial_credit import *
+from .graded_response import *
+from .logit_bernoulli import *
+from .log_probabilities import *
+from .marginal_likelihood import *
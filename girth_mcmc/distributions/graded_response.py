@@ -0,0 +1,52 @@
+import theano.tensor as tt
+
+from pymc3.math import log1mexp
+from pymc3.theanof import floatX
+
+from pymc3.distributions.discrete import Categorical
+
+from .log_probabilities import log_sigmoid, categorical_log_likelihood
+
+
+__all__ = ['GradedResponse']
+
+
+class GradedResponse(Categorical):
+    """Computed the probability for the graded response model given a set of
+    ordered cutpoints and observations.
+
+    Same probabilities as pm.OrderedLogistic, but every category is built
+    in log space. The difference of the two logistic curves bounding a
+    category is factored as
+
+        invlogit(eta - c_k) - invlogit(eta - c_k+1) =
+            invlogit(eta - c_k) * invlogit(c_k+1 - eta) * (1 - exp(c_k - c_k+1))
+
+    so the log probabilities stay finite in float32 where the difference
+    of the probabilities rounds to zero. The cutpoints are broadcast against
+    eta along the leading axes like PartialCredit.
+    """
+
+    def __init__(self, eta, cutpoints, *args, **kwargs):
+        eta = tt.as_tensor_variable(floatX(eta))
+        cutpoints = tt.as_tensor_variable(cutpoints)
+        kernel = tt.shape_padright(eta) - cutpoints
+
+        # log P(response >= k) and log P(response < k) at every cutpoint
+        log_upper = log_sigmoid(kernel)
+        log_lower = log_sigmoid(-kernel)
+        log_gap = log1mexp(cutpoints[..., 1:] - cutpoints[..., :-1])
+
+        log_p = tt.concatenate(
+            [
+                log_lower[..., :1],
+                log_upper[..., :-1] + log_lower[..., 1:] + log_gap,
+                log_upper[..., -1:]
+            ], axis=-1)
+
+        super().__init__(p=tt.exp(log_p), *args, **kwargs)
+        self.log_p = log_p
+
+    def logp(self, value):
+        """Log probability of the responses from the log category probabilities."""
+        return categorical_log_likelihood(self.log_p, value)
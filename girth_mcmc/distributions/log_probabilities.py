@@ -0,0 +1,55 @@
+import theano.tensor as tt
+
+from pymc3.distributions.dist_math import bound
+from pymc3.theanof import take_along_axis
+
+
+__all__ = ['log_sigmoid', 'categorical_log_likelihood']
+
+
+def log_sigmoid(kernel):
+    """Logarithm of the logistic function.
+
+    Computed as -softplus(-kernel), which neither underflows to log(0) for
+    very negative kernels nor rounds to log(1) for very positive ones,
+    the complement is log_sigmoid(-kernel).
+
+    Args:
+        kernel: tensor of log odds
+
+    Returns:
+        log_probability: tensor of log(invlogit(kernel))
+    """
+    return -tt.nnet.softplus(-kernel)
+
+
+def categorical_log_likelihood(log_p, value):
+    """Log likelihood of categorical responses given log probabilities.
+
+    Indexes the log probabilities directly, the probabilities are never
+    exponentiated and logged again.
+
+    Args:
+        log_p: [..., n_categories] tensor of normalized log probabilities
+        value: tensor of responses in 0, n_categories - 1
+
+    Returns:
+        log_likelihood: tensor of the log probability of every response
+    """
+    n_categories = log_p.shape[-1]
+    value_clip = tt.clip(value, 0, n_categories - 1)
+
+    if log_p.ndim > 1:
+        if log_p.ndim > value_clip.ndim:
+            value_clip = tt.shape_padleft(value_clip, log_p.ndim - value_clip.ndim)
+        elif log_p.ndim < value_clip.ndim:
+            log_p = tt.shape_padleft(log_p, value_clip.ndim - log_p.ndim)
+
+        # Categories first to gather along the leading axis
+        pattern = (log_p.ndim - 1,) + tuple(range(log_p.ndim - 1))
+        log_likelihood = take_along_axis(log_p.dimshuffle(pattern), value_clip)
+
+    else:
+        log_likelihood = log_p[value_clip]
+
+    return bound(log_likelihood, value >= 0, value <= (n_categories - 1))
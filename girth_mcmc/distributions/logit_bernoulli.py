@@ -0,0 +1,96 @@
+import numpy as np
+import theano.tensor as tt
+
+from scipy.special import expit
+from pymc3.theanof import floatX
+from pymc3.distributions.dist_math import bound
+from pymc3.distributions.distribution import (Discrete, draw_values,
+                                              generate_samples)
+
+
+__all__ = ['LogitBernoulli', 'GuessingLogitBernoulli']
+
+
+def _log_add_exp(first, second):
+    """Branch free log(exp(first) + exp(second))."""
+    return tt.maximum(first, second) + tt.nnet.softplus(-abs(first - second))
+
+
+class LogitBernoulli(Discrete):
+    """Dichotomous responses parameterized by the log odds of a correct answer.
+
+    The log likelihood of a response y is
+
+        y * logit_p - softplus(logit_p)
+
+    a single elementwise expression over the kernel. Theano fuses it, and
+    its gradient y - invlogit(logit_p), into one loop over the
+    [n_items, n_participants] matrix without a probability tensor, and
+    it stays finite for extreme abilities in float32.
+    """
+
+    def __init__(self, logit_p, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.logit_p = logit_p = tt.as_tensor_variable(floatX(logit_p))
+        self.mode = tt.cast(tt.ge(logit_p, 0), 'int8')
+
+    def random(self, point=None, size=None):
+        """Draws dichotomous responses at the log odds."""
+        logit_p = draw_values([self.logit_p], point=point, size=size)[0]
+
+        return generate_samples(lambda logit_p, size=None:
+                                    np.random.binomial(1, expit(logit_p), size),
+                                logit_p, dist_shape=self.shape, size=size)
+
+    def logp(self, value):
+        """Log probability of the responses in a single fused pass."""
+        logit_p = self.logit_p
+        value = tt.cast(value, logit_p.dtype)
+
+        return value * logit_p - tt.nnet.softplus(logit_p)
+
+
+class GuessingLogitBernoulli(Discrete):
+    """Dichotomous responses with a lower asymptote (the 3PL likelihood).
+
+    The probability of a correct answer c + (1 - c) * invlogit(logit_p)
+    equals (c + exp(logit_p)) / (1 + exp(logit_p)), so the log likelihood
+    of a response y is
+
+        y * logsumexp(log(c), logit_p) + (1 - y) * log(1 - c) - softplus(logit_p)
+
+    again a single fused elementwise pass that never forms the probabilities.
+    Guessing outside [0, 1) is checked once, not at every response.
+    """
+
+    def __init__(self, logit_p, guessing, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.logit_p = logit_p = tt.as_tensor_variable(floatX(logit_p))
+        self.guessing = guessing = tt.as_tensor_variable(floatX(guessing))
+        self.mode = tt.cast(tt.ge(guessing + (1 - guessing) * tt.nnet.sigmoid(logit_p),
+                                  0.5), 'int8')
+
+    def random(self, point=None, size=None):
+        """Draws dichotomous responses at the log odds and guessing."""
+        logit_p, guessing = draw_values([self.logit_p, self.guessing],
+                                        point=point, size=size)
+
+        def _random(logit_p, guessing, size=None):
+            probability = guessing + (1 - guessing) * expit(logit_p)
+            return np.random.binomial(1, probability, size)
+
+        return generate_samples(_random, logit_p, guessing,
+                                dist_shape=self.shape, size=size)
+
+    def logp(self, value):
+        """Log probability of the responses in a single fused pass."""
+        logit_p = self.logit_p
+        guessing = self.guessing
+        value = tt.cast(value, logit_p.dtype)
+
+        log_likelihood = (value * _log_add_exp(tt.log(guessing), logit_p)
+                          + (1 - value) * tt.log1p(-guessing)
+                          - tt.nnet.softplus(logit_p))
+
+        return bound(log_likelihood, tt.all(guessing >= 0), tt.all(guessing < 1),
+                     broadcast_conditions=False)
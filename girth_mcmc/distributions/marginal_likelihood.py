@@ -0,0 +1,106 @@
+import numpy as np
+import pymc3 as pm
+import theano.tensor as tt
+
+from pymc3.math import logsumexp
+from pymc3.theanof import floatX
+
+
+__all__ = ['marginal_log_joint', 'marginal_log_likelihood', 'marginal_eap',
+           'marginal_posterior_variance', 'minibatch_marginal_likelihood']
+
+
+def marginal_log_joint(log_probabilities, one_hot, weights):
+    """Log joint probability of every response pattern at every quadrature point.
+
+    Args:
+        log_probabilities: [n_items, n_categories, n_quadrature] tensor of 
+                           log probabilities evaluated at the quadrature nodes
+        one_hot: [n_participants, n_items * n_categories] response indicators
+        weights: [n_quadrature] normalized quadrature weights
+
+    Returns:
+        log_joint: [n_participants, n_quadrature] tensor
+    """
+    n_quadrature = weights.shape[0]
+    log_probabilities = log_probabilities.reshape((-1, n_quadrature))
+
+    return (tt.dot(floatX(one_hot), log_probabilities) 
+            + tt.log(floatX(weights))[None, :])
+
+
+def marginal_log_likelihood(log_joint):
+    """Marginal log likelihood of every participant.
+
+    Args:
+        log_joint: [n_participants, n_quadrature] tensor from marginal_log_joint
+
+    Returns:
+        log_likelihood: [n_participants] tensor
+    """
+    return logsumexp(log_joint, axis=1)[:, 0]
+
+
+def marginal_eap(log_joint, nodes):
+    """Expected a posteriori ability of every participant.
+
+    Args:
+        log_joint: [n_participants, n_quadrature] tensor from marginal_log_joint
+        nodes: [n_quadrature] location of the quadrature points
+
+    Returns:
+        ability: [n_participants] tensor
+    """
+    posterior = tt.exp(log_joint - logsumexp(log_joint, axis=1))
+
+    return tt.dot(posterior, floatX(nodes))
+
+
+def marginal_posterior_variance(log_joint, nodes):
+    """Posterior variance of the ability of every participant.
+
+    Args:
+        log_joint: [n_participants, n_quadrature] tensor from marginal_log_joint
+        nodes: [n_quadrature] location of the quadrature points
+
+    Returns:
+        variance: [n_participants] tensor
+    """
+    posterior = tt.exp(log_joint - logsumexp(log_joint, axis=1))
+    ability = tt.dot(posterior, floatX(nodes))
+
+    return tt.dot(posterior, floatX(nodes ** 2)) - ability ** 2
+
+
+def minibatch_marginal_likelihood(log_probabilities, one_hot, weights, minibatch_size,
+                                  pattern_weights=None):
+    """Marginal log likelihood of a random minibatch of participants.
+
+    A new minibatch is drawn at every evaluation and scaled up to the full
+    dataset, an unbiased estimate for stochastic variational inference.
+
+    Args:
+        log_probabilities: [n_items, n_categories, n_quadrature] tensor of 
+                           log probabilities evaluated at the quadrature nodes
+        one_hot: [n_participants, n_items * n_categories] response indicators
+        weights: [n_quadrature] normalized quadrature weights
+        minibatch_size: (int) number of participants in a minibatch
+        pattern_weights: [n_participants] frequency weight of each response 
+                         pattern, the likelihood is unweighted when None
+
+    Returns:
+        log_likelihood: scalar tensor
+    """
+    n_people = one_hot.shape[0]
+
+    if pattern_weights is None:
+        pattern_weights = np.ones(n_people)
+
+    # Responses and weights share the minibatch indices, an explicit
+    # in_memory_size avoids indexing with [Ellipsis] on newer numpy
+    batch = pm.Minibatch(floatX(np.column_stack([one_hot, pattern_weights])),
+                         batch_size=minibatch_size, in_memory_size=n_people)
+    log_joint = marginal_log_joint(log_probabilities, batch[:, :-1], weights)
+
+    return (tt.dot(marginal_log_likelihood(log_joint), batch[:, -1]) 
+            * n_people / minibatch_size)
@@ -1,12 +1,14 @@
 import numpy as np
 import theano.tensor as tt
 
-from theano.tensor.nnet import softmax
 from theano.tensor.extra_ops import cumsum
+from pymc3.math import logsumexp
 from pymc3.theanof import floatX
 
 from pymc3.distributions.discrete import Categorical
 
+from .log_probabilities import categorical_log_likelihood
+
 
 __all__ = ['PartialCredit']
 
@@ -14,18 +16,30 @@ __all__ = ['PartialCredit']
 class PartialCredit(Categorical):
     """Computed the probability for the partial credit model given a set of
     cutpoints and observations.
+
+    The cutpoints are broadcast against eta along the leading axes, so
+    a [n_items, 1, n_levels] set of cutpoints with a [n_items, n_participants]
+    eta evaluates every item in a single node. The log probabilities are
+    kept as the log-softmax of the kernel in self.log_p and the likelihood
+    is read from them directly.
     """
 
     def __init__(self, eta, cutpoints, *args, **kwargs):
         eta = tt.as_tensor_variable(floatX(eta))
+        cutpoints = tt.as_tensor_variable(cutpoints)
         cutpoints = tt.concatenate(
             [
-                tt.as_tensor_variable([0.0]),
-                tt.as_tensor_variable(cutpoints)
-            ])
-        cutpoints = tt.shape_padaxis(cutpoints, 0)
-        eta = tt.shape_padaxis(eta, 1)
+                tt.zeros_like(cutpoints[..., :1]),
+                cutpoints
+            ], axis=-1)
+        eta = tt.shape_padright(eta)
+
+        kernel = cumsum(eta - cutpoints, axis=-1)
+        log_p = kernel - logsumexp(kernel, axis=-1)
 
-        p = softmax(cumsum(eta - cutpoints, axis=1))
+        super().__init__(p=tt.exp(log_p), *args, **kwargs)
+        self.log_p = log_p
 
-        super().__init__(p=p, *args, **kwargs)
+    def logp(self, value):
+        """Log probability of the responses from the log-softmax of the kernel."""
+        return categorical_log_likelihood(self.log_p, value)
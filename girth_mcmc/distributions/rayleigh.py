@@ -1,13 +1,16 @@
 import numpy as np
 
 import pymc3 as pm
+import theano
 import theano.tensor as tt
 
+from pymc3.theanof import floatX
 from pymc3.distributions.distribution import draw_values, generate_samples
 from pymc3.distributions.dist_math import bound
+from pymc3.distributions.transforms import ElemwiseTransform
 
 
-__all__ = ['Rayleigh']
+__all__ = ['Rayleigh', 'ShiftedRayleigh', 'LogOffset']
 
 
 class Rayleigh(pm.distributions.Weibull):
@@ -59,7 +62,9 @@ class Rayleigh(pm.distributions.Weibull):
         """
         alpha = self.alpha
         beta = self.beta
-        value_ = pm.math.maximum(value - self.offset, 1e-313)
+        # Smallest normal number of the model precision, 1e-313 is zero in float32
+        tiny = np.finfo(theano.config.floatX).tiny
+        value_ = pm.math.maximum(value - self.offset, tiny)
         return bound(
             tt.log(alpha)
             - tt.log(beta)
@@ -68,4 +73,75 @@ class Rayleigh(pm.distributions.Weibull):
             value_ >= 0,
             alpha > 0,
             beta > 0,
-        )    
\ No newline at end of file
+        )
+
+
+class LogOffset(ElemwiseTransform):
+    """Maps a variable above a fixed offset to the real line with log(x - offset)."""
+    name = "log_offset"
+
+    def __init__(self, offset):
+        """Constructor class for the log offset transform.
+
+        Args:
+            offset: (float) lower limit of the variable
+        """
+        self.offset = offset
+
+    def backward(self, value):
+        return tt.exp(value) + self.offset
+
+    def forward(self, value):
+        return tt.log(value - self.offset)
+
+    def forward_val(self, value, point=None):
+        return np.log(value - self.offset)
+
+    def jacobian_det(self, value):
+        return value
+
+
+class ShiftedRayleigh(pm.Continuous):
+    """Rayleigh distribution starting at a fixed offset.
+
+    Sampled on log(value - offset) with its own transform instead of
+    pm.Bound, the log probability of x = value - offset
+
+        log(x) - 2 log(beta) - x ** 2 / (2 beta ** 2)
+
+    is smooth on the whole support so NUTS keeps large step sizes.
+    """
+
+    def __init__(self, beta, offset=0, *args, **kwargs):
+        """Constructor class for the shifted Rayleigh distribution.
+
+        Args:
+            beta: scale parameter that controls the shape of the distribution
+            offset: (float) begining of the rayleigh distribution
+        """
+        kwargs.setdefault('transform', LogOffset(offset))
+        super().__init__(*args, **kwargs)
+
+        self.beta = beta = tt.as_tensor_variable(floatX(beta))
+        self.offset = offset
+        self.mode = offset + beta
+        self.median = offset + beta * np.sqrt(2 * np.log(2))
+        self.mean = offset + beta * np.sqrt(np.pi / 2)
+
+    def random(self, point=None, size=None):
+        """Draws random values from the shifted Rayleigh distribution."""
+        beta = draw_values([self.beta], point=point, size=size)[0]
+
+        def _random(b, size=None):
+            return b * np.sqrt(-2 * np.log(np.random.uniform(size=size))) + self.offset
+
+        return generate_samples(_random, beta, dist_shape=self.shape, size=size)
+
+    def logp(self, value):
+        """Log probability of the shifted Rayleigh distribution."""
+        beta = self.beta
+        distance = value - self.offset
+
+        return bound(tt.log(distance) - 2 * tt.log(beta) 
+                     - 0.5 * tt.sqr(distance / beta),
+                     distance > 0, beta > 0)
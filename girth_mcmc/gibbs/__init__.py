@@ -0,0 +1 @@
+from .normal_ogive import *
\ No newline at end of file
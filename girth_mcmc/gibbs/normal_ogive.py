@@ -0,0 +1,254 @@
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+
+__all__ = ["rasch_gibbs", "onepl_gibbs", "twopl_gibbs"]
+
+
+# Scaling between the logistic and normal ogive metrics
+LOGISTIC_SCALE = 1.702
+
+# Lower bound of the discrimination, same as the pymc models
+DISCRIMINATION_OFFSET = 0.25
+
+# Inverse gamma (shape, rate) priors on the variance hyper-parameters
+DIFFICULTY_PRIOR = (1.0, 1.0)
+RAYLEIGH_PRIOR = (6.0, 5.0)
+
+
+# Standardized bound past which the inverse cdf loses the tail
+TAIL_BOUND = 5.0
+
+
+def _exponential_tail(bound, rng):
+    """Standard normal draws truncated to (bound, inf) far in the tail.
+
+    Rejection sampler with a translated exponential proposal (Robert, 1995),
+    the acceptance rate grows toward one as the bound increases.
+    """
+    rate = 0.5 * (bound + np.sqrt(np.square(bound) + 4))
+    draws = np.empty_like(bound)
+
+    pending = np.arange(bound.size)
+    while pending.size:
+        proposal = bound[pending] + rng.exponential(size=pending.size) / rate[pending]
+        accept = (rng.random(pending.size) <= 
+                  np.exp(-0.5 * np.square(proposal - rate[pending])))
+
+        draws[pending[accept]] = proposal[accept]
+        pending = pending[~accept]
+
+    return draws
+
+
+def _lower_truncated_normal(mean, sigma, lower, rng):
+    """Draws from a normal distribution truncated to (lower, inf).
+
+    Bounds up to TAIL_BOUND standard deviations above the mean invert the 
+    cdf, further bounds are drawn from the exponential tail sampler.
+    """
+    mean, sigma, lower = np.broadcast_arrays(mean, sigma, lower)
+    bound = (lower - mean) / sigma
+    tail = bound > TAIL_BOUND
+
+    uniform = 1.0 - rng.random(bound.shape)
+    standardized = np.array(-ndtri(uniform * ndtr(-np.where(tail, 0., bound))))
+
+    if tail.any():
+        standardized[tail] = _exponential_tail(bound[tail], rng)
+
+    return mean + sigma * standardized
+
+
+def _inverse_gamma(shape, rate, rng):
+    """Draws from an inverse gamma distribution."""
+    return rate / rng.gamma(shape)
+
+
+def _sample_augmented(kernel, signs, missing, rng):
+    """Draws the latent normal responses given the kernel (Albert, 1992).
+
+    Observed cells are truncated to the side of zero given by the response,
+    missing cells are drawn from the untruncated normal.
+    """
+    latent = signs * _lower_truncated_normal(signs * kernel, 1.0, 0.0, rng)
+
+    if missing is not None:
+        latent[missing] = kernel[missing] + rng.standard_normal(missing.sum())
+
+    return latent
+
+
+def _sample_ability(latent, alpha, difficulty, rng):
+    """Draws the abilities given the latent responses."""
+    precision = 1.0 + np.square(alpha).sum()
+    mean = alpha @ (latent + (alpha * difficulty)[:, None]) / precision
+
+    return mean + rng.standard_normal(mean.shape) / np.sqrt(precision)
+
+
+def _sample_difficulty(latent, alpha, ability, sigma_difficulty, rng):
+    """Draws the difficulties given the latent responses and abilities."""
+    n_people = latent.shape[1]
+    residual = (latent - np.outer(alpha, ability)).sum(axis=1)
+
+    precision = n_people * np.square(alpha) + 1.0 / np.square(sigma_difficulty)
+    mean = -alpha * residual / precision
+
+    return mean + rng.standard_normal(mean.shape) / np.sqrt(precision)
+
+
+def _sample_discrimination(latent, ability, difficulty, discrimination, 
+                           rayleigh_scale, rng, axis=None):
+    """Draws the (logistic) discrimination with a shifted rayleigh prior.
+
+    The rayleigh prior contributes a linear term to the conditional density, 
+    which is handled with a uniform auxiliary variable so the conditional 
+    remains a truncated normal.
+    """
+    design = (ability[None, :] - difficulty[:, None]) / LOGISTIC_SCALE
+
+    data_precision = np.square(design).sum(axis=axis)
+    data_mean = (design * latent).sum(axis=axis) / data_precision
+
+    precision = data_precision + 1.0 / np.square(rayleigh_scale)
+    mean = data_precision * (data_mean - DISCRIMINATION_OFFSET) / precision
+
+    auxiliary = rng.random(np.shape(mean)) * (discrimination - DISCRIMINATION_OFFSET)
+    shifted = _lower_truncated_normal(mean, 1.0 / np.sqrt(precision), 
+                                      auxiliary, rng)
+
+    return shifted + DISCRIMINATION_OFFSET
+
+
+def _sample_rayleigh_scale(discrimination, rng):
+    """Draws the rayleigh scale given the discrimination parameters."""
+    shifted = np.atleast_1d(discrimination) - DISCRIMINATION_OFFSET
+    shape = RAYLEIGH_PRIOR[0] + shifted.size
+    rate = RAYLEIGH_PRIOR[1] + 0.5 * np.square(shifted).sum()
+
+    return np.sqrt(_inverse_gamma(shape, rate, rng))
+
+
+def _sample_difficulty_sd(difficulty, rng):
+    """Draws the difficulty standard deviation given the difficulties."""
+    shape = DIFFICULTY_PRIOR[0] + 0.5 * difficulty.size
+    rate = DIFFICULTY_PRIOR[1] + 0.5 * np.square(difficulty).sum()
+
+    return np.sqrt(_inverse_gamma(shape, rate, rng))
+
+
+def _normal_ogive_gibbs(dataset, n_samples, n_tune, seed, discrimination_type):
+    """Runs the data augmented gibbs sampler for the normal ogive models.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+        n_samples: (int) number of estimation samples
+        n_tune: (int) number of "burn-in" samples to run
+        seed: seed for the random number generator
+        discrimination_type: (string) one of ['fixed', 'common', 'item']
+
+    Returns:
+        trace: dictionary of parameter draws
+    """
+    rng = np.random.default_rng(seed)
+    n_items, n_people = dataset.shape
+
+    missing = np.ma.getmaskarray(dataset)
+    missing = missing if missing.any() else None
+    signs = 2.0 * np.ma.filled(dataset, 0).astype('int') - 1.0
+
+    # Start values
+    ability = np.zeros(n_people)
+    difficulty = np.zeros(n_items)
+    sigma_difficulty = 1.0
+    rayleigh_scale = 1.0
+    discrimination = np.ones(n_items if discrimination_type == 'item' else 1)
+
+    trace = {'Ability': np.zeros((n_samples, n_people)),
+             'Difficulty': np.zeros((n_samples, n_items)),
+             'Difficulty_SD': np.zeros((n_samples, 1))}
+
+    if discrimination_type != 'fixed':
+        trace['Discrimination'] = np.zeros((n_samples, discrimination.size))
+        trace['Rayleigh_Scale'] = np.zeros((n_samples, 1))
+    
+    axis = 1 if discrimination_type == 'item' else None
+
+    for ndx in range(n_tune + n_samples):
+        alpha = np.broadcast_to(discrimination / LOGISTIC_SCALE, (n_items,))
+        kernel = alpha[:, None] * (ability[None, :] - difficulty[:, None])
+
+        latent = _sample_augmented(kernel, signs, missing, rng)
+        ability = _sample_ability(latent, alpha, difficulty, rng)
+        difficulty = _sample_difficulty(latent, alpha, ability, 
+                                        sigma_difficulty, rng)
+        sigma_difficulty = _sample_difficulty_sd(difficulty, rng)
+
+        if discrimination_type != 'fixed':
+            discrimination = _sample_discrimination(latent, ability, difficulty, 
+                                                    discrimination, rayleigh_scale,
+                                                    rng, axis=axis)
+            discrimination = np.atleast_1d(discrimination)
+            rayleigh_scale = _sample_rayleigh_scale(discrimination, rng)
+
+        # Store the draws after burn-in
+        draw = ndx - n_tune
+        if draw >= 0:
+            trace['Ability'][draw] = ability
+            trace['Difficulty'][draw] = difficulty
+            trace['Difficulty_SD'][draw] = sigma_difficulty
+
+            if discrimination_type != 'fixed':
+                trace['Discrimination'][draw] = discrimination
+                trace['Rayleigh_Scale'][draw] = rayleigh_scale
+
+    if discrimination_type == 'common':
+        trace['Discrimination'] = trace['Discrimination'][:, 0]
+
+    return trace
+
+
+def rasch_gibbs(dataset, n_samples=10000, n_tune=2500, seed=None):
+    """Runs the gibbs sampler for normal ogive Rasch estimation.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+        n_samples: (int) number of estimation samples
+        n_tune: (int) number of "burn-in" samples to run
+        seed: seed for the random number generator
+
+    Returns:
+        trace: dictionary of parameter draws, same keys as the pymc model
+    """
+    return _normal_ogive_gibbs(dataset, n_samples, n_tune, seed, 'fixed')
+
+
+def onepl_gibbs(dataset, n_samples=10000, n_tune=2500, seed=None):
+    """Runs the gibbs sampler for normal ogive one parameter estimation.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+        n_samples: (int) number of estimation samples
+        n_tune: (int) number of "burn-in" samples to run
+        seed: seed for the random number generator
+
+    Returns:
+        trace: dictionary of parameter draws, same keys as the pymc model
+    """
+    return _normal_ogive_gibbs(dataset, n_samples, n_tune, seed, 'common')
+
+
+def twopl_gibbs(dataset, n_samples=10000, n_tune=2500, seed=None):
+    """Runs the gibbs sampler for normal ogive two parameter estimation.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+        n_samples: (int) number of estimation samples
+        n_tune: (int) number of "burn-in" samples to run
+        seed: seed for the random number generator
+
+    Returns:
+        trace: dictionary of parameter draws, same keys as the pymc model
+    """
+    return _normal_ogive_gibbs(dataset, n_samples, n_tune, seed, 'item')
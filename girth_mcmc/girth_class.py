@@ -1,25 +1,76 @@
+import cProfile
+import pstats
+import time
+import traceback
+import warnings
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
 import numpy as np
 
 import pymc3 as pm
+from pymc3.step_methods.hmc.quadpotential import QuadPotentialDiagAdapt
+from pymc3.theanof import floatX
+from pymc3.util import is_transformed_name, update_start_vals
+from theano import shared
+from theano.configparser import change_flags
 
-from girth_mcmc.utils import validate_mcmc_options
+from girth_mcmc.utils import (validate_mcmc_options, collapse_response_patterns,
+                              ModelCache, PhaseTimer, cpu_time, LongFormatResponses,
+                              shard_participants, select_participants,
+                              consensus_draws, warm_start_values, 
+                              ConvergenceMonitor, available_cpus,
+                              resolve_parallelism, limit_threads, ResultCache,
+                              container_values, has_missing_responses, 
+                              observed_cells, one_hot_responses)
 from girth_mcmc.dichotomous import (
-    rasch_model, rasch_parameters,
-    onepl_model, onepl_parameters,
-    twopl_model, twopl_parameters,
+    rasch_model, rasch_parameters, rasch_initial_guess,
+    onepl_model, onepl_parameters, onepl_initial_guess,
+    twopl_model, twopl_parameters, twopl_initial_guess,
     multidimensional_twopl_model, multidimensional_twopl_parameters,
     multidimensional_twopl_initial_guess, threepl_model,
-    threepl_parameters)
+    threepl_parameters, threepl_initial_guess)
 
 from girth_mcmc.polytomous import (
     graded_response_model, 
     graded_response_parameters,
+    graded_response_initial_guess,
     multidimensional_graded_model,
     multidimensional_graded_parameters,
     partial_credit_model,
+    partial_credit_initial_guess,
     multidimensional_credit_model
     )
 
+from girth_mcmc.gibbs import rasch_gibbs, onepl_gibbs, twopl_gibbs
+from girth_mcmc.backends import (PosteriorSummary, streaming_multitrace,
+                                 memmap_multitrace)
+
+
+# Compiled models shared between instances, sized by model_cache_size
+_MODEL_TEMPLATES = ModelCache()
+
+# Compiled models kept by every batch worker when the cache is disabled
+_BATCH_CACHE_SIZE = 4
+
+
+@contextmanager
+def _restore_global_random_state(active=True):
+    """Restores numpy's global generator, pymc3 seeds it with random_seed.
+
+    Args:
+        active: (boolean) restore the state on exit, unseeded runs keep 
+                the advanced generator so repeated fits differ
+    """
+    state = np.random.get_state() if active else None
+    try:
+        yield
+
+    finally:
+        if state is not None:
+            np.random.set_state(state)
+
 
 class GirthMCMC(object):
     """GIRTH MCMC class to run estimation models using PyMC3.
@@ -34,13 +85,103 @@ class GirthMCMC(object):
         options: (dict) mcmc options dictionary
     
     Options:
-        * n_processors: (int) number of processors
-        * n_tune: number of "burn-in" samples to run 
-        * n_samples: number of estimation samples
-        * initial_guess: (boolean) use initial estimate in multidimensional
-                         methods
+        * n_processors: (int) number of worker processes, 'auto' picks the
+                        workers, chains and threads from the physical
+                        cores and the size of the dataset
+        * n_chains: (int) number of chains, n_processors when None
+        * n_threads: (int) BLAS / OpenMP threads in every worker
+        * n_tune: number of "burn-in" samples to run in every chain
+        * n_samples: number of estimation samples across all chains
+        * initial_guess: (boolean) start the sampler at classical estimates
+                         of the parameters instead of the prior
+        * store_kernel: (boolean) store the probability kernel of dichotomous
+                        models for every draw, use pl_kernel() to recompute
+                        it from the parameter draws otherwise
+        * engine: (string) ['pymc', 'gibbs'] sampling backend, the gibbs 
+                  engine is a vectorized normal ogive sampler for 
+                  'Rasch', '1PL' and '2PL'
+        * marginal_ability: (boolean) integrate ability out of the likelihood
+                            with a quadrature grid for '2PL', '3PL', 'GRM' 
+                            and 'PCM', abilities are recovered with an 
+                            expected a posteriori step after sampling
+        * quadrature_points: (int) number of quadrature points
+        * collapse_patterns: (boolean) fit the unique response patterns with
+                             frequency weights, requires marginal_ability,
+                             abilities are expanded back to every participant
+        * model_cache_size: (int) number of compiled model templates kept
+                            across runs, datasets of the same shape are
+                            swapped into a cached template instead of
+                            rebuilding and recompiling the model
+        * streaming_summary: (boolean) accumulate posterior means, standard
+                             deviations and quantiles while sampling, the
+                             results gain a 'Posterior SD' dictionary and
+                             the full summary is stored in self.summary
+        * keep_draws: (boolean) store the raw draws when streaming, set to
+                      False to summarize with constant memory
+        * summary_quantiles: (tuple) probabilities of the streamed quantiles
+        * trace_backend: (string) ['memory', 'memmap'] storage of the draws,
+                         memmap writes every chain to .npy files that are 
+                         read back in chunks by the parameter functions
+        * trace_directory: (string) folder of the memmap draws, a temporary
+                           folder removed with the trace when None
+        * profile: (string) [None, 'cprofile', 'theano'] profile stored in
+                   self.profile after each call, a pstats.Stats of the whole
+                   call or theano ProfileStats of the log-likelihood and
+                   its gradient
+        * minibatch_size: (int) number of participants in each variational
+                          iteration, requires variational_inference and
+                          marginal_ability
+        * learning_rate: (float) initial step size of the adam optimizer
+                         for variational inference
+        * learning_rate_decay: (float) the step size at iteration t is
+                               learning_rate / (1 + t) ** learning_rate_decay
+        * n_shards: (int) split the participants into shards fitted in 
+                    separate processes, each shard raises the prior of the
+                    item parameters to the power 1 / n_shards and the item
+                    draws are combined with consensus Monte Carlo
+        * shard_executor: executor with a map method running the shards,
+                          e.g. a concurrent.futures or dask executor, a 
+                          local process pool is used when None
+        * adaptive_stopping: (boolean) check the item parameters every
+                             block_size draws and stop once the split R-hat
+                             and bulk / tail ESS meet target_rhat and 
+                             target_ess, n_samples is the most draws taken
+        * target_rhat: (float) largest split R-hat of any item parameter
+        * target_ess: (int) smallest bulk and tail ESS of any item parameter
+        * block_size: (int) number of draws in each chain between checks
+        * time_budget: (float) seconds of sampling after which the draws 
+                       collected so far are returned
+        * result_cache: (string) folder of an on-disk cache keyed by the 
+                        dataset, model, options, sampler arguments and 
+                        package versions, only fits with an integer 
+                        random_seed are cached, a cached fit is returned 
+                        without sampling, self.trace holds the cached draws 
+                        or None
+        * result_cache_size: (float) largest size of the cache in megabytes
+        * cache_traces: (boolean) store the compressed draws in the cache
+        * precision: (string) ['float64', 'float32'] floating point type the
+                     pymc models are built, compiled and sampled in, 
+                     float32 halves the memory traffic of the likelihood
+
+    Attributes:
+        timings: wall time, CPU time and process peak memory at the end of 
+                 every phase of the last call ('result_cache', 'build_model', 
+                 'initial_guess', 'profile', 'compile', 'tune', 'sample', 
+                 'fit', 'summarize')
+        phase_hooks: list of callables run at the end of every phase as
+                     hook(phase_name, timing)
+        parallelism: chains, worker processes and threads per worker of
+                     the last call ('n_chains', 'n_cores', 'n_threads')
+        diagnostics: convergence diagnostics of every checked block of the
+                     last call with adaptive_stopping or a time_budget, a
+                     list of dictionaries with n_draws (per chain), rhat, 
+                     ess_bulk, ess_tail, converged and wall_time
 
     Notes:
+        Responses can be passed as LongFormatResponses (participant, item, 
+        response triplets) to build the likelihood without the dense array,
+        the probability kernel is then never stored
+
         'GRM' requires setting the number of levels
         '2PL_md' requires setting the number of factors
         'GRM_md' and 'PCM_md' require setting the number of categories and factors
@@ -54,12 +195,14 @@ class GirthMCMC(object):
         # Trace Model, Parameters Extraction, Initial guess
         model_parameters = {
             # Unidimensional Models
-            'rasch': (rasch_model, rasch_parameters, None),
-            '1pl': (onepl_model, onepl_parameters, None),
-            '2pl': (twopl_model, twopl_parameters, None),
-            '3pl': (threepl_model, threepl_parameters, None),
-            'grm': (graded_response_model, graded_response_parameters, None),
-            'pcm': (partial_credit_model, graded_response_parameters, None),
+            'rasch': (rasch_model, rasch_parameters, rasch_initial_guess),
+            '1pl': (onepl_model, onepl_parameters, onepl_initial_guess),
+            '2pl': (twopl_model, twopl_parameters, twopl_initial_guess),
+            '3pl': (threepl_model, threepl_parameters, threepl_initial_guess),
+            'grm': (graded_response_model, graded_response_parameters, 
+                    graded_response_initial_guess),
+            'pcm': (partial_credit_model, graded_response_parameters, 
+                    partial_credit_initial_guess),
 
             # Multidimensional Models
             '2pl_md': (multidimensional_twopl_model, 
@@ -76,13 +219,101 @@ class GirthMCMC(object):
         self.pm_model = model_parameters[0]
         self.return_method = model_parameters[1]
 
+        # Native numpy samplers
+        if self.options['engine'] == 'gibbs':
+            gibbs_samplers = {'rasch': rasch_gibbs, '1pl': onepl_gibbs,
+                              '2pl': twopl_gibbs}
+
+            if self.model not in gibbs_samplers:
+                raise AssertionError(f"Gibbs engine is not available for "
+                                     f"model {model}.")
+            
+            self.gibbs_sampler = gibbs_samplers[self.model]
+
+        # Keyword arguments only supported by dichotomous models
+        self.model_kwargs = dict()
+        if self.model in ['rasch', '1pl', '2pl', '3pl', '2pl_md']:
+            self.model_kwargs['store_kernel'] = self.options['store_kernel']
+
+        if self.options['marginal_ability']:
+            if self.model not in ['2pl', '3pl', 'grm', 'pcm']:
+                raise AssertionError(f"Marginal ability is not available for "
+                                     f"model {model}.")
+            
+            self.model_kwargs['quadrature_points'] = self.options['quadrature_points']
+
+        # Patterns share one weighted likelihood term, only valid once the
+        # ability of each participant is integrated out
+        if self.options['collapse_patterns'] and not self.options['marginal_ability']:
+            raise AssertionError("Pattern collapsing requires marginal_ability.")
+
         if self.options['initial_guess'] and model_parameters[2] is not None:
             self.initial_guess = model_parameters[2]
 
         else:
             self.initial_guess = lambda x, *args: None
 
+        if (self.options['streaming_summary'] and 
+                (self.options['engine'] != 'pymc' or 
+                 self.options['variational_inference'])):
+            raise AssertionError("Streaming summaries are only available "
+                                 "for the pymc MCMC sampler.")
+
+        if self.options['trace_backend'] == 'memmap':
+            if (self.options['engine'] != 'pymc' or 
+                    self.options['variational_inference']):
+                raise AssertionError("Memory mapped traces are only available "
+                                     "for the pymc MCMC sampler.")
+
+            if self.options['streaming_summary']:
+                raise AssertionError("Streaming summaries use their own trace "
+                                     "backend, set trace_backend to 'memory'.")
+
+        if self.options['minibatch_size']:
+            if not (self.options['variational_inference'] and 
+                    self.options['marginal_ability']):
+                raise AssertionError("Minibatches require variational_inference "
+                                     "and marginal_ability.")
+
+            if self.options['model_cache_size'] > 0:
+                raise AssertionError("Minibatched models can't be cached, "
+                                     "set model_cache_size to 0.")
+
+            self.model_kwargs['minibatch_size'] = self.options['minibatch_size']
+
+        if self.options['n_shards'] > 1:
+            if (self.options['engine'] != 'pymc' or self.options['variational_inference'] 
+                    or self.options['streaming_summary'] 
+                    or self.options['trace_backend'] != 'memory'):
+                raise AssertionError("Sharding is only available for the pymc MCMC "
+                                     "sampler with in memory traces.")
+
+        if self.options['adaptive_stopping'] or self.options['time_budget']:
+            if (self.options['engine'] != 'pymc' or self.options['variational_inference'] 
+                    or self.options['streaming_summary'] or self.options['n_shards'] > 1
+                    or self.options['trace_backend'] != 'memory'):
+                raise AssertionError("Adaptive stopping is only available for the "
+                                     "unsharded pymc MCMC sampler with in memory traces.")
+
+        # Instances only grow the shared cache, never evict other templates
+        if self.options['model_cache_size'] > _MODEL_TEMPLATES.max_size:
+            _MODEL_TEMPLATES.resize(self.options['model_cache_size'])
+
         self.trace = None
+        self.built_model = None
+        self.pattern_index = None
+        self.summary = None
+        self.diagnostics = None
+        self.parallelism = None
+
+        # Tempered by the shards of a consensus run
+        self._prior_power = 1.0
+
+        # Instrumentation
+        self.phase_hooks = list()
+        self.timings = dict()
+        self.profile = None
+        self._timer = PhaseTimer()
 
     def build_model(self, dataset):
         """Builds the model to run.
@@ -94,21 +325,201 @@ class GirthMCMC(object):
                 pymc_model: model ready to run
                 initial_guess: dictionary of start values for sampler
         """
-        if self.model_args:
-            local_model = self.pm_model(dataset, *self.model_args)
-            initial_guess = self.initial_guess(dataset, *self.model_args)
+        model_kwargs = dict(self.model_kwargs)
+        model_args = self.model_args or tuple()
+        self.pattern_index = None
+        responses = dataset
 
-        else:
-            local_model = self.pm_model(dataset)
-            initial_guess = self.initial_guess(dataset)
+        if isinstance(dataset, LongFormatResponses) and 'store_kernel' in model_kwargs:
+            # The dense kernel defeats the sparse input
+            model_kwargs['store_kernel'] = False
+
+        with self._timer.phase('build_model'):
+            if self.options['collapse_patterns']:
+                # Fit the unique response patterns with frequency weights
+                dataset, counts, self.pattern_index = collapse_response_patterns(dataset)
+                model_kwargs['weights'] = counts
+
+            template_key = None
+            local_model = None
+            if self.options['model_cache_size'] > 0:
+                template_key = self._template_key(dataset, model_kwargs)
+                local_model = _MODEL_TEMPLATES.get(template_key)
+
+            if local_model is None:
+                local_model = self.pm_model(dataset, *model_args, **model_kwargs)
+
+                if self._prior_power != 1:
+                    self._temper_prior(local_model)
+
+                if template_key is not None:
+                    _MODEL_TEMPLATES.put(template_key, local_model)
+
+            else:
+                # Swap the new dataset into the compiled template
+                pm.set_data(self._template_data(dataset, model_kwargs), 
+                            model=local_model)
+
+        with self._timer.phase('initial_guess'):
+            initial_guess = self.initial_guess(responses, *model_args)
+
+            if initial_guess is not None:
+                # Marginal models don't sample the abilities
+                initial_guess = {name: floatX(np.asarray(value)) 
+                                 for name, value in initial_guess.items()
+                                 if name in local_model.named_vars}
 
         return local_model, initial_guess
 
-    def __call__(self, dataset, **kwargs):
+    def _temper_prior(self, local_model):
+        """Raises the prior of the item parameters to self._prior_power."""
+        item_variables = [variable for variable in local_model.free_RVs 
+                          if variable.name != 'Ability']
+
+        with local_model:
+            pm.Potential("Prior_Tempering", (self._prior_power - 1) * 
+                         sum(variable.logp_nojact for variable in item_variables))
+
+    def _template_key(self, dataset, model_kwargs):
+        """Key of the cached template that can hold the dataset.
+
+            Args:
+                dataset: [n_items, n_participants] 2d array of measured responses
+                model_kwargs: keyword arguments of the model function
+
+            Returns:
+                template_key: hashable tuple
+        """
+        # Missing responses change the length of the observed data
+        n_observed = (dataset.count() if isinstance(dataset, LongFormatResponses)
+                      else np.ma.count(dataset))
+        model_options = sorted((name, value) for name, value in model_kwargs.items()
+                               if name != 'weights')
+
+        return (self.model, repr(self.model_args), dataset.shape, n_observed, 
+                repr(model_options), repr(sorted(self.options.items())), 
+                self._prior_power)
+
+    def _template_data(self, dataset, model_kwargs):
+        """Values of the data containers the model builds for a dataset.
+
+            Mirrors the containers of the model functions so a cached 
+            template takes a new dataset without building a model.
+
+            Args:
+                dataset: [n_items, n_participants] 2d array of measured responses
+                model_kwargs: keyword arguments of the model function
+
+            Returns:
+                template_data: dictionary of container names and values
+        """
+        if self.model in ['grm', 'pcm', 'grm_md', 'pcm_md']:
+            observed = dataset - dataset.min()
+            n_categories = self.model_args[0]
+
+        else:
+            observed = dataset.astype('int')
+            n_categories = 2
+
+        if model_kwargs.get('quadrature_points'):
+            template_data = {'Responses': one_hot_responses(observed, n_categories)}
+
+            if model_kwargs.get('weights') is not None:
+                template_data['Pattern_Weights'] = floatX(model_kwargs['weights'])
+
+        elif has_missing_responses(observed):
+            item_index, person_index, responses = observed_cells(observed)
+            template_data = {'Observed': responses, 'Item_Index': item_index,
+                             'Person_Index': person_index}
+
+        else:
+            template_data = {'Observed': observed}
+
+        return {name: container_values(values) 
+                for name, values in template_data.items()}
+
+    def _nuts_step(self, built_model, initial_guess, random_seed=None):
+        """Creates the NUTS step, reusing the compiled step of a cached template.
+
+            Args:
+                built_model: pymc model to sample
+                initial_guess: dictionary of start values for sampler
+                random_seed: (int) seed of the start value jitter
+
+            Returns:
+                start: list of start values for each chain
+                step: NUTS step method
+        """
+        n_chains = self.parallelism['n_chains']
+        step = getattr(built_model, 'cached_step', None)
+
+        if step is None:
+            start, step = pm.init_nuts(init='jitter+adapt_diag', chains=n_chains,
+                                       random_seed=random_seed, model=built_model)
+
+            if self.options['model_cache_size'] > 0:
+                built_model.cached_step = step
+
+        else:
+            # Same jitter as the default initialization
+            random_state = np.random.RandomState(random_seed)
+            start = [{name: floatX(value + random_state.uniform(-1, 1, np.shape(value)))
+                      for name, value in built_model.test_point.items()}
+                     for _ in range(n_chains)]
+
+        if initial_guess is not None:
+            start = initial_guess
+
+        return start, step
+
+    def _warm_start_step(self, built_model, initial_guess, warm_start, 
+                         random_seed=None):
+        """Starts NUTS at a previous posterior and adapts from its variance.
+
+            Args:
+                built_model: pymc model to sample
+                initial_guess: dictionary of start values for sampler
+                warm_start: results dictionary or trace of a previous run
+                random_seed: (int) seed of the start value jitter
+
+            Returns:
+                start: list of start values for each chain
+                step: NUTS step method
+        """
+        values, variance = warm_start_values(built_model, warm_start)
+
+        point = dict(values)
+        update_start_vals(point, initial_guess or dict(), built_model)
+        update_start_vals(point, built_model.test_point, built_model)
+        point = {name: point[name] for name in built_model.test_point}
+
+        # Chains are spread over the previous posterior, unmatched 
+        # variables get the default jitter and unit variance
+        scale = {name: np.sqrt(variance[name]) if name in variance 
+                 else 0 if name in values else 1 for name in point}
+        random_state = np.random.RandomState(random_seed)
+        start = [{name: floatX(value + scale[name] * 
+                               random_state.uniform(-1, 1, np.shape(value)))
+                  for name, value in point.items()}
+                 for _ in range(self.parallelism['n_chains'])]
+
+        diagonal = {name: variance.get(name, np.ones_like(value)) 
+                    for name, value in point.items()}
+        potential = QuadPotentialDiagAdapt(built_model.ndim, 
+                                           built_model.dict_to_array(point),
+                                           built_model.dict_to_array(diagonal), 10)
+
+        return start, pm.NUTS(potential=potential, model=built_model)
+
+    def __call__(self, dataset, warm_start=None, **kwargs):
         """Begins the MCMC sampling process.
         
         Args:
             dataset: [n_items, n_participants] 2d array of measured responses
+                     or LongFormatResponses
+            warm_start: results dictionary or trace of a previous run, the
+                        sampler starts at the previous posterior and tunes
+                        from its variance so a shorter n_tune suffices
             kwargs: any named arguments passed to the trace, 
                     for variational methods, use 'inf_kwargs' to pass
                     arguments to fit function i.e. inf_kwargs={'jitter': 1}
@@ -116,31 +527,606 @@ class GirthMCMC(object):
         Returns:
             results_dictionary: dictionary of mean a posterori item values
         """
+        self._timer = PhaseTimer(self.phase_hooks)
+        self.timings = self._timer.timings
+        self.profile = None
+
+        # Warm starts depend on a previous fit that isn't part of the key,
+        # unseeded fits are random draws that must not be replayed
+        cache = None
+        if (self.options['result_cache'] is not None and warm_start is None 
+                and isinstance(kwargs.get('random_seed'), int)):
+            with self._timer.phase('result_cache'):
+                cache = ResultCache(self.options['result_cache'], 
+                                    self.options['result_cache_size'])
+                cache_key = cache.key(dataset, self.model, self.model_args, 
+                                      self.options, kwargs)
+                results, draws = cache.get(cache_key)
+
+            if results is not None:
+                self.trace = draws
+                self.built_model = None
+                self.pattern_index = None
+                self.summary = None
+                return results
+
+        self.parallelism = resolve_parallelism(self.options, dataset.shape)
+
+        if (self.options['adaptive_stopping'] and 
+                self.parallelism['n_chains'] > self.parallelism['n_cores']):
+            raise AssertionError("Adaptive stopping needs every chain sampled "
+                                 "at once, set n_chains <= n_processors.")
+
+        # Every tensor of the model is built and compiled in the precision
+        with limit_threads(self.parallelism['n_threads']), \
+                change_flags(floatX=self.options['precision']):
+            if self.options['profile'] == 'cprofile':
+                profiler = cProfile.Profile()
+                results = profiler.runcall(self._run, dataset, warm_start, **kwargs)
+                self.profile = pstats.Stats(profiler)
+
+            else:
+                results = self._run(dataset, warm_start, **kwargs)
+
+        if cache is not None:
+            with self._timer.phase('result_cache'):
+                cache.put(cache_key, results, 
+                          self._trace_draws() if self.options['cache_traces'] else None)
+
+        return results
+
+    def _trace_draws(self):
+        """Draws of the stored trace as a dictionary of arrays, None if not kept."""
+        if isinstance(self.trace, dict):
+            return self.trace
+
+        if self.summary is not None and not self.options['keep_draws']:
+            return None
+
+        return {name: self.trace.get_values(name) for name in self.trace.varnames
+                if not is_transformed_name(name)}
+
+    def _run(self, dataset, warm_start=None, **kwargs):
+        """Runs the estimation, see __call__."""
+        if isinstance(dataset, LongFormatResponses):
+            self._validate_long_format()
+
+        if self.options['n_shards'] > 1:
+            return self._run_sharded(dataset, warm_start, **kwargs)
+
+        if self.options['engine'] == 'gibbs':
+            if warm_start is not None:
+                raise AssertionError("Warm starts are only available for "
+                                     "the pymc engine.")
+
+            with self._timer.phase('sample'):
+                trace = self.gibbs_sampler(dataset, 
+                                           n_samples=self.options['n_samples'],
+                                           n_tune=self.options['n_tune'],
+                                           seed=kwargs.get('random_seed'))
+            self.trace = trace
+            self.built_model = None
+
+            with self._timer.phase('summarize'):
+                return self.return_method(trace)
+
         # Run the sampling
         built_model, initial_guess = self.build_model(dataset)
+        self.summary = None
+
+        if warm_start is not None and self.options['variational_inference']:
+            initial_guess = dict(initial_guess or dict())
+            initial_guess.update(warm_start_values(built_model, warm_start)[0])
+
+        if self.options['profile'] == 'theano':
+            with self._timer.phase('profile'):
+                gradient = pm.gradient(built_model.logpt, built_model.cont_vars)
+                self.profile = {'logp': built_model.profile(built_model.logpt, n=100),
+                                'dlogp': built_model.profile(gradient, n=100)}
 
         # Run the Model
         if self.options['variational_inference']:
             with built_model:
-                result = pm.fit(method=self.options['variational_model'],
-                                start=initial_guess,
-                                n=self.options['variational_samples'], **kwargs)
+                with self._timer.phase('fit'):
+                    result = pm.fit(method=self.options['variational_model'],
+                                    start=initial_guess,
+                                    n=self.options['variational_samples'], 
+                                    **self._optimizer_kwargs(kwargs))
             
-            trace = result.sample(self.options['n_samples'])
+            with self._timer.phase('sample'):
+                trace = result.sample(self.options['n_samples'])
 
         else: #MCMC Sampler
-            n_tune = self.options['n_tune'] // self.options['n_processors']
-            n_samples = self.options['n_samples'] // self.options['n_processors']
+            n_chains = self.parallelism['n_chains']
+            n_tune = self.options['n_tune']
+            n_samples = self.options['n_samples'] // n_chains
 
-            with built_model:
-                trace = pm.sample(n_samples, tune=n_tune,
-                                chains=self.options['n_processors'], 
-                                cores=self.options['n_processors'],
-                                start=initial_guess,
+            seed = kwargs.get('random_seed')
+            seed = seed if isinstance(seed, int) else None
+
+            with built_model, _restore_global_random_state(seed is not None):
+                start, step = initial_guess, None
+
+                # Compile the sampler outside of pm.sample to time it
+                if not (built_model.disc_vars or 'init' in kwargs or 'step' in kwargs):
+                    with self._timer.phase('compile'):
+                        if warm_start is None:
+                            start, step = self._nuts_step(built_model, initial_guess, 
+                                                          seed)
+                        
+                        else:
+                            start, step = self._warm_start_step(built_model, 
+                                                                initial_guess, 
+                                                                warm_start, seed)
+
+                if self.options['streaming_summary']:
+                    kwargs = self._streaming_kwargs(built_model, n_tune, kwargs)
+
+                elif self.options['trace_backend'] == 'memmap':
+                    kwargs = dict(kwargs)
+                    kwargs['trace'] = memmap_multitrace(n_chains, 
+                                                        self.options['trace_directory'], 
+                                                        built_model)
+
+                monitor = None
+                if self.options['adaptive_stopping'] or self.options['time_budget']:
+                    monitor, kwargs = self._stopping_kwargs(built_model, n_samples, kwargs)
+
+                kwargs = self._timing_kwargs(kwargs)
+                trace = pm.sample(n_samples, tune=n_tune, step=step,
+                                chains=n_chains, 
+                                cores=self.parallelism['n_cores'],
+                                start=start,
                                 return_inferencedata=False, **kwargs)
+                self._record_sampling()
+
+                # Sequential chains after an early stop are dropped
+                if monitor is not None and trace.nchains < n_chains:
+                    warnings.warn(f"Sampling stopped with {trace.nchains} of {n_chains} "
+                                  "chains, the R-hat can't compare chains. Raise "
+                                  "n_processors to run every chain at once.", 
+                                  RuntimeWarning)
+
+                # Diagnostics of the returned draws
+                if monitor is not None and (not monitor.history or 
+                                            monitor.history[-1]['n_draws'] != monitor.n_draws):
+                    monitor.check()
         
         # store the trace
         self.trace = trace
+        self.built_model = built_model
+
+        with self._timer.phase('summarize'):
+            return self._summarize(trace)
+
+    def _run_sharded(self, dataset, warm_start=None, **kwargs):
+        """Fits shards of participants and combines the item draws."""
+        n_shards = self.options['n_shards']
+        seed = kwargs.get('random_seed')
+        seed = seed if isinstance(seed, int) else None
+
+        # Shards must agree on the lowest response category
+        dataset = dataset - dataset.min()
+        shards = shard_participants(dataset.shape[1], n_shards, seed)
+
+        # Shards keep the parallelism resolved for the whole dataset
+        shard_options = dict(self.options, n_shards=1, shard_executor=None,
+                             model_cache_size=0, 
+                             n_processors=self.parallelism['n_cores'],
+                             n_chains=self.parallelism['n_chains'],
+                             n_threads=self.parallelism['n_threads'])
+        arguments = list()
+        for ndx, index in enumerate(shards):
+            shard_kwargs = dict(kwargs, warm_start=warm_start)
+            if seed is not None:
+                shard_kwargs['random_seed'] = seed + ndx
+
+            # Every shard must identify every item
+            shard_data = select_participants(dataset, index)
+            item_counts = np.bincount(observed_cells(shard_data)[0], 
+                                      minlength=dataset.shape[0])
+            if index.size == 0 or np.any(item_counts == 0):
+                raise ValueError(f"Shard {ndx} has {index.size} participants and no "
+                                 f"responses to {np.sum(item_counts == 0)} items, "
+                                 f"use fewer shards than {n_shards}.")
+
+            arguments.append((self.model, self.model_args, shard_options,
+                              shard_data, 1 / n_shards, shard_kwargs))
+
+        with self._timer.phase('sample'):
+            executor = self.options['shard_executor']
+            if executor is None:
+                n_workers = min(max(available_cpus() // self.parallelism['n_cores'], 1), 
+                                n_shards)
+                with ProcessPoolExecutor(n_workers, mp_context=get_context('spawn')) as pool:
+                    shard_results = list(pool.map(_fit_shard, arguments))
+
+            else:
+                shard_results = list(executor.map(_fit_shard, arguments))
+
+        with self._timer.phase('summarize'):
+            trace = {name: consensus_draws([result['draws'][name] 
+                                            for result in shard_results])
+                     for name in shard_results[0]['draws']}
+
+            # Averaging can break the ordering of the graded thresholds
+            if self.model in ['grm', 'grm_md']:
+                trace['Thresholds'] = np.sort(trace['Thresholds'], axis=-1)
+
+            # Abilities are local to every shard
+            ability = np.concatenate([result['ability'] for result in shard_results])
+            ability[np.concatenate(shards)] = ability.copy()
+            trace['Ability'] = (ability.T if ability.ndim == 2 else ability)[None]
+
+            self.trace = trace
+            self.built_model = None
+            self.pattern_index = None
+
+            return self.return_method(trace)
+
+    def fit_many(self, datasets, n_workers=None, executor=None, **kwargs):
+        """Fits the model to many independent datasets in worker processes.
+
+        Datasets of the same shape are queued together so every worker 
+        reuses its compiled models, results are yielded as the fits finish
+        and a failed fit is reported without stopping the batch.
+
+        Args:
+            datasets: dictionary of keys and datasets or a list of datasets
+            n_workers: (int) number of worker processes, the available cpus 
+                       divided by the processes of every fit when None
+            executor: concurrent.futures executor running the fits, a local
+                      process pool is used when None
+            kwargs: named arguments passed to every fit, an integer 
+                    random_seed is offset by the position of the dataset
+
+        Yields:
+            fit_result: dictionary with the 'key' of the dataset, the 
+                        'results' dictionary and 'timings' of the fit, and 
+                        the 'error' traceback, results and timings are None 
+                        for failed fits and error is None otherwise
+        """
+        if not isinstance(datasets, dict):
+            datasets = dict(enumerate(datasets))
+
+        if not datasets:
+            return
+
+        seed = kwargs.get('random_seed')
+        seed = seed if isinstance(seed, int) else None
+
+        options = dict(self.options, shard_executor=None)
+        if options['model_cache_size'] == 0 and not options['minibatch_size']:
+            options['model_cache_size'] = _BATCH_CACHE_SIZE
+
+        arguments = list()
+        for ndx, (key, dataset) in enumerate(datasets.items()):
+            fit_kwargs = dict(kwargs)
+            if seed is not None:
+                fit_kwargs['random_seed'] = seed + ndx
+
+            arguments.append((key, self.model, self.model_args, options, 
+                              dataset, fit_kwargs))
+
+        arguments.sort(key=lambda argument: np.shape(argument[4]))
+
+        if executor is not None:
+            yield from _stream_fits(executor, arguments)
+            return
+
+        if n_workers is None:
+            n_cores = resolve_parallelism(self.options, np.shape(arguments[-1][4]))['n_cores']
+            n_workers = min(max(available_cpus() // n_cores, 1), len(arguments))
+
+        with ProcessPoolExecutor(n_workers, mp_context=get_context('spawn')) as pool:
+            yield from _stream_fits(pool, arguments)
+
+    def _validate_long_format(self):
+        """Checks the options support long format responses."""
+        if self.options['engine'] == 'gibbs':
+            raise AssertionError("Long format responses are only available "
+                                 "for the pymc engine.")
+
+        if self.options['marginal_ability'] or self.options['collapse_patterns']:
+            raise AssertionError("Marginal ability and pattern collapsing need "
+                                 "the dense responses, use to_masked().")
+
+        if self.options['initial_guess'] and self.model in ['2pl_md', 'grm_md', 'pcm_md']:
+            raise AssertionError("The multidimensional initial guess needs the "
+                                 "dense responses, set initial_guess to False.")
+
+    def _summarize(self, trace):
+        """Posterior summary of the stored trace."""
+        built_model = self.built_model
+
+        if self.summary is not None:
+            trace = self.summary.mean_trace()
+
+        # Expected a posteriori abilities from the marginal models
+        elif self.options['marginal_ability']:
+            trace = {name: trace[name] for name in trace.varnames}
+            trace['Ability'] = self._posterior_mean(built_model.ability_eap)[None, :]
+
+        results = self.return_method(trace)
+
+        if self.summary is not None:
+            posterior_sd = {name: self.summary.sd(name) 
+                            for name in self.summary.varnames 
+                            if name != 'Ability_Variance'}
+
+            # Law of total variance, the spread of the expected a posteriori
+            # abilities plus their average posterior variance
+            if self.options['marginal_ability']:
+                posterior_sd['Ability'] = np.sqrt(
+                    np.square(posterior_sd['Ability']) 
+                    + self.summary.mean('Ability_Variance'))
+
+            results['Posterior SD'] = posterior_sd
+
+        # Expand the response patterns back to every participant
+        if self.pattern_index is not None:
+            results['Ability'] = results['Ability'][self.pattern_index]
+
+            if self.summary is not None:
+                posterior_sd = results['Posterior SD']
+                posterior_sd['Ability'] = posterior_sd['Ability'][self.pattern_index]
 
         # Return the values
-        return self.return_method(trace)
\ No newline at end of file
+        return results
+
+    def _optimizer_kwargs(self, kwargs):
+        """Adds the adam optimizer and its learning rate schedule to the fit."""
+        if self.options['learning_rate'] is None or 'obj_optimizer' in kwargs:
+            return kwargs
+
+        initial_rate = self.options['learning_rate']
+        decay = self.options['learning_rate_decay']
+        learning_rate = shared(floatX(initial_rate))
+
+        def schedule(approximation, losses, iteration):
+            learning_rate.set_value(floatX(initial_rate / (1 + iteration) ** decay))
+
+        kwargs = dict(kwargs)
+        kwargs['obj_optimizer'] = pm.adam(learning_rate=learning_rate)
+        kwargs['callbacks'] = list(kwargs.get('callbacks', [])) + [schedule]
+
+        return kwargs
+
+    def _timing_kwargs(self, kwargs):
+        """Adds a sampler callback marking the end of the tuning draws."""
+        user_callback = kwargs.get('callback')
+        self._sampling_marks = [(time.perf_counter(), cpu_time())]
+
+        def callback(trace, draw):
+            if not draw.tuning and len(self._sampling_marks) == 1:
+                self._sampling_marks.append((time.perf_counter(), cpu_time()))
+
+            if user_callback is not None:
+                user_callback(trace=trace, draw=draw)
+
+        kwargs = dict(kwargs)
+        kwargs['callback'] = callback
+
+        return kwargs
+
+    def _record_sampling(self):
+        """Splits the sampling time into the tuning and sampling phases."""
+        marks = self._sampling_marks + [(time.perf_counter(), cpu_time())]
+        
+        # Tuning ends at the first post tuning draw of any chain
+        if len(marks) == 3:
+            self._timer.record('tune', marks[1][0] - marks[0][0], 
+                               marks[1][1] - marks[0][1])
+
+        self._timer.record('sample', marks[-1][0] - marks[-2][0], 
+                           marks[-1][1] - marks[-2][1])
+
+    def _stopping_kwargs(self, built_model, n_samples, kwargs):
+        """Adds a sampler callback that stops once the item parameters converge.
+
+            Args:
+                built_model: pymc model to sample
+                n_samples: largest number of draws in each chain
+                kwargs: named arguments passed to the sampler
+
+            Returns:
+                monitor: ConvergenceMonitor collecting the item parameter draws
+                kwargs: updated named arguments
+        """
+        # Ranks are unchanged by the transforms, the free variables are checked
+        varnames = [variable.name for variable in built_model.free_RVs
+                    if variable.name != 'Ability']
+        monitor = ConvergenceMonitor(varnames, self.parallelism['n_chains'], n_samples,
+                                     self.options['target_rhat'], 
+                                     self.options['target_ess'],
+                                     self.options['block_size'])
+        self.diagnostics = monitor.history
+
+        adaptive_stopping = self.options['adaptive_stopping']
+        time_budget = self.options['time_budget']
+        user_callback = kwargs.get('callback')
+        start_time = time.perf_counter()
+
+        def callback(trace, draw):
+            if user_callback is not None:
+                user_callback(trace=trace, draw=draw)
+
+            if draw.tuning:
+                return
+
+            converged = monitor.update(draw.chain, draw.point)
+            out_of_time = (time_budget is not None and 
+                           time.perf_counter() - start_time > time_budget)
+
+            # pymc3 returns the draws collected when interrupted
+            if (adaptive_stopping and converged) or out_of_time:
+                raise KeyboardInterrupt
+
+        kwargs = dict(kwargs)
+        kwargs['callback'] = callback
+
+        return monitor, kwargs
+
+    def _streaming_kwargs(self, built_model, n_tune, kwargs):
+        """Adds a streaming summary trace to the sampler arguments.
+
+            Args:
+                built_model: pymc model to sample
+                n_tune: number of tuning draws in each chain
+                kwargs: named arguments passed to the sampler
+
+            Returns:
+                kwargs: updated named arguments
+        """
+        self.summary = PosteriorSummary(self.options['summary_quantiles'])
+
+        # Untransformed variables and the marginal abilities
+        tensors = {variable.name: variable for variable in built_model.unobserved_RVs
+                   if not is_transformed_name(variable.name)}
+        
+        # Per draw posterior variance completes the ability uncertainty
+        if self.options['marginal_ability']:
+            tensors['Ability'] = built_model.ability_eap
+            tensors['Ability_Variance'] = built_model.ability_variance
+
+        kwargs = dict(kwargs)
+        kwargs['trace'] = streaming_multitrace(self.summary, tensors, 
+                                               self.parallelism['n_chains'], n_tune,
+                                               self.options['keep_draws'], built_model)
+
+        # Convergence checks need the raw draws
+        if not self.options['keep_draws']:
+            kwargs['compute_convergence_checks'] = False
+
+        return kwargs
+
+    def pl_kernel(self, draw_index=None):
+        """Recomputes the probability kernel from the stored parameter draws.
+
+        Args:
+            draw_index: (int) index of the draw to compute the kernel, 
+                        if None the posterior mean of the kernel is computed
+                        one draw at a time
+        
+        Returns:
+            kernel: [n_items, n_participants] 2d array of probabilities
+        """
+        if self.trace is None:
+            raise AssertionError("Run the model before computing the kernel.")
+
+        if self.summary is not None and not self.options['keep_draws']:
+            raise AssertionError("Raw draws were not kept by the streaming summary.")
+
+        if not hasattr(self.built_model, 'pl_kernel'):
+            raise AssertionError(f"Model {self.model} does not define a "
+                                 "probability kernel.")
+
+        if draw_index is not None:
+            kernel_function = self._point_function(self.built_model.pl_kernel)
+            return kernel_function(self.trace.point(draw_index))
+
+        return self._posterior_mean(self.built_model.pl_kernel)
+
+    def _point_function(self, tensor):
+        """Compiles a model tensor into a function of a trace point."""
+        free_names = [variable.name for variable in self.built_model.free_RVs]
+        compiled_function = self.built_model.fastfn(tensor)
+
+        def point_function(point):
+            return compiled_function({name: point[name] for name in free_names})
+        
+        return point_function
+
+    def _posterior_mean(self, tensor):
+        """Posterior mean of a model tensor evaluated at every stored draw."""
+        point_function = self._point_function(tensor)
+
+        # Running mean avoids holding every draw in memory
+        posterior_mean = 0
+        n_draws = 0
+        for chain in self.trace.chains:
+            for ndx in range(len(self.trace)):
+                n_draws += 1
+                tensor_draw = point_function(self.trace.point(ndx, chain))
+                posterior_mean += (tensor_draw - posterior_mean) / n_draws
+
+        return posterior_mean
+
+
+def _fit_shard(arguments):
+    """Fits one shard of a consensus run in a worker.
+
+    Args:
+        arguments: tuple of (model, model_args, options, dataset, 
+                   prior_power, kwargs)
+
+    Returns:
+        shard_result: dictionary with the item parameter 'draws' and 
+                      the posterior mean 'ability' of the shard
+    """
+    model, model_args, options, dataset, prior_power, kwargs = arguments
+
+    girth_model = GirthMCMC(model=model, model_args=model_args, options=options)
+    girth_model._prior_power = prior_power
+    results = girth_model(dataset, **kwargs)
+
+    item_names = [variable.name for variable in girth_model.built_model.unobserved_RVs
+                  if not is_transformed_name(variable.name) 
+                  and variable.name not in ['Ability', 'PL_Kernel']]
+
+    return {'draws': {name: girth_model.trace[name] for name in item_names},
+            'ability': results['Ability']}
+
+
+def _fit_dataset(arguments):
+    """Fits one dataset of a batch in a worker.
+
+    Args:
+        arguments: tuple of (key, model, model_args, options, dataset, kwargs)
+
+    Returns:
+        fit_result: dictionary with the key, results, timings and error
+    """
+    key, model, model_args, options, dataset, kwargs = arguments
+
+    try:
+        girth_model = GirthMCMC(model=model, model_args=model_args, options=options)
+        results = girth_model(dataset, **kwargs)
+
+    except Exception:
+        return {'key': key, 'results': None, 'timings': None, 
+                'error': traceback.format_exc()}
+
+    return {'key': key, 'results': results, 'timings': girth_model.timings, 
+            'error': None}
+
+
+def _stream_fits(executor, arguments):
+    """Yields the batch fits in the order they finish.
+
+    Args:
+        executor: concurrent.futures executor running the fits
+        arguments: list of the arguments of _fit_dataset
+
+    Yields:
+        fit_result: dictionary with the key, results, timings and error
+    """
+    futures = {executor.submit(_fit_dataset, argument): argument[0]
+               for argument in arguments}
+
+    try:
+        for future in as_completed(futures):
+            # A worker that died takes its fit down with it, not the batch
+            try:
+                fit_result = future.result()
+
+            except Exception:
+                fit_result = {'key': futures[future], 'results': None, 
+                              'timings': None, 'error': traceback.format_exc()}
+
+            yield fit_result
+
+    finally:
+        # Closing the generator early drops the queued fits
+        for future in futures:
+            future.cancel()
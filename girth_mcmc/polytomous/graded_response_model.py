@@ -1,18 +1,35 @@
 import pymc3 as pm
-from numpy import linspace, zeros, unique
+from numpy import linspace, maximum
+from pymc3.theanof import floatX
 
-from girth_mcmc.distributions import Rayleigh
+from girth_mcmc.utils import (gauss_hermite_quadrature, one_hot_responses,
+                              data_container, posterior_mean, observed_log_likelihood,
+                              has_missing_responses, classical_test_statistics,
+                              classical_discrimination, classical_thresholds)
+from girth_mcmc.distributions import (GradedResponse, ShiftedRayleigh, 
+                                      marginal_log_joint, marginal_log_likelihood, 
+                                      marginal_eap, marginal_posterior_variance, 
+                                      minibatch_marginal_likelihood)
 
 
-__all__ = ["graded_response_model", "graded_response_parameters"]
+__all__ = ["graded_response_model", "graded_response_parameters",
+           "graded_response_initial_guess"]
 
 
-def graded_response_model(dataset, n_categories):
+def graded_response_model(dataset, n_categories, quadrature_points=None, weights=None,
+                          minibatch_size=None):
     """Defines the mcmc model for the graded response model.
     
     Args:
         dataset: [n_items, n_participants] 2d array of measured responses
         n_categories: number of polytomous values (i.e. Number of Likert Levels)
+        quadrature_points: (int) integrate ability out of the likelihood 
+                           with this many quadrature points, abilities are
+                           sampled when None
+        weights: [n_participants] frequency weight of each response pattern,
+                 needs quadrature_points
+        minibatch_size: (int) estimate the marginal likelihood from random
+                        minibatches of participants, needs quadrature_points
 
     Returns:
         model: PyMC3 model to run
@@ -30,24 +47,65 @@ def graded_response_model(dataset, n_categories):
     graded_mcmc_model = pm.Model()
     
     with graded_mcmc_model:
-        # Ability Parameters
-        ability = pm.Normal("Ability", mu=0, sigma=1, shape=n_people)
-        
         # Discrimination multilevel prior
         rayleigh_scale = pm.Lognormal("Rayleigh_Scale", mu=0, sigma=1/4, shape=1)
-        discrimination = pm.Bound(Rayleigh, lower=0.25)(name='Discrimination', 
-                                  beta=rayleigh_scale, offset=0.25, shape=n_items)
+        discrimination = ShiftedRayleigh('Discrimination', beta=rayleigh_scale, 
+                                         offset=0.25, shape=n_items)
         
         # Threshold multilevel prior
         sigma_difficulty = pm.HalfNormal('Difficulty_SD', sigma=1, shape=1)
-        for ndx in range(n_items):
-            thresholds = pm.Normal(f"Thresholds{ndx}", mu=mu_value, sigma=sigma_difficulty, 
-                                   shape=n_levels, transform=pm.distributions.transforms.ordered)
+        thresholds = pm.Normal("Thresholds", mu=mu_value, sigma=sigma_difficulty, 
+                               shape=(n_items, n_levels), 
+                               transform=pm.distributions.transforms.ordered)
+
+        if quadrature_points:
+            # Integrate ability out on a fixed grid
+            nodes, node_weights = gauss_hermite_quadrature(quadrature_points)
+            kernel = discrimination[:, None] * floatX(nodes)[None, :]
+            log_probabilities = GradedResponse.dist(cutpoints=thresholds[:, None, :], 
+                                                    eta=kernel).log_p
+            log_probabilities = log_probabilities.dimshuffle(0, 2, 1)
+
+            # Compute the marginal log likelihood
+            one_hot = one_hot_responses(observed, n_categories)
+            responses = data_container("Responses", one_hot)
+            log_joint = marginal_log_joint(log_probabilities, responses, node_weights)
+
+            # Random participants at every evaluation scaled to the dataset
+            if minibatch_size:
+                log_marginal = minibatch_marginal_likelihood(log_probabilities, one_hot, 
+                                                             node_weights, minibatch_size, 
+                                                             weights)
+
+            else:
+                log_marginal = marginal_log_likelihood(log_joint)
+
+                if weights is not None:
+                    log_marginal *= data_container("Pattern_Weights", floatX(weights))
+
+            log_likelihood = pm.Potential("Log_Likelihood", log_marginal.sum())
+
+            # Handle to recover abilities from stored draws
+            graded_mcmc_model.ability_eap = marginal_eap(log_joint, nodes)
+            graded_mcmc_model.ability_variance = marginal_posterior_variance(log_joint, nodes)
+
+        else:
+            # Ability Parameters
+            ability = pm.Normal("Ability", mu=0, sigma=1, shape=n_people)
 
             # Compute the log likelihood
-            kernel = discrimination[ndx] * ability
-            probabilities = pm.OrderedLogistic(f'Log_Likelihood{ndx}', cutpoints=thresholds, 
-                                               eta=kernel, observed=observed[ndx])
+            kernel = discrimination[:, None] * ability[None, :]
+            if has_missing_responses(observed):
+                log_likelihood = observed_log_likelihood(
+                    GradedResponse, observed, lambda item, person: 
+                    {'cutpoints': thresholds[item], 
+                     'eta': discrimination[item] * ability[person]})
+
+            else:
+                probabilities = GradedResponse("Log_Likelihood", 
+                                               cutpoints=thresholds[:, None, :], 
+                                               eta=kernel, 
+                                               observed=data_container("Observed", observed))
 
     return graded_mcmc_model
 
@@ -61,17 +119,38 @@ def graded_response_parameters(trace):
     Return:
         return_dictionary: dictionary of found parameters
     """
-    discrimination = trace['Discrimination'].mean(0)
-    n_items = discrimination.shape[0]
-    n_levels = max(map(lambda ndx: trace[f'Thresholds{ndx}'].shape[1], 
-                       range(n_items)))
-    thresholds = zeros((n_items, n_levels))
-    
-    for ndx in range(n_items):
-        thresholds[ndx] = trace[f'Thresholds{ndx}'].mean(0) / discrimination[ndx]
+    discrimination = posterior_mean(trace, 'Discrimination')
+    thresholds = posterior_mean(trace, 'Thresholds') / discrimination[:, None]
     
     return {'Discrimination': discrimination,
             'Difficulty': thresholds, 
-            'Ability': trace['Ability'].mean(0),
-            'Difficulty Sigma': trace['Difficulty_SD'].mean(0),
-            'Rayleigh Scale': trace['Rayleigh_Scale'].mean(0)} 
\ No newline at end of file
+            'Ability': posterior_mean(trace, 'Ability'),
+            'Difficulty Sigma': posterior_mean(trace, 'Difficulty_SD'),
+            'Rayleigh Scale': posterior_mean(trace, 'Rayleigh_Scale')}
+
+
+def graded_response_initial_guess(dataset, n_categories):
+    """Classical estimates to start the sampler.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+        n_categories: number of polytomous values (i.e. Number of Likert Levels)
+
+    Returns:
+        initial_guess: dictionary of start values
+    """
+    proportions, item_rest, ability = classical_test_statistics(dataset, n_categories)
+    discrimination = classical_discrimination(item_rest)
+
+    # Thresholds are on the scale of the kernel
+    thresholds = (discrimination[:, None] * 
+                  classical_thresholds(proportions, discrimination))
+
+    # The ordered transform needs strictly increasing thresholds
+    for ndx in range(1, n_categories - 1):
+        thresholds[:, ndx] = maximum(thresholds[:, ndx], 
+                                     thresholds[:, ndx - 1] + 0.05)
+
+    return {'Discrimination': discrimination,
+            'Thresholds': thresholds,
+            'Ability': ability}
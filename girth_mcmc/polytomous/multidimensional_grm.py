@@ -1,11 +1,14 @@
 import pymc3 as pm
-from numpy import linspace, zeros, unique
+from numpy import linspace, zeros
 
 import theano
 from theano import tensor as tt
 
 from girth.multidimensional import initial_guess_md
-from girth_mcmc.utils import get_discrimination_indices
+from girth_mcmc.utils import (get_discrimination_indices, data_container,
+                              observed_log_likelihood, has_missing_responses,
+                              posterior_mean)
+from girth_mcmc.distributions import GradedResponse
 
 
 __all__= ["multidimensional_graded_model", "multidimensional_graded_parameters"]
@@ -59,14 +62,22 @@ def multidimensional_graded_model(dataset, n_categories, n_factors):
         
         # Threshold multilevel prior
         sigma_difficulty = pm.HalfNormal('Difficulty_SD', sigma=1, shape=1)
-        for ndx in range(n_items):
-            thresholds = pm.Normal(f"Thresholds{ndx}", mu=mu_value, sigma=sigma_difficulty, 
-                                   shape=n_levels, transform=pm.distributions.transforms.ordered)
-
-            # Compute the log likelihood
-            kernel = pm.math.dot(discrimination[ndx], ability)
-            probabilities = pm.OrderedLogistic(f'Log_Likelihood{ndx}', cutpoints=thresholds, 
-                                               eta=kernel, observed=observed[ndx])
+        thresholds = pm.Normal("Thresholds", mu=mu_value, sigma=sigma_difficulty, 
+                               shape=(n_items, n_levels), 
+                               transform=pm.distributions.transforms.ordered)
+
+        # Compute the log likelihood
+        if has_missing_responses(observed):
+            log_likelihood = observed_log_likelihood(
+                GradedResponse, observed, lambda item, person: 
+                {'cutpoints': thresholds[item], 
+                 'eta': (discrimination[item] * ability[:, person].T).sum(axis=1)})
+
+        else:
+            kernel = pm.math.dot(discrimination, ability)
+            probabilities = GradedResponse("Log_Likelihood", cutpoints=thresholds[:, None, :], 
+                                           eta=kernel, 
+                                           observed=data_container("Observed", observed))
 
     return graded_mcmc_model
 
@@ -80,24 +91,18 @@ def multidimensional_graded_parameters(trace):
     Return:
         return_dictionary: dictionary of found parameters
     """
-    n_factors = trace['Diagonal Discrimination'].shape[1]
-    n_constraints = n_factors * (n_factors + 1) / 2 
-
-    n_items = int((trace['Lower Discrimination'].shape[1] + n_constraints) / n_factors)
-    n_levels = max(map(lambda ndx: trace[f'Thresholds{ndx}'].shape[1], 
-                       range(n_items)))
+    thresholds = posterior_mean(trace, 'Thresholds')
+    diagonal_entries = posterior_mean(trace, 'Diagonal Discrimination')
+    n_factors = diagonal_entries.shape[0]
+    n_items = thresholds.shape[0]
 
     diagonal_indices, lower_indices = get_discrimination_indices(n_items, n_factors)
 
     discrimination = zeros((n_items, n_factors))
-    discrimination[lower_indices] = trace['Lower Discrimination'].mean(0)
-    discrimination[diagonal_indices] = trace['Diagonal Discrimination'].mean(0)
-
-    thresholds = zeros((n_items, n_levels))    
-    for ndx in range(n_items):
-        thresholds[ndx] = trace[f'Thresholds{ndx}'].mean(0)
+    discrimination[lower_indices] = posterior_mean(trace, 'Lower Discrimination')
+    discrimination[diagonal_indices] = diagonal_entries
     
     return {'Discrimination': discrimination,
             'Difficulty': thresholds * -1, 
-            'Ability': trace['Ability'].mean(0).T,
-            'Difficulty Sigma': trace['Difficulty_SD'].mean(0)} 
\ No newline at end of file
+            'Ability': posterior_mean(trace, 'Ability').T,
+            'Difficulty Sigma': posterior_mean(trace, 'Difficulty_SD')} 
\ No newline at end of file
@@ -1,11 +1,12 @@
 import pymc3 as pm
-from numpy import linspace, zeros, unique
+from numpy import linspace
 
 import theano
 from theano import tensor as tt
 
 from girth.multidimensional import initial_guess_md
-from girth_mcmc.utils import get_discrimination_indices
+from girth_mcmc.utils import (get_discrimination_indices, data_container,
+                              observed_log_likelihood, has_missing_responses)
 from girth_mcmc.distributions import PartialCredit
 
 
@@ -60,13 +61,20 @@ def multidimensional_credit_model(dataset, n_categories, n_factors):
         
         # Threshold multilevel prior
         sigma_difficulty = pm.HalfNormal('Difficulty_SD', sigma=1, shape=1)
-        for ndx in range(n_items):
-            thresholds = pm.Normal(f"Thresholds{ndx}", mu=mu_value, 
-                                   sigma=sigma_difficulty, shape=n_levels)
-
-            # Compute the log likelihood
-            kernel = pm.math.dot(discrimination[ndx], ability)
-            probabilities = PartialCredit(f'Log_Likelihood{ndx}', cutpoints=thresholds, 
-                                          eta=kernel, observed=observed[ndx])
+        thresholds = pm.Normal("Thresholds", mu=mu_value, 
+                               sigma=sigma_difficulty, shape=(n_items, n_levels))
+
+        # Compute the log likelihood
+        if has_missing_responses(observed):
+            log_likelihood = observed_log_likelihood(
+                PartialCredit, observed, lambda item, person: 
+                {'cutpoints': thresholds[item], 
+                 'eta': (discrimination[item] * ability[:, person].T).sum(axis=1)})
+
+        else:
+            kernel = pm.math.dot(discrimination, ability)
+            probabilities = PartialCredit("Log_Likelihood", cutpoints=thresholds[:, None, :], 
+                                          eta=kernel, 
+                                          observed=data_container("Observed", observed))
 
     return graded_mcmc_model
@@ -1,18 +1,35 @@
 import pymc3 as pm
-from numpy import linspace, zeros, unique
+from numpy import linspace, asarray, bincount
+from pymc3.theanof import floatX
 
-from girth_mcmc.distributions import PartialCredit, Rayleigh
+from girth_mcmc.utils import (gauss_hermite_quadrature, one_hot_responses,
+                              data_container, observed_log_likelihood, 
+                              has_missing_responses, observed_cells,
+                              classical_test_statistics, classical_discrimination,
+                              classical_thresholds)
+from girth_mcmc.distributions import (PartialCredit, ShiftedRayleigh, 
+                                      marginal_log_joint, marginal_log_likelihood, 
+                                      marginal_eap, marginal_posterior_variance, 
+                                      minibatch_marginal_likelihood)
 
 
-__all__ = ["partial_credit_model"]
+__all__ = ["partial_credit_model", "partial_credit_initial_guess"]
 
 
-def partial_credit_model(dataset, n_categories):
+def partial_credit_model(dataset, n_categories, quadrature_points=None, weights=None,
+                         minibatch_size=None):
     """Defines the mcmc model for the partial credit model.
     
     Args:
         dataset: [n_items, n_participants] 2d array of measured responses
         n_categories: number of polytomous values (i.e. Number of Likert Levels)
+        quadrature_points: (int) integrate ability out of the likelihood 
+                           with this many quadrature points, abilities are
+                           sampled when None
+        weights: [n_participants] frequency weight of each response pattern,
+                 needs quadrature_points
+        minibatch_size: (int) estimate the marginal likelihood from random
+                        minibatches of participants, needs quadrature_points
 
     Returns:
         model: PyMC3 model to run
@@ -30,25 +47,108 @@ def partial_credit_model(dataset, n_categories):
     partial_mcmc_model = pm.Model()
     
     with partial_mcmc_model:
-        # Ability Parameters
-        ability = pm.Normal("Ability", mu=0, sigma=1, shape=n_people)
-        
         # Discrimination multilevel prior
         rayleigh_scale = pm.Lognormal("Rayleigh_Scale", mu=0, sigma=1/4, shape=1)
-        discrimination = pm.Bound(Rayleigh, lower=0.25)(name='Discrimination', 
-                                  beta=rayleigh_scale, offset=0.25, shape=n_items)
+        discrimination = ShiftedRayleigh('Discrimination', beta=rayleigh_scale, 
+                                         offset=0.25, shape=n_items)
         
         # Threshold multilevel prior
         sigma_difficulty = pm.HalfNormal('Difficulty_SD', sigma=1, shape=1)
 
         # Possible Unorderd Categories
-        for ndx in range(n_items):
-            thresholds = pm.Normal(f"Thresholds{ndx}", mu=mu_value, 
-                                   sigma=sigma_difficulty, shape=n_levels)
+        thresholds = pm.Normal("Thresholds", mu=mu_value, 
+                               sigma=sigma_difficulty, shape=(n_items, n_levels))
+
+        if quadrature_points:
+            # Integrate ability out on a fixed grid
+            nodes, node_weights = gauss_hermite_quadrature(quadrature_points)
+            kernel = discrimination[:, None] * floatX(nodes)[None, :]
+            log_probabilities = PartialCredit.dist(cutpoints=thresholds[:, None, :], 
+                                                   eta=kernel).log_p
+            log_probabilities = log_probabilities.dimshuffle(0, 2, 1)
+
+            # Compute the marginal log likelihood
+            one_hot = one_hot_responses(observed, n_categories)
+            responses = data_container("Responses", one_hot)
+            log_joint = marginal_log_joint(log_probabilities, responses, node_weights)
+
+            # Random participants at every evaluation scaled to the dataset
+            if minibatch_size:
+                log_marginal = minibatch_marginal_likelihood(log_probabilities, one_hot, 
+                                                             node_weights, minibatch_size, 
+                                                             weights)
+
+            else:
+                log_marginal = marginal_log_likelihood(log_joint)
+
+                if weights is not None:
+                    log_marginal *= data_container("Pattern_Weights", floatX(weights))
+
+            log_likelihood = pm.Potential("Log_Likelihood", log_marginal.sum())
+
+            # Handle to recover abilities from stored draws
+            partial_mcmc_model.ability_eap = marginal_eap(log_joint, nodes)
+            partial_mcmc_model.ability_variance = marginal_posterior_variance(log_joint, nodes)
+
+        else:
+            # Ability Parameters
+            ability = pm.Normal("Ability", mu=0, sigma=1, shape=n_people)
 
             # Compute the log likelihood
-            kernel = discrimination[ndx] * ability
-            probabilities = PartialCredit(f'Log_Likelihood{ndx}', cutpoints=thresholds, 
-                                          eta=kernel, observed=observed[ndx])
+            kernel = discrimination[:, None] * ability[None, :]
+            if has_missing_responses(observed):
+                log_likelihood = observed_log_likelihood(
+                    PartialCredit, observed, lambda item, person: 
+                    {'cutpoints': thresholds[item], 
+                     'eta': discrimination[item] * ability[person]})
+
+            else:
+                probabilities = PartialCredit("Log_Likelihood", 
+                                              cutpoints=thresholds[:, None, :], 
+                                              eta=kernel, 
+                                              observed=data_container("Observed", observed))
+
+    return partial_mcmc_model
+
+
+def partial_credit_initial_guess(dataset, n_categories):
+    """Classical estimates to start the sampler.
+
+    The partial credit thresholds are adjacent-category steps, each step
+    is set from the participants in the two categories it separates so
+    the steps are not required to be ordered.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+        n_categories: number of polytomous values (i.e. Number of Likert Levels)
+
+    Returns:
+        initial_guess: dictionary of start values
+    """
+    n_items = dataset.shape[0]
+    _, item_rest, ability = classical_test_statistics(dataset, n_categories)
+    discrimination = classical_discrimination(item_rest)
+
+    # Run through 0, K - 1
+    item_index, person_index, responses = observed_cells(dataset)
+    responses = asarray(responses, dtype=int)
+    cells = item_index * n_categories + responses - responses.min()
+
+    # Smoothed counts and ability totals of every category
+    counts = bincount(cells, minlength=n_items * n_categories) + 0.5
+    counts = counts.reshape(n_items, n_categories)
+    ability_total = bincount(cells, ability[person_index], n_items * n_categories)
+    ability_total = ability_total.reshape(n_items, n_categories)
+
+    # Upper category proportion and mean ability of adjacent categories
+    pair_counts = counts[:, :-1] + counts[:, 1:]
+    proportions = counts[:, 1:] / pair_counts
+    center = (ability_total[:, :-1] + ability_total[:, 1:]) / pair_counts
+
+    # Thresholds are on the scale of the kernel
+    thresholds = discrimination[:, None] * (
+        center + classical_thresholds(proportions, discrimination))
 
-    return partial_mcmc_model
\ No newline at end of file
+    return {'Discrimination': discrimination,
+            'Thresholds': thresholds,
+            'Ability': ability}
@@ -0,0 +1 @@
+from .ability_scoring import *
\ No newline at end of file
@@ -0,0 +1,230 @@
+import numpy as np
+from scipy.special import expit
+
+from girth_mcmc.utils import (gauss_hermite_quadrature, product_grid_quadrature,
+                              one_hot_responses)
+
+
+__all__ = ["score_abilities"]
+
+
+# Largest participants x quadrature points block evaluated at once
+_BLOCK_SIZE = 2 ** 16
+
+
+def _item_parameters(parameters):
+    """Converts a parameter dictionary into slopes, intercepts and guessing.
+
+    Every supported model is written as cumulative logistic curves
+    sigmoid(slopes @ theta + intercepts) with a lower asymptote.
+    """
+    difficulty = np.asarray(parameters['Difficulty'], dtype=float)
+    discrimination = np.asarray(parameters.get('Discrimination', 1.0), dtype=float)
+    n_items = difficulty.shape[0]
+
+    if difficulty.ndim == 1:
+        difficulty = difficulty[:, None]
+
+    if discrimination.ndim == 2:
+        # Multidimensional models add the 'difficulty' to the kernel
+        slopes = discrimination
+        intercepts = difficulty
+
+    else:
+        slopes = np.broadcast_to(discrimination, (n_items,))[:, None]
+        intercepts = -slopes * difficulty
+
+    guessing = np.broadcast_to(np.asarray(parameters.get('Guessing', 0.0), 
+                                          dtype=float), (n_items,))
+
+    if intercepts.shape[1] > 1 and np.any(guessing):
+        raise AssertionError("Guessing is only valid for dichotomous items")
+
+    return slopes, intercepts, guessing
+
+
+def _category_probabilities(theta, slopes, intercepts, guessing):
+    """Probabilities of every category and their derivatives.
+
+    Args:
+        theta: [n_points, n_factors] abilities to evaluate
+        slopes: [n_items, n_factors] discrimination parameters
+        intercepts: [n_items, n_categories - 1] cumulative intercepts
+        guessing: [n_items] lower asymptotes
+
+    Returns:
+        probabilities: [n_items, n_categories, n_points] probabilities
+        derivatives: [n_items, n_categories, n_points] derivatives with
+                     respect to slopes @ theta
+    """
+    kernel = slopes @ theta.T
+    logistic = expit(kernel[:, None, :] + intercepts[:, :, None])
+
+    scale = (1 - guessing)[:, None, None]
+    cumulative = guessing[:, None, None] + scale * logistic
+    derivative = scale * logistic * (1 - logistic)
+
+    ones = np.ones_like(kernel)[:, None, :]
+    zeros = np.zeros_like(kernel)[:, None, :]
+    cumulative = np.concatenate([ones, cumulative, zeros], axis=1)
+    derivative = np.concatenate([zeros, derivative, zeros], axis=1)
+
+    return (cumulative[:, :-1] - cumulative[:, 1:], 
+            derivative[:, :-1] - derivative[:, 1:])
+
+
+def _maximum_a_posteriori(theta, one_hot, slopes, intercepts, guessing, 
+                          max_iteration=25, tolerance=1e-6):
+    """Fisher scoring of the posterior mode with a standard normal prior.
+
+    Returns:
+        theta: [n_people, n_factors] posterior modes
+        information: [n_people, n_factors, n_factors] posterior information
+    """
+    n_items, n_factors = slopes.shape
+    one_hot = one_hot.reshape(one_hot.shape[0], n_items, -1)
+    valid = one_hot.any(axis=2)
+    identity = np.eye(n_factors)
+
+    for _ in range(max_iteration):
+        probabilities, derivatives = _category_probabilities(theta, slopes, 
+                                                             intercepts, guessing)
+        probabilities = np.clip(probabilities, 1e-16, None)
+
+        # Score and expected information of the kernel of every item
+        score = np.einsum('pik,ikp->pi', one_hot, derivatives / probabilities)
+        expected = (np.square(derivatives) / probabilities).sum(axis=1).T * valid
+        
+        gradient = score @ slopes - theta
+        information = np.einsum('pi,if,ig->pfg', expected, slopes, slopes) + identity
+
+        step = np.linalg.solve(information, gradient[..., None])[..., 0]
+        theta = theta + step
+
+        if np.abs(step).max() < tolerance:
+            break
+
+    return theta, information
+
+
+def _adaptive_posterior_moments(one_hot, slopes, intercepts, guessing, grid_points):
+    """Posterior mean and variance on a product grid adapted to every participant.
+
+    The grid of positive Gauss-Hermite weights is centered at the posterior
+    mode and scaled by the inverse posterior information, so a few points
+    per dimension resolve a narrow posterior anywhere in the ability space.
+
+    Returns:
+        ability: [n_people, n_factors] posterior means
+        variance: [n_people, n_factors] posterior variances
+    """
+    n_items, n_factors = slopes.shape
+    n_people = one_hot.shape[0]
+    n_categories = intercepts.shape[1] + 1
+
+    mode, information = _maximum_a_posteriori(np.zeros((n_people, n_factors)), 
+                                              one_hot, slopes, intercepts, guessing)
+    cholesky = np.linalg.cholesky(np.linalg.inv(information))
+    nodes, weights = product_grid_quadrature(n_factors, grid_points)
+
+    # Standard normal weight of the grid is replaced by prior x likelihood
+    log_weights = np.log(weights) + 0.5 * np.square(nodes).sum(axis=1)
+
+    ability = np.zeros((n_people, n_factors))
+    variance = np.zeros_like(ability)
+    block_size = max(_BLOCK_SIZE // nodes.shape[0], 1)
+    for start in range(0, n_people, block_size):
+        block = slice(start, start + block_size)
+        theta = mode[block, None] + np.einsum('pfg,ng->pnf', cholesky[block], nodes)
+        n_block = theta.shape[0]
+
+        probabilities, _ = _category_probabilities(theta.reshape(-1, n_factors), slopes, 
+                                                   intercepts, guessing)
+        log_probabilities = np.log(np.clip(probabilities, 1e-16, None))
+        log_likelihood = np.einsum('pik,ikpn->pn', 
+                                   one_hot[block].reshape(n_block, n_items, n_categories),
+                                   log_probabilities.reshape(n_items, n_categories, 
+                                                             n_block, -1))
+
+        log_posterior = (log_weights + log_likelihood 
+                         - 0.5 * np.square(theta).sum(axis=2))
+        posterior = np.exp(log_posterior - log_posterior.max(axis=1, keepdims=True))
+        posterior /= posterior.sum(axis=1, keepdims=True)
+
+        ability[block] = np.einsum('pn,pnf->pf', posterior, theta)
+        variance[block] = (np.einsum('pn,pnf->pf', posterior, np.square(theta)) 
+                           - np.square(ability[block]))
+
+    return ability, variance
+
+
+def score_abilities(dataset, parameters, method='EAP', quadrature_points=41,
+                    grid_points=9, first_category=None):
+    """Scores new participants against calibrated item parameters.
+
+    Supports the dictionaries returned by the rasch, 1PL, 2PL, 3PL, graded
+    response and the multidimensional 2PL / graded response models. The
+    abilities have a standard normal prior.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of responses, missing 
+                 values can be tagged with a masked array
+        parameters: dictionary of item parameters from a calibration
+        method: (string) 'EAP' or 'MAP' estimate of the ability
+        quadrature_points: (int) quadrature points of unidimensional models
+        grid_points: (int) quadrature points in every dimension of the adaptive
+                     product grid of multidimensional models
+        first_category: (int) response of the lowest category, defaults to 
+                        0 for dichotomous and 1 for polytomous items
+
+    Returns:
+        abilities: dictionary with the 'Ability' estimates and 'Ability SD' 
+                   posterior standard deviations, multidimensional abilities 
+                   are [n_participants, n_factors]
+    """
+    if method.upper() not in ['EAP', 'MAP']:
+        raise AssertionError("method must be 'EAP' or 'MAP'")
+
+    slopes, intercepts, guessing = _item_parameters(parameters)
+    n_items, n_factors = slopes.shape
+    n_categories = intercepts.shape[1] + 1
+
+    if dataset.shape[0] != n_items:
+        raise AssertionError("dataset and parameters have different number of items")
+
+    if first_category is None:
+        first_category = 0 if n_categories == 2 else 1
+
+    one_hot = one_hot_responses(dataset - first_category, n_categories).astype(float)
+
+    if n_factors == 1:
+        nodes, weights = gauss_hermite_quadrature(quadrature_points)
+        nodes = nodes[:, None]
+
+        # Posterior weight of the quadrature points
+        probabilities, _ = _category_probabilities(nodes, slopes, intercepts, guessing)
+        log_probabilities = np.log(np.clip(probabilities, 1e-16, None))
+        log_likelihood = one_hot @ log_probabilities.reshape(-1, nodes.shape[0])
+        
+        posterior = weights * np.exp(log_likelihood 
+                                     - log_likelihood.max(axis=1, keepdims=True))
+        posterior /= posterior.sum(axis=1, keepdims=True)
+
+        ability = posterior @ nodes
+        variance = posterior @ np.square(nodes) - np.square(ability)
+
+    else:
+        ability, variance = _adaptive_posterior_moments(one_hot, slopes, intercepts, 
+                                                        guessing, grid_points)
+
+    if method.upper() == 'MAP':
+        ability, information = _maximum_a_posteriori(ability, one_hot, slopes, 
+                                                     intercepts, guessing)
+        variance = np.diagonal(np.linalg.inv(information), axis1=1, axis2=2)
+
+    ability_sd = np.sqrt(np.clip(variance, 0, None))
+
+    if n_factors == 1:
+        ability, ability_sd = ability[:, 0], ability_sd[:, 0]
+
+    return {'Ability': ability, 'Ability SD': ability_sd}
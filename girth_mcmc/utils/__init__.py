@@ -1,3 +1,16 @@
 from .options import *
 from .multidimensional_utils import *
+from .long_format import *
 from .missing_data import *
+from .quadrature import *
+from .response_patterns import *
+from .model_cache import *
+from .data_containers import *
+from .trace_summary import *
+from .profiling import *
+from .consensus import *
+from .warm_start import *
+from .initial_guess import *
+from .convergence import *
+from .parallelism import *
+from .result_cache import *
\ No newline at end of file
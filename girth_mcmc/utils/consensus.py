@@ -0,0 +1,61 @@
+import numpy as np
+
+from .long_format import LongFormatResponses
+
+
+__all__ = ['shard_participants', 'select_participants', 'consensus_draws']
+
+
+def shard_participants(n_people, n_shards, seed=None):
+    """Random partition of the participants into shards.
+
+    Args:
+        n_people: (int) number of participants
+        n_shards: (int) number of shards
+        seed: (int) seed of the random partition
+
+    Returns:
+        shards: list of sorted participant indices of every shard
+    """
+    rng = np.random.default_rng(seed)
+
+    return [np.sort(shard) for shard in 
+            np.array_split(rng.permutation(n_people), n_shards)]
+
+
+def select_participants(dataset, index):
+    """Responses of a subset of participants, every item is kept.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses
+                 or LongFormatResponses
+        index: [n_selected] indices of the participants
+
+    Returns:
+        subset: responses of the selected participants
+    """
+    if isinstance(dataset, LongFormatResponses):
+        return dataset.select_participants(index)
+
+    return dataset[:, index]
+
+
+def consensus_draws(shard_draws):
+    """Combines the draws of shard subposteriors (consensus Monte Carlo).
+
+    Every draw is the precision weighted average of the same draw in each
+    shard, the precision is estimated element-wise from the shard draws.
+
+    Args:
+        shard_draws: list of [n_draws, ...] arrays, one for each shard
+
+    Returns:
+        draws: [n_draws, ...] array of the combined posterior
+    """
+    n_draws = min(draws.shape[0] for draws in shard_draws)
+    draws = np.stack([draws[:n_draws] for draws in shard_draws])
+
+    variance = draws.var(axis=1, ddof=1, keepdims=True)
+    precision = 1 / np.maximum(variance, np.finfo(float).tiny)
+
+    return (precision * draws).sum(axis=0) / precision.sum(axis=0)
@@ -0,0 +1,225 @@
+import time
+
+import numpy as np
+from scipy.special import ndtri
+
+
+__all__ = ['split_rhat', 'effective_sample_size', 'ConvergenceMonitor']
+
+
+def _split_chains(draws):
+    """Splits every chain in half, an odd middle draw is dropped."""
+    half = draws.shape[1] // 2
+
+    return np.concatenate([draws[:, :half], draws[:, -half:]], axis=0)
+
+
+def _rank_normalize(draws):
+    """Normal scores of the ranks pooled over every chain."""
+    # scipy.stats is slow to import and only needed while sampling
+    from scipy.stats import rankdata
+
+    n_chains, n_draws = draws.shape[:2]
+    ranks = rankdata(draws.reshape(n_chains * n_draws, -1), axis=0)
+
+    return ndtri((ranks - 0.375) / (n_chains * n_draws + 0.25)).reshape(draws.shape)
+
+
+def _rhat(draws):
+    """Potential scale reduction of [n_chains, n_draws, n_parameters] draws."""
+    n_draws = draws.shape[1]
+    between = n_draws * draws.mean(axis=1).var(axis=0, ddof=1)
+    within = draws.var(axis=1, ddof=1).mean(axis=0)
+    pooled = (n_draws - 1) / n_draws * within + between / n_draws
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(pooled / within)
+
+
+def _ess(draws):
+    """Effective sample size of [n_chains, n_draws, n_parameters] draws.
+
+    Autocorrelations are combined across chains and truncated with
+    Geyer's initial monotone sequence.
+    """
+    n_chains, n_draws = draws.shape[:2]
+
+    # Autocovariance of every chain with an FFT
+    centered = draws - draws.mean(axis=1, keepdims=True)
+    fft_size = 2 ** int(np.ceil(np.log2(2 * n_draws)))
+    transform = np.fft.rfft(centered, n=fft_size, axis=1)
+    autocovariance = np.fft.irfft(transform * np.conj(transform), n=fft_size,
+                                  axis=1)[:, :n_draws] / n_draws
+
+    within = autocovariance[:, 0].mean(axis=0) * n_draws / (n_draws - 1)
+    pooled = within * (n_draws - 1) / n_draws
+    if n_chains > 1:
+        pooled = pooled + draws.mean(axis=1).var(axis=0, ddof=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = 1 - (within - autocovariance.mean(axis=0)) / pooled
+    correlation[0] = 1
+
+    # Sums of consecutive pairs are positive and decreasing
+    n_pairs = n_draws // 2
+    pairs = correlation[:2 * n_pairs:2] + correlation[1:2 * n_pairs:2]
+    positive = np.cumprod(pairs > 0, axis=0)
+    pairs = np.minimum.accumulate(np.where(positive, pairs, 0), axis=0)
+
+    autocorrelation_time = np.maximum(-1 + 2 * pairs.sum(axis=0), 
+                                      1 / np.log10(n_chains * n_draws))
+
+    return n_chains * n_draws / autocorrelation_time
+
+
+def split_rhat(draws):
+    """Rank normalized split R-hat of every parameter.
+
+    The larger of the bulk and folded (tail) values is returned.
+
+    Args:
+        draws: [n_chains, n_draws, ...] posterior draws
+
+    Returns:
+        rhat: [...] split R-hat of every parameter
+    """
+    draws = np.asarray(draws, dtype=float)
+    shape = draws.shape[2:]
+    draws = _split_chains(draws.reshape(draws.shape[:2] + (-1,)))
+
+    folded = np.abs(draws - np.median(draws.reshape(-1, draws.shape[2]), axis=0))
+    rhat = np.maximum(_rhat(_rank_normalize(draws)),
+                      _rhat(_rank_normalize(folded)))
+
+    return rhat.reshape(shape)
+
+
+def effective_sample_size(draws, method='bulk'):
+    """Bulk or tail effective sample size of every parameter.
+
+    Args:
+        draws: [n_chains, n_draws, ...] posterior draws
+        method: (string) ['bulk', 'tail'], the tail ESS is the smaller
+                ESS of the 5% and 95% quantiles
+
+    Returns:
+        ess: [...] effective sample size of every parameter
+    """
+    draws = np.asarray(draws, dtype=float)
+    shape = draws.shape[2:]
+    draws = _split_chains(draws.reshape(draws.shape[:2] + (-1,)))
+
+    if method == 'bulk':
+        ess = _ess(_rank_normalize(draws))
+
+    elif method == 'tail':
+        quantiles = np.quantile(draws.reshape(-1, draws.shape[2]), [0.05, 0.95], axis=0)
+        ess = np.minimum(_ess((draws <= quantiles[0]).astype(float)),
+                         _ess((draws <= quantiles[1]).astype(float)))
+
+    else:
+        raise AssertionError(f"Unknown effective sample size method {method}.")
+
+    return ess.reshape(shape)
+
+
+class ConvergenceMonitor(object):
+    """Collects draws as they arrive and checks convergence in blocks.
+
+    Draws are copied into a preallocated buffer, once every chain has
+    another block of draws the split R-hat and bulk / tail ESS of the
+    collected draws are computed and compared to the targets.
+
+    Parameters:
+        varnames: names of the monitored variables
+        n_chains: (int) number of chains
+        max_draws: (int) largest number of draws in each chain
+        target_rhat: (float) largest split R-hat of any parameter
+        target_ess: (int) smallest bulk and tail ESS of any parameter
+        block_size: (int) number of draws in each chain between checks
+
+    Attributes:
+        history: list of diagnostics of every checked block, each a
+                 dictionary with n_draws (per chain), rhat (largest),
+                 ess_bulk and ess_tail (smallest), converged and wall_time
+    """
+    def __init__(self, varnames, n_chains, max_draws, target_rhat=1.01,
+                 target_ess=400, block_size=250):
+        """Constructor method for the monitor."""
+        self.varnames = list(varnames)
+        self.target_rhat = target_rhat
+        self.target_ess = target_ess
+        self.block_size = block_size
+        self.history = list()
+
+        self._draws = None
+        self._n_chains = n_chains
+        self._max_draws = max_draws
+        self._counts = np.zeros(n_chains, dtype=int)
+        self._start_time = time.perf_counter()
+
+    @property
+    def n_draws(self):
+        """Number of draws collected by every chain."""
+        return int(self._counts.min())
+
+    def update(self, chain, point):
+        """Adds a draw of one chain.
+
+        Args:
+            chain: (int) index of the chain
+            point: dictionary of variable names and values
+
+        Returns:
+            converged: (boolean) True when this draw completed a block
+                       that met the targets
+        """
+        values = np.concatenate([np.ravel(point[name]) for name in self.varnames])
+
+        if self._draws is None:
+            self._draws = np.empty((self._n_chains, self._max_draws, values.size))
+
+        if self._counts[chain] == self._max_draws:
+            return False
+
+        self._draws[chain, self._counts[chain]] = values
+        self._counts[chain] += 1
+
+        # Check once the slowest chain completes a block
+        n_checked = self.history[-1]['n_draws'] if self.history else 0
+        if self.n_draws - n_checked < self.block_size:
+            return False
+
+        return self.check()['converged']
+
+    def check(self):
+        """Diagnostics of the draws collected by every chain.
+
+        Returns:
+            diagnostics: dictionary of the checked block, also appended
+                         to the history
+        """
+        n_draws = self.n_draws
+        diagnostics = {'n_draws': n_draws, 'rhat': np.inf, 'ess_bulk': 0.0,
+                       'ess_tail': 0.0, 'converged': False,
+                       'wall_time': time.perf_counter() - self._start_time}
+
+        # Split chains need at least two draws per half
+        if n_draws >= 4:
+            draws = self._draws[:, :n_draws]
+
+            # Constant parameters carry no convergence information
+            with np.errstate(invalid='ignore'):
+                diagnostics['rhat'] = float(np.nanmax(split_rhat(draws), initial=1.0))
+                diagnostics['ess_bulk'] = float(np.nanmin(effective_sample_size(draws, 'bulk'),
+                                                          initial=np.inf))
+                diagnostics['ess_tail'] = float(np.nanmin(effective_sample_size(draws, 'tail'),
+                                                          initial=np.inf))
+
+            diagnostics['converged'] = (diagnostics['rhat'] <= self.target_rhat and
+                                        diagnostics['ess_bulk'] >= self.target_ess and
+                                        diagnostics['ess_tail'] >= self.target_ess)
+
+        self.history.append(diagnostics)
+
+        return diagnostics
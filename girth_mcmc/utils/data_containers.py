@@ -0,0 +1,51 @@
+import numpy as np
+
+
+__all__ = ['data_container', 'container_values']
+
+
+def container_values(values):
+    """Values stored in a data container.
+
+    Floating point data is cast to theano.config.floatX, integer responses 
+    are kept. A cached model receives new data through the same cast so 
+    the container types never change.
+
+    Args:
+        values: (array) data to wrap
+
+    Returns:
+        values: (array) unmasked data with the container dtype
+    """
+    # PyMC3 is only loaded once a model is built
+    import pymc3 as pm
+
+    values = np.ma.getdata(values)
+    if np.issubdtype(values.dtype, np.floating):
+        # Float64 data would upcast a float32 likelihood
+        values = pm.floatX(values)
+
+    return values
+
+
+def data_container(name, values):
+    """Wraps a dataset in a shared pymc3 data container.
+
+    Containers let a compiled model swap in a new dataset of the same 
+    shape without rebuilding. Arrays with masked values are returned 
+    unchanged, the models gather the observed responses instead. 
+
+    Args:
+        name: (string) name of the container in the model
+        values: (array) data to wrap
+    
+    Returns:
+        container: shared variable or the masked array
+    """
+    if np.ma.is_masked(values):
+        return values
+
+    # PyMC3 is only loaded once a model is built
+    import pymc3 as pm
+
+    return pm.Data(name, container_values(values))
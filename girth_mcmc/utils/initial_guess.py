@@ -0,0 +1,105 @@
+import numpy as np
+from scipy.special import ndtri, logit
+
+from .missing_data import observed_cells
+
+
+__all__ = ['classical_test_statistics', 'classical_discrimination',
+           'classical_thresholds']
+
+
+# Scaling between the logistic and normal ogive curves
+_LOGISTIC_SCALE = 1.702
+
+
+def classical_test_statistics(dataset, n_categories=2):
+    """Proportions, item-rest correlations and standardized scores.
+
+    Only observed responses are counted, every statistic is gathered
+    with a single pass over the observed cells.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses,
+                 missing values can be tagged with a masked array, or
+                 LongFormatResponses
+        n_categories: (int) number of response categories
+
+    Returns:
+        proportions: [n_items, n_categories - 1] proportion of responses
+                     in or above categories 1 to n_categories - 1
+        item_rest: [n_items] correlation of every item with the mean
+                   score on the remaining items
+        ability: [n_participants] standardized logit of the mean score
+    """
+    n_items, n_people = dataset.shape
+    item_index, person_index, responses = observed_cells(dataset)
+
+    # Run through 0, K - 1
+    responses = np.asarray(responses, dtype=int)
+    responses = responses - responses.min()
+
+    # Smoothed cumulative proportions of every category
+    counts = np.bincount(item_index * n_categories + responses,
+                         minlength=n_items * n_categories)
+    counts = counts.reshape(n_items, n_categories)
+    cumulative = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    proportions = (cumulative[:, 1:] + 0.5) / (cumulative[:, :1] + 1)
+
+    # Mean score of each participant on the remaining items
+    person_total = np.bincount(person_index, responses, n_people)
+    person_count = np.bincount(person_index, minlength=n_people)
+    rest = ((person_total[person_index] - responses) /
+            np.maximum(person_count[person_index] - 1, 1))
+
+    item_count = np.maximum(np.bincount(item_index, minlength=n_items), 1)
+    item_mean = lambda values: np.bincount(item_index, values, n_items) / item_count
+
+    response_deviation = responses - item_mean(responses)[item_index]
+    rest_deviation = rest - item_mean(rest)[item_index]
+    deviation = np.sqrt(item_mean(response_deviation**2) * item_mean(rest_deviation**2))
+    item_rest = np.divide(item_mean(response_deviation * rest_deviation), deviation,
+                          out=np.zeros(n_items), where=deviation > 0)
+
+    ability = logit((person_total + 0.5) / (person_count * (n_categories - 1) + 1))
+    ability -= ability.mean()
+    if ability.std() > 0:
+        ability /= ability.std()
+
+    return proportions, item_rest, ability
+
+
+def classical_discrimination(item_rest, minimum=0.3, maximum=4.0):
+    """Logistic discrimination from the item-rest correlation.
+
+    Args:
+        item_rest: [n_items] item-rest correlations
+        minimum: (float) smallest discrimination returned
+        maximum: (float) largest discrimination returned
+
+    Returns:
+        discrimination: [n_items] discrimination estimates
+    """
+    correlation = np.clip(item_rest, 0.05, 0.95)
+    discrimination = _LOGISTIC_SCALE * correlation / np.sqrt(1 - correlation**2)
+
+    return np.clip(discrimination, minimum, maximum)
+
+
+def classical_thresholds(proportions, discrimination, limit=4.0):
+    """Difficulties that reproduce the proportions with normal abilities.
+
+    The logistic curve is approximated with a normal ogive so the expected
+    proportion over standard normal abilities has a closed form.
+
+    Args:
+        proportions: [n_items, ...] proportion of responses above the threshold
+        discrimination: [n_items] discrimination of every item
+        limit: (float) largest magnitude of the returned difficulties
+
+    Returns:
+        difficulty: [n_items, ...] difficulty estimates
+    """
+    discrimination = np.reshape(discrimination, (-1,) + (1,) * (np.ndim(proportions) - 1))
+    scale = np.sqrt(1 + (_LOGISTIC_SCALE / discrimination)**2)
+
+    return np.clip(-ndtri(proportions) * scale, -limit, limit)
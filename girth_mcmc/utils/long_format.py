@@ -0,0 +1,95 @@
+from copy import copy
+
+import numpy as np
+
+
+__all__ = ['LongFormatResponses']
+
+
+class LongFormatResponses(object):
+    """Responses stored as (participant, item, response) triplets.
+
+    Stands in for the [n_items, n_participants] array of responses without
+    building it, the models gather the likelihood from the index arrays.
+    Participants and items are numbered in sorted order of their labels.
+
+    Parameters:
+        person_id: [n_observed] label of the participant of every response
+        item_id: [n_observed] label of the item of every response
+        responses: [n_observed] measured responses
+
+    Attributes:
+        item_index: [n_observed] index of the item of every response
+        person_index: [n_observed] index of the participant of every response
+        item_labels: [n_items] label of every item
+        person_labels: [n_participants] label of every participant
+        shape: (n_items, n_participants)
+    """
+    def __init__(self, person_id, item_id, responses):
+        """Constructor method for the long format responses."""
+        responses = np.asarray(responses)
+        
+        if not (len(person_id) == len(item_id) == responses.shape[0]):
+            raise AssertionError("person_id, item_id and responses must have "
+                                 "the same length")
+
+        self.person_labels, self.person_index = np.unique(person_id, return_inverse=True)
+        self.item_labels, self.item_index = np.unique(item_id, return_inverse=True)
+        self.responses = responses
+
+    @property
+    def shape(self):
+        return (self.item_labels.shape[0], self.person_labels.shape[0])
+
+    def __len__(self):
+        return self.item_labels.shape[0]
+
+    def count(self):
+        """Number of observed responses."""
+        return self.responses.shape[0]
+
+    def min(self):
+        """Smallest observed response."""
+        return self.responses.min()
+
+    def astype(self, dtype):
+        """Copy with the responses cast to dtype."""
+        return self._replace(self.responses.astype(dtype))
+
+    def __sub__(self, value):
+        return self._replace(self.responses - value)
+
+    def _replace(self, responses):
+        """Copy sharing the indices with new responses."""
+        updated = copy(self)
+        updated.responses = responses
+
+        return updated
+
+    def select_participants(self, index):
+        """Responses of a subset of participants, every item is kept.
+
+        Args:
+            index: [n_selected] indices of the participants
+
+        Returns:
+            subset: LongFormatResponses numbered in the order of index
+        """
+        lookup = np.full(self.shape[1], -1)
+        lookup[index] = np.arange(len(index))
+        keep = lookup[self.person_index] >= 0
+
+        subset = copy(self)
+        subset.person_labels = self.person_labels[index]
+        subset.person_index = lookup[self.person_index[keep]]
+        subset.item_index = self.item_index[keep]
+        subset.responses = self.responses[keep]
+
+        return subset
+
+    def to_masked(self):
+        """Dense [n_items, n_participants] masked array of the responses."""
+        dataset = np.ma.masked_all(self.shape, dtype=self.responses.dtype)
+        dataset[self.item_index, self.person_index] = self.responses
+
+        return dataset
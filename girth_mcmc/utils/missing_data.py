@@ -1,7 +1,12 @@
+import numpy as np
 from numpy import ma, isin
 
+from .data_containers import data_container
+from .long_format import LongFormatResponses
 
-__all__ = ['tag_missing_data_mcmc']
+
+__all__ = ['tag_missing_data_mcmc', 'has_missing_responses', 'observed_cells', 
+           'observed_log_likelihood']
 
 
 def tag_missing_data_mcmc(dataset, valid_responses):
@@ -20,3 +25,54 @@ def tag_missing_data_mcmc(dataset, valid_responses):
     # MCMC uses a masked array to identify missing data
     return ma.masked_array(dataset, ~mask)
 
+
+def has_missing_responses(dataset):
+    """True for masked arrays with missing values and long format responses."""
+    return isinstance(dataset, LongFormatResponses) or ma.is_masked(dataset)
+
+
+def observed_cells(dataset):
+    """Locations and values of the observed responses.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses,
+                 missing values can be tagged with a masked array, or
+                 LongFormatResponses
+
+    Returns:
+        item_index: [n_observed] item of every observed response
+        person_index: [n_observed] participant of every observed response
+        responses: [n_observed] observed responses
+    """
+    if isinstance(dataset, LongFormatResponses):
+        return dataset.item_index, dataset.person_index, dataset.responses
+
+    item_index, person_index = np.nonzero(~ma.getmaskarray(dataset))
+
+    return item_index, person_index, ma.getdata(dataset)[item_index, person_index]
+
+
+def observed_log_likelihood(distribution, dataset, parameters):
+    """Log likelihood of the observed responses only.
+
+    Missing responses are dropped from the likelihood instead of being
+    imputed, the cost scales with the number of observed responses.
+
+    Args:
+        distribution: pymc3 distribution of the responses
+        dataset: [n_items, n_participants] masked array of responses or
+                 LongFormatResponses
+        parameters: callable(item_index, person_index) returning the 
+                    distribution parameters of the gathered responses
+
+    Returns:
+        log_likelihood: observed variable 'Log_Likelihood'
+    """
+    item_index, person_index, responses = observed_cells(dataset)
+
+    responses = data_container("Observed", responses)
+    distribution_parameters = parameters(data_container("Item_Index", item_index),
+                                         data_container("Person_Index", person_index))
+
+    return distribution("Log_Likelihood", observed=responses, 
+                        **distribution_parameters)
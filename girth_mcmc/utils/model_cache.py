@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+
+__all__ = ['ModelCache']
+
+
+class ModelCache(object):
+    """Least recently used cache of compiled model templates.
+
+    Parameters:
+        max_size: (int) maximum number of templates to keep
+    """
+    def __init__(self, max_size=0):
+        """Constructor method for the cache."""
+        self.max_size = max_size
+        self._templates = OrderedDict()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def __contains__(self, key):
+        return key in self._templates
+
+    def get(self, key):
+        """Returns the template for the key, None if not cached."""
+        if key not in self._templates:
+            return None
+
+        self._templates.move_to_end(key)
+        return self._templates[key]
+
+    def put(self, key, template):
+        """Adds a template to the cache and evicts the least recently used."""
+        self._templates[key] = template
+        self._templates.move_to_end(key)
+        self._evict()
+
+    def resize(self, max_size):
+        """Updates the maximum number of templates to keep."""
+        self.max_size = max_size
+        self._evict()
+
+    def clear(self):
+        """Removes all the templates."""
+        self._templates.clear()
+
+    def _evict(self):
+        """Removes templates until the cache fits in max_size."""
+        while len(self._templates) > self.max_size:
+            self._templates.popitem(last=False)
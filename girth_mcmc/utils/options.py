@@ -1,11 +1,12 @@
+from numbers import Real
+
 import numpy as np
-from pymc3 import ADVI
 
-from multiprocessing import cpu_count
+from .parallelism import physical_cores
 
 
-# Divide by two since multithreading doesn't count
-DEFAULT_CPU = max(min(cpu_count() // 2, 2), 1)
+# Hyperthreads don't count
+DEFAULT_CPU = max(min(physical_cores(), 2), 1)
 
 
 __all__ = ['default_mcmc_options', 'validate_mcmc_options']
@@ -15,30 +16,126 @@ def default_mcmc_options():
     """ Dictionary of options used in Girth MCMC.
 
     Args:
-        n_processors: number of processors to use during runs (Default: 2)
-        n_tune: number of "burn-in" samples to run (Default: 2500)
+        n_processors: number of worker processes sampling chains in parallel,
+                      'auto' sizes the workers, chains and threads to the
+                      physical cores and the problem (Default: 2)
+        n_chains: number of chains, equal to n_processors when None 
+                  (Default: None)
+        n_threads: BLAS / OpenMP threads in every worker, left to the
+                   libraries when None (Default: None)
+        n_tune: number of "burn-in" samples to run in every chain (Default: 2500)
         n_samples: number of estimation samples (Default: 10000)
         variational_inference: use variational estimation (Default: False)
         variational_model: String of varational model to use 
                            ['advi', 'svgd', 'fullrank_advi'] (Default: 'advi')
         variational_samples: number of samples to use in VI (Default: 15000)
+        initial_guess: start the sampler at classical estimates of the
+                       parameters (Default: True)
+        store_kernel: store the probability kernel of dichotomous models
+                      for every draw (Default: True)
+        engine: sampling backend ['pymc', 'gibbs'], the gibbs engine runs
+                a normal ogive sampler for Rasch, 1PL and 2PL (Default: 'pymc')
+        marginal_ability: integrate ability out of the likelihood for the 
+                          2PL, 3PL, GRM and PCM models (Default: False)
+        quadrature_points: number of quadrature points used for the 
+                           marginal likelihood (Default: 41)
+        collapse_patterns: fit the unique response patterns with frequency 
+                           weights, requires marginal_ability (Default: False)
+        model_cache_size: number of compiled model templates kept for reuse
+                          on datasets of the same shape, 0 disables the
+                          cache (Default: 0)
+        streaming_summary: accumulate posterior means, standard deviations
+                           and quantiles as draws arrive (Default: False)
+        keep_draws: store the raw draws when streaming summaries (Default: True)
+        summary_quantiles: probabilities of the streamed quantiles 
+                           (Default: (0.025, 0.5, 0.975))
+        trace_backend: storage of the mcmc draws ['memory', 'memmap'], memmap
+                       writes every chain to memory mapped .npy files 
+                       (Default: 'memory')
+        trace_directory: folder of the memmap draws, a temporary folder
+                         removed with the trace is created when None 
+                         (Default: None)
+        profile: profiler to run [None, 'cprofile', 'theano'] (Default: None)
+        minibatch_size: number of participants in each variational iteration,
+                        needs marginal_ability, full batch when None (Default: None)
+        learning_rate: initial step size of the adam optimizer used for
+                       variational inference, the pymc3 default optimizer
+                       is used when None (Default: None)
+        learning_rate_decay: power of the decay of the learning rate, the rate
+                             at iteration t is learning_rate / (1 + t) ** decay
+                             (Default: 0.0)
+        n_shards: split the participants into shards fitted separately
+                  with a tempered prior, the item draws are combined
+                  with consensus Monte Carlo (Default: 1)
+        shard_executor: executor with a map method running the shards, a
+                        process pool is used when None (Default: None)
+        adaptive_stopping: stop sampling once the item parameters meet the
+                           convergence targets, n_samples is the most draws
+                           taken (Default: False)
+        target_rhat: largest rank normalized split R-hat of any item 
+                     parameter (Default: 1.01)
+        target_ess: smallest bulk and tail effective sample size of any
+                    item parameter (Default: 400)
+        block_size: number of draws in each chain between convergence
+                    checks (Default: 250)
+        time_budget: seconds of sampling after which the draws collected
+                     so far are returned, chains sampled one after another 
+                     may be missing, no limit when None (Default: None)
+        result_cache: folder of the on-disk cache of results, fits with the
+                      same dataset, model, options and random seed are read
+                      back instead of refit, no cache when None (Default: None)
+        result_cache_size: largest size of the result cache in megabytes,
+                           least recently used fits are removed (Default: 1024)
+        cache_traces: store the compressed draws with the cached results 
+                      (Default: False)
+        precision: floating point type of the pymc models ['float64', 'float32'],
+                   float32 halves the memory traffic of the likelihood
+                   (Default: 'float64')
 
     Returns:
         options_dict: dictionary of options
 
     Notes:
-        The n_tune and n_samples represent total samples, this will
-        be divided by n_processors for multiprocessing
+        The n_samples represent total samples, this will be divided
+        by n_chains, every chain is tuned for n_tune samples
 
         More info about Variational Models at:
         https://docs.pymc.io/api/inference.html#variational-inference
     """
     return {"n_processors": DEFAULT_CPU,
+            "n_chains": None,
+            "n_threads": None,
             "n_tune": 2500, "n_samples": 10000,
             "variational_inference": False, 
             "variational_model": 'advi',
             "variational_samples": 15000,
-            "initial_guess": True}
+            "initial_guess": True,
+            "store_kernel": True,
+            "engine": 'pymc',
+            "marginal_ability": False,
+            "quadrature_points": 41,
+            "collapse_patterns": False,
+            "model_cache_size": 0,
+            "streaming_summary": False,
+            "keep_draws": True,
+            "summary_quantiles": (0.025, 0.5, 0.975),
+            "trace_backend": 'memory',
+            "trace_directory": None,
+            "profile": None,
+            "minibatch_size": None,
+            "learning_rate": None,
+            "learning_rate_decay": 0.0,
+            "n_shards": 1,
+            "shard_executor": None,
+            "adaptive_stopping": False,
+            "target_rhat": 1.01,
+            "target_ess": 400,
+            "block_size": 250,
+            "time_budget": None,
+            "result_cache": None,
+            "result_cache_size": 1024,
+            "cache_traces": False,
+            "precision": 'float64'}
 
 
 def validate_mcmc_options(options_dict=None):
@@ -52,7 +149,11 @@ def validate_mcmc_options(options_dict=None):
 
     """
     validate = {'n_processors':
-                    lambda x: isinstance(x, int) and x > 0,
+                    lambda x: x == 'auto' or (isinstance(x, int) and x > 0),
+                'n_chains':
+                    lambda x: x is None or (isinstance(x, int) and x > 0),
+                'n_threads':
+                    lambda x: x is None or (isinstance(x, int) and x > 0),
                 'n_tune':
                     lambda x: isinstance(x, int) and x > 100,
                 'n_samples':
@@ -64,7 +165,62 @@ def validate_mcmc_options(options_dict=None):
                 'variational_samples':
                     lambda x: isinstance(x, int) and x > 100,
                 "initial_guess":
-                    lambda x: isinstance(x, bool)
+                    lambda x: isinstance(x, bool),
+                "store_kernel":
+                    lambda x: isinstance(x, bool),
+                "engine":
+                    lambda x: x in ['pymc', 'gibbs'],
+                "marginal_ability":
+                    lambda x: isinstance(x, bool),
+                "quadrature_points":
+                    lambda x: isinstance(x, int) and x > 1,
+                "collapse_patterns":
+                    lambda x: isinstance(x, bool),
+                "model_cache_size":
+                    lambda x: isinstance(x, int) and x >= 0,
+                "streaming_summary":
+                    lambda x: isinstance(x, bool),
+                "keep_draws":
+                    lambda x: isinstance(x, bool),
+                "summary_quantiles":
+                    lambda x: (isinstance(x, (list, tuple)) and len(x) > 0 and 
+                               all(0 < value < 1 for value in x)),
+                "trace_backend":
+                    lambda x: x in ['memory', 'memmap'],
+                "trace_directory":
+                    lambda x: x is None or isinstance(x, str),
+                "profile":
+                    lambda x: x in [None, 'cprofile', 'theano'],
+                "minibatch_size":
+                    lambda x: x is None or (isinstance(x, int) and x > 0),
+                "learning_rate":
+                    lambda x: x is None or (isinstance(x, Real) and 
+                                            not isinstance(x, bool) and x > 0),
+                "learning_rate_decay":
+                    lambda x: (isinstance(x, Real) and not isinstance(x, bool) 
+                               and 0 <= x <= 1),
+                "n_shards":
+                    lambda x: isinstance(x, int) and x > 0,
+                "shard_executor":
+                    lambda x: x is None or callable(getattr(x, 'map', None)),
+                "adaptive_stopping":
+                    lambda x: isinstance(x, bool),
+                "target_rhat":
+                    lambda x: isinstance(x, float) and x > 1,
+                "target_ess":
+                    lambda x: isinstance(x, int) and x > 0,
+                "block_size":
+                    lambda x: isinstance(x, int) and x >= 50,
+                "time_budget":
+                    lambda x: x is None or (isinstance(x, (int, float)) and x > 0),
+                "result_cache":
+                    lambda x: x is None or isinstance(x, str),
+                "result_cache_size":
+                    lambda x: isinstance(x, (int, float)) and x > 0,
+                "cache_traces":
+                    lambda x: isinstance(x, bool),
+                "precision":
+                    lambda x: x in ['float64', 'float32']
                 }
     
     # A complete options dictionary
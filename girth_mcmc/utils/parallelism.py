@@ -0,0 +1,129 @@
+import os
+from contextlib import contextmanager
+from multiprocessing import cpu_count
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError: # Optional, environment variables only
+    threadpool_limits = None
+
+
+__all__ = ['available_cpus', 'physical_cores', 'resolve_parallelism',
+           'limit_threads']
+
+
+# Thread pools read at startup by BLAS / OpenMP in worker processes
+_THREAD_VARIABLES = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                     'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+# Problems smaller than this (items x participants) run single threaded
+_THREADED_PROBLEM_SIZE = 100000
+
+
+def available_cpus():
+    """Number of logical cpus this process is allowed to run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # Windows and macOS
+        return cpu_count()
+
+
+def physical_cores():
+    """Number of physical cores this process can use.
+
+    Hyperthreads share the floating point units, so the logical count is
+    reduced by the threads per core read from /proc/cpuinfo, half of the
+    logical cpus are assumed when the topology is unknown.
+
+    Returns:
+        n_cores: (int) number of physical cores
+    """
+    logical = available_cpus()
+
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            sections = cpuinfo.read().strip().split('\n\n')
+    except OSError:
+        return max(logical // 2, 1)
+
+    cores = set()
+    for section in sections:
+        fields = dict(line.split(':', 1) for line in section.splitlines() if ':' in line)
+        fields = {key.strip(): value.strip() for key, value in fields.items()}
+        cores.add((fields.get('physical id'), fields.get('core id')))
+
+    if not sections or (None, None) in cores:
+        return max(logical // 2, 1)
+
+    threads_per_core = max(len(sections) // len(cores), 1)
+
+    return max(logical // threads_per_core, 1)
+
+
+def resolve_parallelism(options, shape):
+    """Chains, worker processes and threads per worker of a run.
+
+    With n_processors set to 'auto' the workers are sized to the
+    physical cores, 4 chains are run unless n_chains is given and the
+    remaining cores become BLAS / OpenMP threads for large problems.
+
+    Args:
+        options: mcmc options dictionary
+        shape: (n_items, n_participants) of the responses
+
+    Returns:
+        parallelism: dictionary with n_chains, n_cores (worker processes)
+                     and n_threads (None leaves the thread pools untouched)
+    """
+    n_processors = options['n_processors']
+    n_chains = options['n_chains']
+    n_threads = options['n_threads']
+
+    if n_processors != 'auto':
+        return {'n_chains': n_chains or n_processors,
+                'n_cores': n_processors,
+                'n_threads': n_threads}
+
+    cores = physical_cores()
+    n_chains = n_chains or 4
+    n_processors = min(n_chains, cores)
+
+    if n_threads is None:
+        threaded = shape[0] * shape[1] >= _THREADED_PROBLEM_SIZE
+        n_threads = max(cores // n_processors, 1) if threaded else 1
+
+    return {'n_chains': n_chains, 'n_cores': n_processors, 'n_threads': n_threads}
+
+
+@contextmanager
+def limit_threads(n_threads):
+    """Limits the BLAS / OpenMP threads of this process and its workers.
+
+    The thread variables are read by newly started workers and threadpoolctl,
+    when installed, resizes the pools already loaded in this process.
+
+    Args:
+        n_threads: (int) threads per process, nothing is changed when None
+    """
+    if n_threads is None:
+        yield
+        return
+
+    previous = {name: os.environ.get(name) for name in _THREAD_VARIABLES}
+    os.environ.update({name: str(n_threads) for name in _THREAD_VARIABLES})
+
+    try:
+        if threadpool_limits is None:
+            yield
+
+        else:
+            with threadpool_limits(limits=n_threads):
+                yield
+
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+
+            else:
+                os.environ[name] = value
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+
+__all__ = ['PhaseTimer', 'peak_memory', 'cpu_time']
+
+
+def peak_memory():
+    """High water mark of the resident memory of this process and its children.
+
+    Returns:
+        peak_rss: peak resident memory in megabytes, None if unavailable
+    """
+    if resource is None:
+        return None
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+def cpu_time():
+    """CPU time of this process and its finished children."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class PhaseTimer(object):
+    """Records wall time and CPU time of named phases.
+
+    Parameters:
+        hooks: list of callables run at the end of every phase as
+               hook(phase_name, timing)
+
+    Attributes:
+        timings: dictionary of phase names and timings, each timing is a
+                 dictionary with wall_time, cpu_time (seconds) and
+                 process_peak_rss_mb keys, the last is the peak memory of
+                 the whole process when the phase ended, not of the phase,
+                 so a phase only raised it when it grew past the peak of 
+                 the phases before
+    """
+    def __init__(self, hooks=None):
+        """Constructor method for the timer."""
+        self.hooks = list(hooks) if hooks else list()
+        self.timings = dict()
+
+    @contextmanager
+    def phase(self, name):
+        """Times the code run inside the context."""
+        wall_start = time.perf_counter()
+        cpu_start = cpu_time()
+
+        try:
+            yield
+
+        finally:
+            self.record(name, time.perf_counter() - wall_start,
+                        cpu_time() - cpu_start)
+
+    def record(self, name, wall_time, cpu_time=None):
+        """Adds a timing, repeated phases are accumulated.
+
+        Args:
+            name: (string) name of the phase
+            wall_time: (float) elapsed seconds
+            cpu_time: (float) CPU seconds
+        """
+        timing = self.timings.setdefault(name, {'wall_time': 0., 'cpu_time': None,
+                                                'process_peak_rss_mb': None})
+        timing['wall_time'] += wall_time
+
+        if cpu_time is not None:
+            timing['cpu_time'] = (timing['cpu_time'] or 0.) + cpu_time
+
+        timing['process_peak_rss_mb'] = peak_memory()
+
+        for hook in self.hooks:
+            hook(name, timing)
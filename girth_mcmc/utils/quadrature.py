@@ -0,0 +1,76 @@
+import numpy as np
+from numpy.polynomial.hermite_e import hermegauss
+
+
+__all__ = ['gauss_hermite_quadrature', 'product_grid_quadrature', 
+           'one_hot_responses']
+
+
+def gauss_hermite_quadrature(n_points):
+    """Quadrature grid for integrating over a standard normal distribution.
+
+    Args:
+        n_points: (int) number of quadrature points
+
+    Returns:
+        nodes: (array) location of the quadrature points
+        weights: (array) normalized weights of the quadrature points
+    """
+    nodes, weights = hermegauss(n_points)
+
+    return nodes, weights / weights.sum()
+
+
+def product_grid_quadrature(n_factors, n_points, tolerance=1e-8):
+    """Pruned Gauss-Hermite product grid over a standard multivariate normal.
+
+    Every weight is positive, so the grid can weight a posterior. Points
+    whose weight falls below tolerance times the largest weight are dropped
+    one dimension at a time, removing the corners of the grid.
+
+    Args:
+        n_factors: (int) number of dimensions
+        n_points: (int) quadrature points in every dimension
+        tolerance: (float) smallest weight kept relative to the largest
+
+    Returns:
+        nodes: [n_points_kept, n_factors] location of the quadrature points
+        weights: [n_points_kept] normalized weights of the quadrature points
+    """
+    rule_nodes, rule_weights = gauss_hermite_quadrature(n_points)
+    largest = rule_weights.max()
+
+    nodes, weights = np.zeros((1, 0)), np.ones(1)
+    for dimension in range(n_factors):
+        nodes = np.column_stack([np.repeat(nodes, n_points, axis=0),
+                                 np.tile(rule_nodes, weights.size)])
+        weights = np.outer(weights, rule_weights).ravel()
+
+        # The remaining dimensions can at most multiply by the largest weight
+        remaining = largest ** (n_factors - dimension - 1)
+        keep = weights * remaining >= tolerance * largest ** n_factors
+        nodes, weights = nodes[keep], weights[keep]
+
+    return nodes, weights / weights.sum()
+
+
+def one_hot_responses(dataset, n_categories):
+    """Encodes responses as indicators for every item and category.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of responses 
+                 running from 0 to n_categories - 1, missing values
+                 can be tagged with a masked array
+        n_categories: (int) number of response categories
+
+    Returns:
+        one_hot: [n_participants, n_items * n_categories] array of 
+                 indicators, missing responses are all zero
+    """
+    n_items, n_people = dataset.shape
+    valid = ~np.ma.getmaskarray(dataset)
+    responses = np.ma.filled(dataset, 0).astype('int')
+
+    one_hot = (responses[..., None] == np.arange(n_categories)) & valid[..., None]
+    
+    return one_hot.transpose(1, 0, 2).reshape(n_people, n_items * n_categories)
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+__all__ = ['collapse_response_patterns']
+
+
+def collapse_response_patterns(dataset):
+    """Finds the unique response patterns in a dataset.
+
+    Args:
+        dataset: [n_items, n_participants] 2d array of measured responses,
+                 missing values can be tagged with a masked array
+
+    Returns:
+        patterns: [n_items, n_patterns] 2d array of unique responses
+        counts: [n_patterns] number of participants with each pattern
+        pattern_index: [n_participants] index of each participant's pattern
+    """
+    mask = np.ma.getmaskarray(dataset)
+
+    # Missing values need a unique fill to be kept as separate patterns
+    sentinel = np.ma.min(dataset) - 1 if mask.any() else 0
+    filled = np.ma.filled(dataset, sentinel)
+    
+    patterns, pattern_index, counts = np.unique(filled, axis=1, return_inverse=True,
+                                                return_counts=True)
+    pattern_index = pattern_index.ravel()
+
+    if mask.any():
+        patterns = np.ma.masked_equal(patterns, sentinel)
+
+    return patterns, counts, pattern_index
+
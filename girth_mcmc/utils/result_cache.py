@@ -0,0 +1,164 @@
+import hashlib
+import os
+import pickle
+from importlib import metadata
+
+import numpy as np
+
+from .long_format import LongFormatResponses
+
+
+__all__ = ['ResultCache']
+
+
+# Options that don't change the estimates
+_UNKEYED_OPTIONS = ['result_cache', 'result_cache_size', 'cache_traces',
+                    'shard_executor', 'profile', 'trace_directory']
+
+# Sampler arguments that don't change the draws
+_UNKEYED_KWARGS = ['progressbar', 'callback']
+
+
+def _package_versions():
+    """Versions of the packages that produce the draws."""
+    versions = list()
+    for package in ['girth_mcmc', 'pymc3']:
+        try:
+            versions.append((package, metadata.version(package)))
+
+        except metadata.PackageNotFoundError:
+            versions.append((package, None))
+
+    return versions
+
+
+class ResultCache(object):
+    """Result dictionaries (and draws) of previous fits stored on disk.
+
+    Every entry is a pickled result dictionary, with an optional compressed
+    .npz file of the draws, named by the hash of the fit. The least recently
+    used entries are removed once the folder grows past max_size.
+
+    Parameters:
+        directory: (string) folder of the cached fits, created if missing
+        max_size: (float) largest size of the folder in megabytes
+    """
+    def __init__(self, directory, max_size=1024):
+        """Constructor method for the cache."""
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, dataset, model, model_args, options, kwargs):
+        """Hash of everything that determines the result of a fit.
+
+        The installed girth_mcmc and pymc3 versions are part of the hash,
+        an upgrade never returns the fits of an older sampler.
+
+        Args:
+            dataset: [n_items, n_participants] 2d array of measured responses,
+                     masked array or LongFormatResponses
+            model: (string) name of the model
+            model_args: (tuple) arguments passed to the model
+            options: mcmc options dictionary
+            kwargs: named arguments passed to the sampler, e.g. random_seed
+
+        Returns:
+            key: (string) hex digest of the fit
+        """
+        digest = hashlib.sha256()
+
+        if isinstance(dataset, LongFormatResponses):
+            arrays = [dataset.person_index, dataset.item_index, dataset.responses]
+            digest.update(repr(dataset.shape).encode())
+
+        else:
+            arrays = [np.ma.getdata(dataset), np.ma.getmaskarray(dataset)]
+
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype}{array.shape}".encode())
+            digest.update(array.tobytes())
+
+        keyed_options = sorted((name, value) for name, value in options.items()
+                               if name not in _UNKEYED_OPTIONS)
+        keyed_kwargs = sorted((name, value) for name, value in kwargs.items()
+                              if name not in _UNKEYED_KWARGS)
+        digest.update(repr((model, model_args, keyed_options, keyed_kwargs, 
+                            _package_versions())).encode())
+
+        return digest.hexdigest()
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key + extension)
+
+    def get(self, key):
+        """Cached fit of the key.
+
+        Returns:
+            results: result dictionary, None when not cached
+            draws: dictionary of draws, None when not stored
+        """
+        results_path = self._path(key, '.pkl')
+
+        try:
+            with open(results_path, 'rb') as file_handle:
+                results = pickle.load(file_handle)
+
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None, None
+
+        # Marks the entry as recently used
+        os.utime(results_path)
+
+        draws = None
+        if os.path.exists(self._path(key, '.npz')):
+            with np.load(self._path(key, '.npz')) as stored_draws:
+                draws = dict(stored_draws)
+
+        return results, draws
+
+    def put(self, key, results, draws=None):
+        """Stores a fit and evicts the least recently used fits.
+
+        Args:
+            key: (string) hash of the fit
+            results: result dictionary
+            draws: dictionary of draws compressed next to the results
+        """
+        if draws is not None:
+            np.savez_compressed(self._path(key, '.npz'), **draws)
+
+        # Written last and renamed so a partial entry is never read
+        temporary_path = self._path(key, f'.{os.getpid()}.tmp')
+        with open(temporary_path, 'wb') as file_handle:
+            pickle.dump(results, file_handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self._path(key, '.pkl'))
+
+        self._evict()
+
+    def _evict(self):
+        """Removes the least recently used fits above max_size."""
+        entries = dict()
+        for name in os.listdir(self.directory):
+            key, extension = os.path.splitext(name)
+            if extension not in ['.pkl', '.npz']:
+                continue
+
+            status = os.stat(os.path.join(self.directory, name))
+            size, last_used = entries.get(key, (0, 0))
+            entries[key] = (size + status.st_size,
+                            max(last_used, status.st_mtime) if extension == '.pkl'
+                            else last_used)
+
+        total_size = sum(size for size, _ in entries.values())
+        max_bytes = self.max_size * 1024 ** 2
+
+        for key in sorted(entries, key=lambda key: entries[key][1]):
+            if total_size <= max_bytes:
+                break
+
+            for extension in ['.pkl', '.npz']:
+                if os.path.exists(self._path(key, extension)):
+                    os.remove(self._path(key, extension))
+            total_size -= entries[key][0]
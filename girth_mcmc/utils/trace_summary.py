@@ -0,0 +1,33 @@
+import numpy as np
+
+
+__all__ = ['posterior_mean']
+
+
+def posterior_mean(trace, varname, chunk_size=1000):
+    """Posterior mean of a variable computed a chunk of draws at a time.
+
+    Chains are read one at a time so memory mapped traces are never
+    fully loaded into memory.
+
+    Args:
+        trace: result from the mcmc run or a dictionary of draws
+        varname: (string) name of the variable
+        chunk_size: (int) number of draws to read at once
+
+    Returns:
+        mean: posterior mean of the variable
+    """
+    if isinstance(trace, dict):
+        return np.asarray(trace[varname]).mean(0)
+
+    total = 0
+    n_draws = 0
+    for chain in trace.chains:
+        values = trace.get_values(varname, chains=[chain], combine=False)
+        
+        for start in range(0, values.shape[0], chunk_size):
+            total = total + values[start:start + chunk_size].sum(0)
+        n_draws += values.shape[0]
+
+    return total / n_draws
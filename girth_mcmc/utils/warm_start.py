@@ -0,0 +1,58 @@
+import numpy as np
+
+
+__all__ = ['warm_start_values']
+
+
+def warm_start_values(model, previous):
+    """Start values and mass matrix diagonal from a previous posterior.
+
+    Variables are matched by name and shape, variables that changed shape
+    (e.g. the abilities of a new sample of participants) are left out.
+
+    Args:
+        model: pymc model to sample
+        previous: results dictionary, trace or dictionary of draws
+                  from a previous run
+
+    Returns:
+        start: dictionary of start values in the sampling space
+        variance: dictionary of posterior variances in the sampling space,
+                  only variables with previous draws are included
+    """
+    # PyMC3 is only loaded once a model is built
+    from pymc3.backends.base import MultiTrace
+
+    if isinstance(previous, MultiTrace):
+        previous = {name: previous.get_values(name) for name in previous.varnames}
+
+    # Transformed variables are sampled under a different name
+    original_names = {variable.transformed.name: variable.name
+                      for variable in model.unobserved_RVs
+                      if hasattr(variable, 'transformed')}
+
+    start, variance = dict(), dict()
+    for variable in model.free_RVs:
+        shape = model.test_point[variable.name].shape
+        original_name = original_names.get(variable.name)
+
+        if variable.name in previous:
+            values = np.asarray(previous[variable.name], dtype=float)
+
+        elif original_name in previous:
+            values = np.asarray(previous[original_name], dtype=float)
+            values = variable.distribution.transform_used.forward_val(values)
+
+        else:
+            continue
+
+        if values.shape == shape:
+            start[variable.name] = values
+
+        elif values.shape[1:] == shape:
+            start[variable.name] = values.mean(axis=0)
+
+            if values.shape[0] > 1:
+                variance[variable.name] = values.var(axis=0)
+
+    return start, variance
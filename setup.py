@@ -10,7 +10,9 @@ if __name__ == '__main__':
     setup(
         name="girth_mcmc", 
         packages=['girth_mcmc', 'girth_mcmc.dichotomous', 'girth_mcmc.polytomous', 
-                  'girth_mcmc.utils', 'girth_mcmc.distributions'],
+                  'girth_mcmc.utils', 'girth_mcmc.distributions',
+                  'girth_mcmc.gibbs', 'girth_mcmc.backends',
+                  'girth_mcmc.scoring'],
         package_dir={'girth_mcmc': 'girth_mcmc'},
         version="0.6.0",
         license="MIT",
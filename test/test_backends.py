@@ -0,0 +1,172 @@
+import gc
+import os
+import unittest
+import tempfile
+
+import numpy as np
+
+from girth.synthetic import create_synthetic_irt_dichotomous
+from girth_mcmc import GirthMCMC
+from girth_mcmc.backends import PosteriorSummary
+from girth_mcmc.utils import posterior_mean
+
+
+class TestPosteriorSummary(unittest.TestCase):
+    """Test Fixture for the streaming posterior summary."""
+
+    def test_moments_and_quantiles(self):
+        """Testing the streamed moments and quantiles."""
+        rng = np.random.default_rng(93845720938475)
+        draws = rng.standard_normal((5000, 2, 20)) * 2 + 1
+
+        summary = PosteriorSummary(quantiles=(0.05, 0.5, 0.95))
+        for draw in draws:
+            summary.update({'x': draw, 'y': draw[0, 0]})
+
+        np.testing.assert_allclose(summary.mean('x'), draws.mean(0))
+        np.testing.assert_allclose(summary.sd('x'), draws.std(0, ddof=1))
+        self.assertTupleEqual(summary.sd('y').shape, ())
+
+        quantiles = summary.quantile('x')
+        expected = np.quantile(draws, [0.05, 0.5, 0.95], axis=0)
+        self.assertTupleEqual(quantiles.shape, (3, 2, 20))
+        np.testing.assert_allclose(quantiles, expected, atol=0.25)
+
+    def test_few_draws(self):
+        """Testing quantiles before the markers are set."""
+        summary = PosteriorSummary()
+        for value in [1., 2., 3.]:
+            summary.update({'x': np.array([value, -value])})
+
+        np.testing.assert_allclose(summary.quantile('x')[1], [2, -2])
+        np.testing.assert_allclose(summary.mean_trace()['x'], [[2, -2]])
+
+
+class TestStreamingTrace(unittest.TestCase):
+    """Test Fixture for streaming summaries while sampling."""
+
+    def test_streaming_summary(self):
+        """Testing the summary matches the stored draws."""
+        np.random.seed(5324)
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, 1, theta)
+
+        girth_model = GirthMCMC(model='Rasch',
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'streaming_summary': True})
+        result = girth_model(syn_data, progressbar=False)
+
+        trace = girth_model.trace
+        np.testing.assert_allclose(result['Difficulty'],
+                                   trace['Difficulty'].mean(0))
+        np.testing.assert_allclose(result['Posterior SD']['Ability'],
+                                   trace['Ability'].std(0, ddof=1))
+
+    def test_discard_draws(self):
+        """Testing the summary without storing the draws."""
+        np.random.seed(79987)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination,
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL',
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'streaming_summary': True,
+                                         'keep_draws': False,
+                                         'marginal_ability': True})
+        result = girth_model(syn_data, progressbar=False)
+
+        self.assertEqual(girth_model.summary.n_draws, 1000)
+        self.assertTupleEqual(result['Ability'].shape, (100,))
+        self.assertTupleEqual(result['Posterior SD']['Discrimination'].shape, (10,))
+        self.assertTupleEqual(girth_model.summary.quantile('Ability').shape, (3, 100))
+
+        # Ability uncertainty includes the posterior variance at every draw
+        self.assertNotIn('Ability_Variance', result['Posterior SD'])
+        self.assertTrue(np.all(result['Posterior SD']['Ability'] > 
+                               girth_model.summary.sd('Ability')))
+        self.assertTrue(np.all(result['Posterior SD']['Ability'] < 1))
+
+        with self.assertRaises(AssertionError):
+            girth_model.pl_kernel()
+
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='2PL', options={'streaming_summary': True,
+                                            'engine': 'gibbs'})
+
+
+class TestMemmapTrace(unittest.TestCase):
+    """Test Fixture for memory mapped traces."""
+
+    def test_memmap_trace(self):
+        """Testing the draws are written to disk."""
+        np.random.seed(86317)
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, 1.32, theta)
+
+        with tempfile.TemporaryDirectory() as directory:
+            girth_model = GirthMCMC(model='1PL',
+                                    options={'n_tune': 500, 'n_samples': 1000,
+                                             'n_processors': 2,
+                                             'trace_backend': 'memmap',
+                                             'trace_directory': directory})
+            result = girth_model(syn_data, progressbar=False)
+
+            ability_path = os.path.join(directory, 'chain_1', 'Ability.npy')
+            self.assertTrue(os.path.exists(ability_path))
+
+            trace = girth_model.trace
+            self.assertIsInstance(trace.get_values('Ability', chains=[0],
+                                                   combine=False), np.memmap)
+            np.testing.assert_allclose(result['Ability'], 
+                                       trace['Ability'].mean(0))
+            np.testing.assert_allclose(posterior_mean(trace, 'Ability', 64), 
+                                       trace['Ability'].mean(0))
+
+            # Free the memory maps before removing the folder
+            del trace
+            girth_model.trace = None
+
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='1PL', options={'trace_backend': 'memmap',
+                                            'streaming_summary': True})
+
+    def test_temporary_memmap_trace(self):
+        """Testing the temporary folder is removed with the trace."""
+        np.random.seed(37761)
+        difficulty = np.random.randn(5)
+        theta = np.random.randn(50)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, 1, theta)
+
+        girth_model = GirthMCMC(model='Rasch',
+                                options={'n_tune': 200, 'n_samples': 200,
+                                         'trace_backend': 'memmap'})
+        girth_model(syn_data, progressbar=False)
+
+        # The draws are still on disk after the call returns
+        gc.collect()
+        trace = girth_model.trace
+        directory = trace._straces[0].directory
+        self.assertTrue(os.path.isdir(directory))
+        self.assertIsInstance(trace.get_values('Ability', chains=[0],
+                                               combine=False), np.memmap)
+        self.assertEqual(trace['Difficulty'].shape[1], 5)
+        self.assertTrue(np.all(np.isfinite(trace['Difficulty'])))
+        del trace
+
+        # Replacing the trace releases the folder
+        girth_model(syn_data, progressbar=False)
+        gc.collect()
+        self.assertFalse(os.path.exists(directory))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,9 @@ import numpy as np
 
 from girth.synthetic import (create_synthetic_irt_dichotomous)
 from girth_mcmc import GirthMCMC
+from girth_mcmc.girth_class import _MODEL_TEMPLATES
+from girth_mcmc.utils import (LongFormatResponses, warm_start_values, 
+                              tag_missing_data_mcmc)
 
 
 class TestDichotomous(unittest.TestCase):
@@ -23,6 +26,133 @@ class TestDichotomous(unittest.TestCase):
                                 options={'n_tune': 500, 'n_samples': 1000})
         result = girth_model(syn_data, progressbar=False)
         
+    def test_rasch_collapsed(self):
+        """Testing collapsed response patterns need marginal abilities."""
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='Rasch', options={'collapse_patterns': True})
+
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='2PL', options={'collapse_patterns': True})
+
+    def test_twopl_collapsed(self):
+        """Testing the twopl model with collapsed response patterns."""
+        np.random.seed(46899)
+        difficulty = np.random.randn(5)
+        discrimination = 0.5 + np.random.rand(5)
+        theta = np.random.randn(500)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        options = {'n_tune': 500, 'n_samples': 1000, 'marginal_ability': True}
+        full_model = GirthMCMC(model='2PL', options=options)
+        full_result = full_model(syn_data, progressbar=False)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options=dict(options, collapse_patterns=True))
+        result = girth_model(syn_data, progressbar=False)
+
+        self.assertLessEqual(girth_model.built_model['Pattern_Weights'].get_value().size, 32)
+        self.assertTupleEqual(result['Ability'].shape, (500,))
+
+        # Same responses have the same ability
+        same_pattern = np.all(syn_data == syn_data[:, :1], axis=0)
+        self.assertEqual(np.unique(result['Ability'][same_pattern]).size, 1)
+
+        # Weighted patterns target the same posterior as every participant
+        np.testing.assert_allclose(result['Difficulty'], full_result['Difficulty'], 
+                                   atol=0.1)
+        np.testing.assert_allclose(result['Ability'], full_result['Ability'], 
+                                   atol=0.1)
+
+    def test_rasch_cached(self):
+        """Testing the rasch model reusing a cached template."""
+        np.random.seed(12397)
+        difficulty = np.random.randn(10)
+        options = {'n_tune': 500, 'n_samples': 1000, 'model_cache_size': 2}
+
+        results = list()
+        built_models = list()
+        for shift in [-1, 1]:
+            theta = np.random.randn(100) + shift
+            syn_data = create_synthetic_irt_dichotomous(difficulty, 1, theta)
+
+            girth_model = GirthMCMC(model='Rasch', options=options)
+            results.append(girth_model(syn_data, progressbar=False))
+            built_models.append(girth_model.built_model)
+
+        self.assertIs(built_models[0], built_models[1])
+        self.assertGreater(results[1]['Ability'].mean(),
+                           results[0]['Ability'].mean())
+        np.testing.assert_equal(built_models[1]['Observed'].get_value(), syn_data)
+
+        # A smaller size doesn't evict the templates of other instances
+        GirthMCMC(model='Rasch', options={'model_cache_size': 1})
+        self.assertGreaterEqual(_MODEL_TEMPLATES.max_size, 2)
+
+    def test_template_data(self):
+        """Testing cached containers match the containers of a built model."""
+        np.random.seed(43098)
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, 1, theta)
+        tagged_data = tag_missing_data_mcmc(syn_data, [0, 1])
+        tagged_data[0, :10] = np.ma.masked
+
+        for model, options, dataset in [('Rasch', {}, syn_data), 
+                                        ('Rasch', {}, tagged_data), 
+                                        ('2PL', {'marginal_ability': True}, tagged_data)]:
+            girth_model = GirthMCMC(model=model, options=options)
+            built_model, _ = girth_model.build_model(dataset)
+            template_data = girth_model._template_data(dataset, 
+                                                       girth_model.model_kwargs)
+
+            for name, values in template_data.items():
+                container = built_model[name].get_value()
+                self.assertEqual(container.dtype, values.dtype)
+                np.testing.assert_equal(container, values)
+
+    def test_rasch_timings(self):
+        """Testing the phase timings and profiling hooks."""
+        np.random.seed(46899)
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, 1, theta)
+
+        girth_model = GirthMCMC(model='Rasch', 
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'profile': 'cprofile'})
+        phases = list()
+        girth_model.phase_hooks.append(lambda name, timing: phases.append(name))
+        girth_model(syn_data, progressbar=False)
+
+        for phase in ['build_model', 'initial_guess', 'compile', 'tune', 
+                      'sample', 'summarize']:
+            self.assertIn(phase, phases)
+            self.assertGreaterEqual(girth_model.timings[phase]['wall_time'], 0)
+
+        self.assertGreater(girth_model.profile.total_tt, 0)
+
+    def test_rasch_global_random_state(self):
+        """Testing a seeded run leaves the global generator untouched."""
+        np.random.seed(51127)
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, 1, theta)
+        state = np.random.get_state()
+        expected = np.random.rand(5)
+        np.random.set_state(state)
+
+        girth_model = GirthMCMC(model='Rasch', 
+                                options={'n_tune': 200, 'n_samples': 200})
+        girth_model(syn_data, progressbar=False, random_seed=7)
+
+        self.assertIn('compile', girth_model.timings)
+        np.testing.assert_equal(np.random.rand(5), expected)
+
     def test_onepl(self):
         """Testing the onepl model."""
         np.random.seed(86317)
@@ -51,6 +181,306 @@ class TestDichotomous(unittest.TestCase):
                                 options={'n_tune': 500, 'n_samples': 1000})
         result = girth_model(syn_data, progressbar=False)
 
+    def test_twopl_float32(self):
+        """Testing the twopl model in single precision."""
+        np.random.seed(79987)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        results = dict()
+        for precision in ['float64', 'float32']:
+            girth_model = GirthMCMC(model='2PL', 
+                                    options={'n_tune': 500, 'n_samples': 1000,
+                                             'precision': precision})
+            results[precision] = girth_model(syn_data, random_seed=3, 
+                                             progressbar=False)
+
+            self.assertEqual(girth_model.trace['Difficulty'].dtype, precision)
+
+        np.testing.assert_allclose(results['float32']['Difficulty'], 
+                                   results['float64']['Difficulty'], atol=0.25)
+
+        # Integer pattern counts keep a single precision likelihood
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'precision': 'float32', 
+                                         'marginal_ability': True,
+                                         'collapse_patterns': True})
+        girth_model(syn_data, random_seed=3, progressbar=False)
+
+        self.assertEqual(girth_model.built_model['Pattern_Weights'].dtype, 'float32')
+        self.assertEqual(girth_model.trace['Difficulty'].dtype, 'float32')
+
+    def test_logit_bernoulli(self):
+        """Testing the fused dichotomous likelihoods."""
+        import pymc3 as pm
+        from girth_mcmc.distributions import LogitBernoulli, GuessingLogitBernoulli
+
+        np.random.seed(5541)
+        kernel = 4 * np.random.randn(6, 40)
+        guessing = np.random.uniform(0, 0.3, (6, 1))
+        responses = (np.random.rand(6, 40) < 0.5).astype('int')
+
+        np.testing.assert_allclose(
+            LogitBernoulli.dist(logit_p=kernel).logp(responses).eval(),
+            pm.Bernoulli.dist(logit_p=kernel).logp(responses).eval(), atol=1e-10)
+
+        probabilities = guessing + (1 - guessing) / (1 + np.exp(-kernel))
+        np.testing.assert_allclose(
+            GuessingLogitBernoulli.dist(logit_p=kernel, guessing=guessing).logp(
+                responses).eval(),
+            pm.Bernoulli.dist(p=probabilities).logp(responses).eval(), atol=1e-10)
+
+        # Finite where the probabilities round to one
+        log_likelihood = GuessingLogitBernoulli.dist(
+            logit_p=np.array([-800., 800.]), guessing=0.1).logp(np.array([1, 0])).eval()
+        self.assertTrue(np.all(np.isfinite(log_likelihood)))
+
+    def test_shifted_rayleigh(self):
+        """Testing the shifted rayleigh discrimination prior."""
+        from scipy.stats import rayleigh
+        from girth_mcmc.distributions import ShiftedRayleigh, LogOffset
+
+        values = np.linspace(0.3, 4, 20)
+        distribution = ShiftedRayleigh.dist(beta=0.8, offset=0.25, shape=20)
+        np.testing.assert_allclose(distribution.logp(values).eval(),
+                                   rayleigh.logpdf(values, loc=0.25, scale=0.8),
+                                   atol=1e-10)
+
+        transform = LogOffset(0.25)
+        np.testing.assert_allclose(transform.backward(transform.forward_val(values)).eval(),
+                                   values)
+
+        draws = distribution.random(size=5000)
+        self.assertGreater(draws.min(), 0.25)
+        self.assertAlmostEqual(draws.mean(), 0.25 + 0.8 * np.sqrt(np.pi / 2), delta=0.05)
+
+    def test_twopl_initial_guess(self):
+        """Testing the twopl model starts at the classical estimates."""
+        np.random.seed(1873)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL')
+        _, initial_guess = girth_model.build_model(syn_data)
+        self.assertSetEqual(set(initial_guess), {'Discrimination', 'Difficulty', 'Ability'})
+        self.assertTupleEqual(initial_guess['Ability'].shape, (100,))
+        self.assertTrue(np.all(initial_guess['Discrimination'] > 0.25))
+
+        # No abilities when integrated out
+        for collapse_patterns in [False, True]:
+            girth_model = GirthMCMC(model='2PL', 
+                                    options={'marginal_ability': True,
+                                             'collapse_patterns': collapse_patterns})
+            _, initial_guess = girth_model.build_model(syn_data)
+            self.assertNotIn('Ability', initial_guess)
+
+        girth_model = GirthMCMC(model='2PL', options={'initial_guess': False})
+        _, initial_guess = girth_model.build_model(syn_data)
+        self.assertIsNone(initial_guess)
+
+    def test_twopl_adaptive_stopping(self):
+        """Testing the twopl model stops once converged."""
+        np.random.seed(44120)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 20000,
+                                         'n_processors': 2,
+                                         'adaptive_stopping': True, 
+                                         'target_rhat': 1.05, 'target_ess': 100, 
+                                         'block_size': 100})
+        result = girth_model(syn_data, progressbar=False)
+
+        self.assertTrue(girth_model.diagnostics[-1]['converged'])
+        self.assertEqual(len(girth_model.trace), girth_model.diagnostics[-1]['n_draws'])
+        self.assertLess(len(girth_model.trace), 10000)
+        self.assertTupleEqual(result['Difficulty'].shape, (10,))
+
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='2PL', options={'adaptive_stopping': True, 
+                                            'variational_inference': True})
+
+        # Out of time in the first of the sequential chains
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 200, 'n_samples': 200000,
+                                         'n_processors': 1, 'n_chains': 2,
+                                         'time_budget': 1})
+        with self.assertWarns(RuntimeWarning):
+            girth_model(syn_data, progressbar=False)
+
+        self.assertEqual(girth_model.trace.nchains, 1)
+
+    def test_twopl_chains(self):
+        """Testing the twopl model with more chains than workers."""
+        np.random.seed(90812)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 200, 'n_samples': 1000,
+                                         'n_processors': 2, 'n_chains': 4,
+                                         'n_threads': 1})
+        girth_model(syn_data, progressbar=False)
+
+        self.assertDictEqual(girth_model.parallelism, 
+                             {'n_chains': 4, 'n_cores': 2, 'n_threads': 1})
+        self.assertEqual(girth_model.trace.nchains, 4)
+        self.assertEqual(len(girth_model.trace), 250)
+
+    def test_twopl_fit_many(self):
+        """Testing the twopl model fits a batch of datasets."""
+        np.random.seed(30917)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+
+        datasets = {f'form_{ndx}': create_synthetic_irt_dichotomous(
+            difficulty, discrimination, np.random.randn(100)) for ndx in range(3)}
+        
+        # A broken form doesn't stop the batch
+        datasets['broken'] = np.zeros(10)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 200, 'n_samples': 400,
+                                         'n_processors': 1})
+        fits = {fit['key']: fit for fit in 
+                girth_model.fit_many(datasets, n_workers=2, progressbar=False,
+                                     random_seed=12)}
+
+        self.assertSetEqual(set(fits), set(datasets))
+        self.assertIsNone(fits['broken']['results'])
+        self.assertIsNotNone(fits['broken']['error'])
+
+        for ndx in range(3):
+            fit = fits[f'form_{ndx}']
+            self.assertIsNone(fit['error'])
+            self.assertTupleEqual(fit['results']['Difficulty'].shape, (10,))
+            self.assertIn('sample', fit['timings'])
+
+    def test_twopl_missing(self):
+        """Testing the twopl model excludes missing responses."""
+        np.random.seed(5609)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+        syn_data = np.ma.masked_array(syn_data, np.random.rand(*syn_data.shape) < 0.5)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 1000})
+        result = girth_model(syn_data, progressbar=False)
+
+        # No latent variables for the missing responses
+        self.assertNotIn('Log_Likelihood_missing', girth_model.built_model.named_vars)
+        self.assertEqual(girth_model.built_model['Observed'].get_value().size, 
+                         np.ma.count(syn_data))
+        self.assertTupleEqual(result['Ability'].shape, (100,))
+
+    def test_twopl_long_format(self):
+        """Testing the twopl model with long format responses."""
+        np.random.seed(73410)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+        items, people = np.nonzero(np.random.rand(*syn_data.shape) < 0.5)
+        long_format = LongFormatResponses(people, items, syn_data[items, people])
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 1000})
+        result = girth_model(long_format, progressbar=False, random_seed=6)
+
+        masked_result = girth_model(long_format.to_masked(), progressbar=False, 
+                                    random_seed=6)
+        np.testing.assert_allclose(result['Difficulty'], masked_result['Difficulty'])
+
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='2PL', options={'marginal_ability': True})(long_format)
+
+    def test_twopl_sharded(self):
+        """Testing the twopl model with consensus shards."""
+        np.random.seed(30981)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(400)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'n_processors': 1, 'n_shards': 2})
+        result = girth_model(syn_data, progressbar=False, random_seed=8)
+
+        self.assertTupleEqual(result['Ability'].shape, (400,))
+        self.assertGreater(np.corrcoef(result['Ability'], theta)[0, 1], 0.7)
+        self.assertGreater(np.corrcoef(result['Difficulty'], difficulty)[0, 1], 0.9)
+
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='2PL', options={'n_shards': 2, 'engine': 'gibbs'})
+
+        # Shards without responses to an item
+        girth_model = GirthMCMC(model='2PL', options={'n_shards': 500})
+        with self.assertRaises(ValueError):
+            girth_model(syn_data, progressbar=False)
+
+        # Every participant answers a single item
+        people = np.arange(12)
+        long_format = LongFormatResponses(people, people % 10, syn_data[people % 10, people])
+        girth_model = GirthMCMC(model='2PL', options={'n_shards': 2})
+        with self.assertRaises(ValueError):
+            girth_model(long_format, progressbar=False)
+
+    def test_twopl_warm_start(self):
+        """Testing the twopl model started from a previous posterior."""
+        np.random.seed(61230)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    np.random.randn(100))
+        new_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    np.random.randn(150))
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 1000})
+        previous = girth_model(syn_data, progressbar=False)
+        previous_trace = girth_model.trace
+        
+        # The abilities belong to other participants
+        built_model, _ = girth_model.build_model(new_data)
+        start, variance = warm_start_values(built_model, previous_trace)
+        self.assertNotIn('Ability', start)
+        self.assertIn('Discrimination_log_offset__', variance)
+        
+        girth_model.options['n_tune'] = 100
+        result = girth_model(new_data, warm_start=previous_trace, progressbar=False)
+        self.assertTupleEqual(result['Ability'].shape, (150,))
+
+        result = girth_model(new_data, warm_start=previous, progressbar=False)
+        self.assertTupleEqual(result['Difficulty'].shape, (10,))
+
     def test_threepl(self):
         """Testing the threepl model."""
         np.random.seed(8749)
@@ -66,6 +496,90 @@ class TestDichotomous(unittest.TestCase):
                                 options={'n_tune': 500, 'n_samples': 1000})
         result = girth_model(syn_data, progressbar=False)
 
+    def test_twopl_no_kernel(self):
+        """Testing the twopl model without storing the kernel."""
+        np.random.seed(79987)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'store_kernel': False})
+        result = girth_model(syn_data, progressbar=False)
+        
+        self.assertNotIn('PL_Kernel', girth_model.trace.varnames)
+
+        kernel = girth_model.pl_kernel()
+        self.assertTupleEqual(kernel.shape, syn_data.shape)
+        self.assertTrue(np.all((kernel > 0) & (kernel < 1)))
+
+        kernel_draw = girth_model.pl_kernel(10)
+        self.assertTupleEqual(kernel_draw.shape, syn_data.shape)
+
+    def test_twopl_marginal(self):
+        """Testing the twopl model with marginal ability."""
+        np.random.seed(79987)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'marginal_ability': True,
+                                         'quadrature_points': 31})
+        result = girth_model(syn_data, progressbar=False)
+
+        self.assertNotIn('Ability', girth_model.trace.varnames)
+        self.assertTupleEqual(result['Ability'].shape, (100,))
+        self.assertGreater(np.corrcoef(result['Ability'], theta)[0, 1], 0.5)
+
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='Rasch', options={'marginal_ability': True})
+
+    def test_threepl_marginal(self):
+        """Testing the threepl model with marginal ability."""
+        np.random.seed(8749)
+        discrimination = 1.28 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        guessing = np.abs(np.random.rand(10)*0.05)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta, guessing=guessing)
+
+        girth_model = GirthMCMC(model='3PL', 
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'marginal_ability': True})
+        result = girth_model(syn_data, progressbar=False)
+        self.assertTupleEqual(result['Ability'].shape, (100,))
+
+    def test_threepl_guessing_bound(self):
+        """Testing the threepl log-probability stays finite near guessing of one."""
+        np.random.seed(2214)
+        discrimination = 1.28 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        for marginal_ability in [False, True]:
+            girth_model = GirthMCMC(model='3PL', 
+                                    options={'marginal_ability': marginal_ability})
+            built_model, _ = girth_model.build_model(syn_data)
+
+            # Guessing of ~0.9997 on the unconstrained scale
+            point = built_model.test_point
+            point['Guessing_interval__'] = np.full(10, 8.0)
+            self.assertTrue(np.isfinite(built_model.logp(point)))
+
     def test_twopl_multidimensional(self):
         """Testing the multidimensional 2pl model."""
         rng = np.random.default_rng(349086720983719083471)
@@ -133,6 +647,33 @@ class TestDichotomousVariational(unittest.TestCase):
         
         girth_model(syn_data, progressbar=False)
 
+    def test_twopl_minibatch(self):
+        """Testing the twopl model with minibatches of participants."""
+        np.random.seed(31546)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(1000)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL',
+                                options={'variational_inference': True,
+                                         'variational_samples': 5000,
+                                         'n_samples': 1000,
+                                         'marginal_ability': True,
+                                         'minibatch_size': 100,
+                                         'learning_rate': 0.05,
+                                         'learning_rate_decay': 0.5})
+        result = girth_model(syn_data, progressbar=False)
+
+        self.assertTupleEqual(result['Ability'].shape, (1000,))
+        self.assertGreater(np.corrcoef(result['Difficulty'], difficulty)[0, 1], 0.9)
+
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='2PL', options={'minibatch_size': 100,
+                                            'marginal_ability': True})
+
     def test_threepl(self):
         np.random.seed(8749)
         discrimination = 1.28 * np.sqrt(-2 * np.log(np.random.rand(10)))
@@ -0,0 +1,158 @@
+import tempfile
+import unittest
+
+import numpy as np
+from scipy.special import erfcx
+
+from girth.synthetic import create_synthetic_irt_dichotomous
+from girth_mcmc import GirthMCMC
+from girth_mcmc.gibbs import rasch_gibbs, onepl_gibbs, twopl_gibbs
+from girth_mcmc.gibbs.normal_ogive import _lower_truncated_normal
+
+
+class TestGibbsSampler(unittest.TestCase):
+    """Tests the normal ogive gibbs samplers."""
+
+    def test_rasch(self):
+        """Testing the rasch gibbs sampler."""
+        rng = np.random.default_rng(5539284756001)
+        difficulty = rng.standard_normal(10)
+        theta = rng.standard_normal(1000)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, 1, theta, 
+                                                    seed=rng)
+        trace = rasch_gibbs(syn_data, n_samples=500, n_tune=200, seed=rng)
+
+        self.assertTupleEqual(trace['Ability'].shape, (500, 1000))
+        self.assertTupleEqual(trace['Difficulty'].shape, (500, 10))
+        self.assertNotIn('Discrimination', trace)
+        np.testing.assert_allclose(trace['Difficulty'].mean(0), difficulty,
+                                   atol=0.25)
+
+    def test_onepl(self):
+        """Testing the onepl gibbs sampler."""
+        rng = np.random.default_rng(734529811)
+        difficulty = rng.standard_normal(10)
+        theta = rng.standard_normal(1000)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, 1.4, theta, 
+                                                    seed=rng)
+        trace = onepl_gibbs(syn_data, n_samples=500, n_tune=200, seed=rng)
+
+        self.assertTupleEqual(trace['Discrimination'].shape, (500,))
+        self.assertAlmostEqual(trace['Discrimination'].mean(), 1.4, delta=0.2)
+
+    def test_twopl(self):
+        """Testing the twopl gibbs sampler."""
+        rng = np.random.default_rng(9120394857)
+        discrimination = rng.uniform(0.5, 2.0, 10)
+        difficulty = rng.standard_normal(10)
+        theta = rng.standard_normal(2000)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta, seed=rng)
+        trace = twopl_gibbs(syn_data, n_samples=500, n_tune=200, seed=rng)
+
+        self.assertTrue(np.all(trace['Discrimination'] > 0.25))
+        np.testing.assert_allclose(trace['Discrimination'].mean(0), 
+                                   discrimination, atol=0.4)
+        np.testing.assert_allclose(trace['Difficulty'].mean(0), 
+                                   difficulty, atol=0.3)
+
+    def test_twopl_missing(self):
+        """Testing the twopl gibbs sampler with missing data."""
+        rng = np.random.default_rng(11920394857)
+        discrimination = rng.uniform(0.5, 2.0, 10)
+        difficulty = rng.standard_normal(10)
+        theta = rng.standard_normal(1000)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta, seed=rng)
+        mask = rng.uniform(size=syn_data.shape) < 0.2
+        syn_data = np.ma.masked_array(syn_data, mask)
+
+        trace = twopl_gibbs(syn_data, n_samples=200, n_tune=100, seed=rng)
+        self.assertFalse(np.isnan(trace['Ability']).any())
+
+
+class TestGibbsEngine(unittest.TestCase):
+    """Tests running the gibbs engine through the girth class."""
+
+    def test_twopl_engine(self):
+        """Testing the gibbs engine returns the 2PL dictionary."""
+        np.random.seed(79987)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        girth_model = GirthMCMC(model='2PL', 
+                                options={'n_tune': 500, 'n_samples': 1000,
+                                         'engine': 'gibbs'})
+        result = girth_model(syn_data, random_seed=43)
+        
+        self.assertSetEqual(set(result.keys()), 
+                            {'Discrimination', 'Difficulty', 'Ability', 
+                             'Difficulty Sigma', 'Rayleigh Scale'})
+        self.assertTupleEqual(result['Ability'].shape, (100,))
+
+    def test_result_cache(self):
+        """Testing a repeated fit is read from the result cache."""
+        np.random.seed(2291)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(np.random.rand(10)))
+        difficulty = np.random.randn(10)
+        theta = np.random.randn(100)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination, 
+                                                    theta)
+
+        with tempfile.TemporaryDirectory() as directory:
+            options = {'n_tune': 200, 'n_samples': 400, 'engine': 'gibbs',
+                       'result_cache': directory, 'cache_traces': True}
+            
+            girth_model = GirthMCMC(model='2PL', options=options)
+            result = girth_model(syn_data, random_seed=43)
+            self.assertIn('sample', girth_model.timings)
+
+            cached_model = GirthMCMC(model='2PL', options=options)
+            cached_result = cached_model(syn_data, random_seed=43)
+            self.assertNotIn('sample', cached_model.timings)
+            np.testing.assert_equal(cached_result, result)
+            np.testing.assert_equal(cached_model.trace['Difficulty'], 
+                                    girth_model.trace['Difficulty'])
+
+            # A different seed is a different fit
+            cached_model(syn_data, random_seed=44)
+            self.assertIn('sample', cached_model.timings)
+
+            # Unseeded fits are never read back
+            for _ in range(2):
+                cached_model(syn_data)
+                self.assertIn('sample', cached_model.timings)
+
+    def test_truncated_normal_tail(self):
+        """Testing truncated normal draws far into the tail."""
+        rng = np.random.default_rng(730594162)
+        lower = np.array([-3., 0., 3., 10., 50., 100.])
+
+        draws = np.stack([_lower_truncated_normal(np.zeros(6), 1.0, lower, rng)
+                          for _ in range(20000)])
+        self.assertTrue(np.all(draws >= lower))
+
+        # Mean of the truncated standard normal, the inverse mills ratio
+        expected = np.sqrt(2 / np.pi) / erfcx(lower / np.sqrt(2))
+        np.testing.assert_allclose(draws.mean(0), expected, atol=0.02)
+
+        # Bounds far above the mean on the original scale
+        self.assertGreaterEqual(_lower_truncated_normal(-80., 2., 0., rng), 0)
+
+    def test_unsupported_engine(self):
+        """Testing the gibbs engine with an unsupported model."""
+        with self.assertRaises(AssertionError):
+            GirthMCMC(model='3PL', options={'engine': 'gibbs'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,6 +27,46 @@ class TestPolytomous(unittest.TestCase):
                                 options={'n_tune': 1000, 'n_samples': 1000})
         result = girth_model(syn_data, progressbar=False)
 
+        self.assertTupleEqual(result['Difficulty'].shape, (5, n_categories - 1))
+        self.assertIn('Thresholds', girth_model.trace.varnames)
+
+    def test_graded_response_float32(self):
+        """Testing the grm in single precision."""
+        import pymc3 as pm
+        from girth_mcmc.distributions import GradedResponse
+
+        np.random.seed(7731)
+        n_categories = 4
+
+        # Same probabilities as the ordered logistic
+        cutpoints = np.sort(np.random.randn(5, 1, n_categories - 1), axis=-1)
+        eta = np.random.randn(5, 20)
+        np.testing.assert_allclose(
+            GradedResponse.dist(eta=eta, cutpoints=cutpoints).p.eval(),
+            pm.OrderedLogistic.dist(eta=eta, cutpoints=cutpoints).p.eval(), 
+            atol=1e-10)
+
+        # Finite far in the tails
+        log_p = GradedResponse.dist(eta=np.array([-60., 60.]), 
+                                    cutpoints=np.array([-1., 0., 1.])).log_p.eval()
+        self.assertTrue(np.all(np.isfinite(log_p)))
+
+        difficulty = np.random.randn(5, n_categories-1)
+        difficulty = np.sort(difficulty, 1)        
+        discrimination = 0.96 * np.sqrt(-2 * np.log(np.random.rand(5)))
+        theta = np.random.randn(150)
+
+        syn_data = create_synthetic_irt_polytomous(difficulty, discrimination, 
+                                                   theta, model='grm')
+
+        girth_model = GirthMCMC(model='GRM', model_args=(n_categories,),
+                                options={'n_tune': 1000, 'n_samples': 1000,
+                                         'precision': 'float32'})
+        result = girth_model(syn_data, progressbar=False)
+
+        self.assertEqual(girth_model.trace['Thresholds'].dtype, np.float32)
+        self.assertTrue(np.all(np.isfinite(result['Difficulty'])))
+
     def test_partial_credit(self):
         """Testing Partial Credit Model."""
         rng = np.random.default_rng(84445166253145643984335315216)
@@ -43,6 +83,71 @@ class TestPolytomous(unittest.TestCase):
                                 options={'n_tune': 1000, 'n_samples': 1000})
         result = girth_model(syn_data, progressbar=False)
 
+    def test_partial_credit_initial_guess(self):
+        """Testing the pcm starts at unordered step difficulties."""
+        np.random.seed(5531)
+        n_categories = 3
+
+        # Reversed steps, the middle category is rare
+        difficulty = np.tile([0.8, -0.8], (5, 1))
+        discrimination = np.full(5, 1.3)
+        theta = np.random.randn(2000)
+
+        syn_data = create_synthetic_irt_polytomous(difficulty, discrimination, 
+                                                   theta, model='pcm')
+
+        girth_model = GirthMCMC(model='PCM', model_args=(n_categories,))
+        _, initial_guess = girth_model.build_model(syn_data)
+        thresholds = initial_guess['Thresholds']
+
+        self.assertTupleEqual(thresholds.shape, (5, n_categories - 1))
+        self.assertTrue(np.all(thresholds[:, 0] > thresholds[:, 1]))
+
+    def test_marginal_ability(self):
+        """Testing the grm and pcm with marginal ability."""
+        np.random.seed(46899)
+        n_categories = 3
+
+        difficulty = np.random.randn(5, n_categories-1)
+        difficulty = np.sort(difficulty, 1)        
+        discrimination = 0.96 * np.sqrt(-2 * np.log(np.random.rand(5)))
+        theta = np.random.randn(150)
+
+        for model in ['grm', 'pcm']:
+            syn_data = create_synthetic_irt_polytomous(difficulty, discrimination, 
+                                                       theta, model=model)
+
+            girth_model = GirthMCMC(model=model, model_args=(n_categories,),
+                                    options={'n_tune': 1000, 'n_samples': 1000,
+                                             'marginal_ability': True})
+            result = girth_model(syn_data, progressbar=False)
+
+            self.assertNotIn('Ability', girth_model.trace.varnames)
+            self.assertTupleEqual(result['Ability'].shape, (150,))
+            self.assertTupleEqual(result['Difficulty'].shape, (5, n_categories - 1))
+
+    def test_collapsed_patterns(self):
+        """Testing the grm and pcm with collapsed response patterns."""
+        np.random.seed(46899)
+        n_categories = 3
+
+        difficulty = np.random.randn(4, n_categories-1)
+        difficulty = np.sort(difficulty, 1)        
+        discrimination = 0.96 * np.sqrt(-2 * np.log(np.random.rand(4)))
+        theta = np.random.randn(300)
+
+        for model in ['grm', 'pcm']:
+            syn_data = create_synthetic_irt_polytomous(difficulty, discrimination, 
+                                                       theta, model=model)
+
+            girth_model = GirthMCMC(model=model, model_args=(n_categories,),
+                                    options={'n_tune': 1000, 'n_samples': 1000,
+                                             'marginal_ability': True,
+                                             'collapse_patterns': True})
+            result = girth_model(syn_data, progressbar=False)
+
+            self.assertTupleEqual(result['Ability'].shape, (300,))
+
     def test_multidimensional_grm(self):
         """Testing Multidimensional GRM."""
         rng = np.random.default_rng(29452344633211231635433213)
@@ -61,6 +166,8 @@ class TestPolytomous(unittest.TestCase):
                                 options={'n_tune': 1000, 'n_samples': 1000})
         result = girth_model(syn_data, progressbar=False)
 
+        self.assertTupleEqual(result['Difficulty'].shape, (20, n_categories - 1))
+
         with self.assertRaises(AssertionError):
             girth_model = GirthMCMC(model='GRM_MD', model_args=(n_categories, 1),
                                     options={'n_tune': 1000, 'n_samples': 1000})
@@ -0,0 +1,118 @@
+import unittest
+
+import numpy as np
+
+from girth import ability_map
+from girth.synthetic import (create_synthetic_irt_dichotomous,
+                             create_synthetic_irt_polytomous)
+from girth_mcmc.scoring import score_abilities
+from girth_mcmc.utils import product_grid_quadrature, one_hot_responses
+
+
+class TestAbilityScoring(unittest.TestCase):
+    """Test Fixture for scoring against calibrated items."""
+
+    def test_dichotomous_scoring(self):
+        """Testing EAP / MAP scoring of the 2PL model."""
+        rng = np.random.default_rng(4325)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(rng.uniform(size=20)))
+        difficulty = rng.standard_normal(20)
+        theta = rng.standard_normal(1000)
+
+        syn_data = create_synthetic_irt_dichotomous(difficulty, discrimination,
+                                                    theta, seed=43)
+        parameters = {'Discrimination': discrimination, 'Difficulty': difficulty}
+
+        result = score_abilities(syn_data, parameters)
+        self.assertGreater(np.corrcoef(result['Ability'], theta)[0, 1], 0.85)
+        self.assertTrue(np.all(result['Ability SD'] < 1))
+
+        result = score_abilities(syn_data, parameters, method='MAP')
+        expected = ability_map(syn_data, difficulty, discrimination)
+        np.testing.assert_allclose(result['Ability'], expected, atol=1e-4)
+
+        with self.assertRaises(AssertionError):
+            score_abilities(syn_data, parameters, method='MLE')
+
+    def test_polytomous_scoring(self):
+        """Testing EAP / MAP scoring of the graded response model."""
+        rng = np.random.default_rng(90342)
+        discrimination = 0.89 * np.sqrt(-2 * np.log(rng.uniform(size=15)))
+        difficulty = np.sort(rng.standard_normal((15, 3)), 1)
+        theta = rng.standard_normal(500)
+
+        syn_data = create_synthetic_irt_polytomous(difficulty, discrimination,
+                                                   theta, model='grm', seed=91)
+        syn_data = np.ma.masked_array(syn_data, rng.uniform(size=syn_data.shape) < .1)
+        parameters = {'Discrimination': discrimination, 'Difficulty': difficulty}
+
+        eap = score_abilities(syn_data, parameters)
+        map_result = score_abilities(syn_data, parameters, method='MAP')
+
+        self.assertGreater(np.corrcoef(eap['Ability'], theta)[0, 1], 0.85)
+        np.testing.assert_allclose(eap['Ability'], map_result['Ability'], atol=0.2)
+
+    def test_multidimensional_scoring(self):
+        """Testing product grid scoring of the multidimensional 2PL."""
+        rng = np.random.default_rng(1187)
+        discrimination = rng.uniform(-1.5, 1.5, (30, 2))
+        difficulty = rng.standard_normal(30)
+        theta = rng.standard_normal((2, 1000))
+
+        kernel = discrimination @ theta + difficulty[:, None]
+        syn_data = (rng.uniform(size=kernel.shape) < 1 / (1 + np.exp(-kernel))).astype(int)
+        parameters = {'Discrimination': discrimination, 'Difficulty': difficulty}
+
+        eap = score_abilities(syn_data, parameters)
+        map_result = score_abilities(syn_data, parameters, method='MAP')
+        self.assertTupleEqual(eap['Ability'].shape, (1000, 2))
+
+        for result in [eap, map_result]:
+            for factor in range(2):
+                self.assertGreater(np.corrcoef(result['Ability'][:, factor], 
+                                               theta[factor])[0, 1], 0.8)
+
+    def test_multidimensional_dense_reference(self):
+        """Testing multidimensional EAP against a dense quadrature grid."""
+        rng = np.random.default_rng(90417)
+
+        # Unpruned Gauss-Hermite grid of every dimension
+        for n_factors, n_points, tolerance in [(2, 61, 0.005), (3, 41, 0.02)]:
+            discrimination = rng.uniform(-1.5, 1.5, (80, n_factors))
+            difficulty = rng.standard_normal(80)
+            theta = rng.standard_normal((n_factors, 200))
+
+            kernel = discrimination @ theta + difficulty[:, None]
+            syn_data = (rng.uniform(size=kernel.shape) < 
+                        1 / (1 + np.exp(-kernel))).astype(int)
+            parameters = {'Discrimination': discrimination, 'Difficulty': difficulty}
+
+            nodes, weights = product_grid_quadrature(n_factors, n_points, tolerance=0)
+            kernel = discrimination @ nodes.T + difficulty[:, None]
+            log_probabilities = np.stack([-np.logaddexp(0, kernel), 
+                                          -np.logaddexp(0, -kernel)], axis=1)
+            log_likelihood = (one_hot_responses(syn_data, 2).astype(float) 
+                              @ log_probabilities.reshape(-1, nodes.shape[0]))
+            posterior = weights * np.exp(log_likelihood 
+                                         - log_likelihood.max(axis=1, keepdims=True))
+            posterior /= posterior.sum(axis=1, keepdims=True)
+            reference = posterior @ nodes
+            reference_sd = np.sqrt(posterior @ np.square(nodes) - np.square(reference))
+
+            eap = score_abilities(syn_data, parameters)
+            np.testing.assert_allclose(eap['Ability'], reference, atol=tolerance)
+            np.testing.assert_allclose(eap['Ability SD'], reference_sd, atol=tolerance)
+            self.assertTrue(np.all(eap['Ability SD'] > 0))
+
+    def test_product_grid(self):
+        """Testing the pruned product grid integrates normal moments."""
+        nodes, weights = product_grid_quadrature(3, 11)
+
+        self.assertTrue(np.all(weights > 0))
+        self.assertAlmostEqual(weights.sum(), 1)
+        self.assertAlmostEqual(weights @ np.square(nodes[:, 1]), 1, places=6)
+        self.assertAlmostEqual(weights @ (nodes[:, 0]**4 * nodes[:, 2]**2), 3, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
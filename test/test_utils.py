@@ -1,9 +1,25 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
 
 import numpy as np
 
 from girth_mcmc.utils import validate_mcmc_options, default_mcmc_options
-from girth_mcmc.utils import tag_missing_data_mcmc, get_discrimination_indices
+from girth_mcmc.utils import (tag_missing_data_mcmc, get_discrimination_indices,
+                              observed_cells, LongFormatResponses)
+from girth_mcmc.utils import collapse_response_patterns
+from girth_mcmc.utils import ModelCache, PhaseTimer
+from girth_mcmc.utils import (shard_participants, select_participants, 
+                              consensus_draws)
+from girth_mcmc.utils import (classical_test_statistics, classical_discrimination,
+                              classical_thresholds)
+from girth_mcmc.utils import split_rhat, effective_sample_size, ConvergenceMonitor
+from girth_mcmc.utils import (physical_cores, available_cpus, resolve_parallelism,
+                              limit_threads)
+from girth_mcmc.utils import ResultCache
 
 
 class TestMCMCOptions(unittest.TestCase):
@@ -11,7 +27,7 @@ class TestMCMCOptions(unittest.TestCase):
 
     def setUp(self):
         """Setup constructor."""
-        self.number_of_keys = 7
+        self.number_of_keys = 35
 
     def test_default_options(self):
         """Testing default creation."""
@@ -23,11 +39,38 @@ class TestMCMCOptions(unittest.TestCase):
         self.assertDictEqual(
             option_dict,
             {
+            "n_chains": None, "n_threads": None,
             "n_tune": 2500, "n_samples": 10000, 
             "variational_inference": False, 
             "variational_model": 'advi', 
             "variational_samples": 15000, 
-            "initial_guess": True})
+            "initial_guess": True,
+            "store_kernel": True,
+            "engine": 'pymc',
+            "marginal_ability": False,
+            "quadrature_points": 41,
+            "collapse_patterns": False,
+            "model_cache_size": 0,
+            "streaming_summary": False,
+            "keep_draws": True,
+            "summary_quantiles": (0.025, 0.5, 0.975),
+            "trace_backend": 'memory',
+            "trace_directory": None,
+            "profile": None,
+            "minibatch_size": None,
+            "learning_rate": None,
+            "learning_rate_decay": 0.0,
+            "n_shards": 1,
+            "shard_executor": None,
+            "adaptive_stopping": False,
+            "target_rhat": 1.01,
+            "target_ess": 400,
+            "block_size": 250,
+            "time_budget": None,
+            "result_cache": None,
+            "result_cache_size": 1024,
+            "cache_traces": False,
+            "precision": 'float64'})
 
     def test_validate_options(self):
         """Validating MCMC Options."""
@@ -37,23 +80,85 @@ class TestMCMCOptions(unittest.TestCase):
         self.assertDictEqual(
             option_dict,
             {"n_processors": 4,
+            "n_chains": None, "n_threads": None,
             "n_tune": 2500, "n_samples": 10000, 
             "variational_inference": False, 
             "variational_model": 'advi', 
             "variational_samples": 15000, 
-            "initial_guess": True})
+            "initial_guess": True,
+            "store_kernel": True,
+            "engine": 'pymc',
+            "marginal_ability": False,
+            "quadrature_points": 41,
+            "collapse_patterns": False,
+            "model_cache_size": 0,
+            "streaming_summary": False,
+            "keep_draws": True,
+            "summary_quantiles": (0.025, 0.5, 0.975),
+            "trace_backend": 'memory',
+            "trace_directory": None,
+            "profile": None,
+            "minibatch_size": None,
+            "learning_rate": None,
+            "learning_rate_decay": 0.0,
+            "n_shards": 1,
+            "shard_executor": None,
+            "adaptive_stopping": False,
+            "target_rhat": 1.01,
+            "target_ess": 400,
+            "block_size": 250,
+            "time_budget": None,
+            "result_cache": None,
+            "result_cache_size": 1024,
+            "cache_traces": False,
+            "precision": 'float64'})
 
         bad_keys = {"n_processors": "4",
+            "n_chains": 0, "n_threads": 2.0,
             "n_tune": 54.3, "n_samples": 5235.23, 
             "variational_inference": 2, 
             "variational_model": 'advis', 
             "variational_samples": 15000.22, 
-            "initial_guess": 'True'}
+            "initial_guess": 'True',
+            "store_kernel": 1,
+            "engine": 'stan',
+            "marginal_ability": 'yes',
+            "quadrature_points": 1,
+            "collapse_patterns": None,
+            "model_cache_size": -1,
+            "streaming_summary": 0,
+            "keep_draws": 'no',
+            "summary_quantiles": [0.5, 1.5],
+            "trace_backend": 'zarr',
+            "trace_directory": 3,
+            "profile": 'line',
+            "minibatch_size": 0,
+            "learning_rate": -0.1,
+            "learning_rate_decay": 1.5,
+            "n_shards": 0,
+            "shard_executor": 'pool',
+            "adaptive_stopping": 1,
+            "target_rhat": 0.99,
+            "target_ess": 400.5,
+            "block_size": 10,
+            "time_budget": -60,
+            "result_cache": 3,
+            "result_cache_size": 0,
+            "cache_traces": 'yes',
+            "precision": 'float16'}
 
         for (key, value) in bad_keys.items():
             with self.assertRaises(AssertionError):
                 validate_mcmc_options({key: value})
 
+        # Any positive real step size
+        option_dict = validate_mcmc_options({'learning_rate': 1, 
+                                             'learning_rate_decay': 1})
+        self.assertEqual(option_dict['learning_rate'], 1)
+
+        with self.assertRaises(AssertionError):
+            validate_mcmc_options({'learning_rate': True})
+
         with self.assertRaises(AssertionError):
             validate_mcmc_options([1, 2, 3])
 
@@ -72,6 +177,352 @@ class TestMissingValue(unittest.TestCase):
         
         np.testing.assert_equal(mask_bad, tagged_data.mask)
 
+    def test_observed_cells(self):
+        """Testing gathering the observed responses."""
+        dataset = np.ma.masked_array([[1, 0, 1], [0, 1, 1]], 
+                                     [[False, True, False], [True, False, False]])
+
+        item_index, person_index, responses = observed_cells(dataset)
+
+        np.testing.assert_equal(item_index, [0, 0, 1, 1])
+        np.testing.assert_equal(person_index, [0, 2, 1, 2])
+        np.testing.assert_equal(responses, [1, 1, 1, 1])
+
+    def test_long_format(self):
+        """Testing long format responses."""
+        long_format = LongFormatResponses(['b', 'a', 'b', 'c'], [20, 10, 10, 20], 
+                                          [1, 2, 3, 2])
+
+        self.assertTupleEqual(long_format.shape, (2, 3))
+        self.assertEqual(long_format.count(), 4)
+        np.testing.assert_equal(long_format.person_labels, ['a', 'b', 'c'])
+
+        shifted = long_format - long_format.min()
+        item_index, person_index, responses = observed_cells(shifted)
+        np.testing.assert_equal(responses, [0, 1, 2, 1])
+
+        expected = np.ma.masked_array([[1, 2, 0], [0, 0, 1]], 
+                                      [[False, False, True], [True, False, False]])
+        np.testing.assert_equal(shifted.to_masked()[item_index, person_index],
+                                expected[item_index, person_index])
+        np.testing.assert_equal(shifted.to_masked().mask, expected.mask)
+
+        with self.assertRaises(AssertionError):
+            LongFormatResponses([1, 2], [1], [0, 1])
+
+
+class TestResponsePatterns(unittest.TestCase):
+    """Test Fixture for response pattern collapsing."""
+
+    def test_collapse_patterns(self):
+        """Testing collapsing response patterns."""
+        rng = np.random.default_rng(8723409875234)
+
+        dataset = rng.integers(0, 2, (4, 1000))
+        patterns, counts, pattern_index = collapse_response_patterns(dataset)
+
+        self.assertLessEqual(patterns.shape[1], 16)
+        self.assertEqual(counts.sum(), 1000)
+        np.testing.assert_equal(patterns[:, pattern_index], dataset)
+
+    def test_collapse_missing_patterns(self):
+        """Testing collapsing response patterns with missing data."""
+        rng = np.random.default_rng(2340987523409)
+
+        dataset = rng.integers(0, 3, (4, 1000))
+        tagged_data = tag_missing_data_mcmc(dataset, [1, 2])
+        patterns, counts, pattern_index = collapse_response_patterns(tagged_data)
+
+        np.testing.assert_equal(patterns.mask[:, pattern_index], tagged_data.mask)
+        np.testing.assert_equal(patterns[:, pattern_index].compressed(), 
+                                tagged_data.compressed())
+        self.assertEqual(counts.sum(), 1000)
+
+
+class TestModelCache(unittest.TestCase):
+    """Test Fixture for the model template cache."""
+
+    def test_least_recently_used(self):
+        """Testing the least recently used eviction."""
+        cache = ModelCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn('b', cache)
+        self.assertIsNone(cache.get('b'))
+
+        cache.resize(1)
+        self.assertListEqual(['c'], [key for key in ['a', 'c'] if key in cache])
+
+        cache.resize(0)
+        self.assertEqual(len(cache), 0)
+
+
+class TestPhaseTimer(unittest.TestCase):
+    """Test Fixture for the phase timer."""
+
+    def test_phase_timer(self):
+        """Testing the phases are recorded and accumulated."""
+        hooked = list()
+        timer = PhaseTimer([lambda name, timing: hooked.append(name)])
+
+        with timer.phase('build'):
+            np.linalg.inv(np.eye(100) * 2)
+
+        timer.record('build', 1.0)
+
+        self.assertListEqual(hooked, ['build', 'build'])
+        self.assertGreater(timer.timings['build']['wall_time'], 1.0)
+        self.assertGreaterEqual(timer.timings['build']['cpu_time'], 0)
+        self.assertIn('process_peak_rss_mb', timer.timings['build'])
+
+        with self.assertRaises(ValueError):
+            with timer.phase('error'):
+                raise ValueError
+
+        self.assertIn('error', timer.timings)
+
+
+class TestConsensus(unittest.TestCase):
+    """Test Fixture for consensus Monte Carlo."""
+
+    def test_shard_participants(self):
+        """Testing the shards partition the participants."""
+        shards = shard_participants(103, 4, seed=42)
+
+        self.assertEqual(len(shards), 4)
+        np.testing.assert_equal(np.sort(np.concatenate(shards)), np.arange(103))
+
+        long_format = LongFormatResponses(['b', 'a', 'b', 'c'], [20, 10, 10, 20], 
+                                          [1, 2, 3, 2])
+        subset = select_participants(long_format, [0, 2])
+
+        self.assertTupleEqual(subset.shape, (2, 2))
+        np.testing.assert_equal(subset.to_masked().mask, 
+                                long_format.to_masked().mask[:, [0, 2]])
+
+    def test_consensus_draws(self):
+        """Testing the precision weighting of the shard draws."""
+        rng = np.random.default_rng(98234509873)
+
+        precise = rng.normal(1.0, 0.1, (4000, 3))
+        diffuse = rng.normal(2.0, 1.0, (4000, 3))
+        draws = consensus_draws([precise, diffuse])
+
+        # Weights of 100 to 1
+        np.testing.assert_allclose(draws.mean(axis=0), 1.01, atol=0.01)
+        np.testing.assert_allclose(draws.std(axis=0), 0.1 * np.sqrt(100 / 101), 
+                                   rtol=0.05)
+
+
+class TestInitialGuess(unittest.TestCase):
+    """Test Fixture for the classical initial guesses."""
+
+    def test_classical_statistics(self):
+        """Testing the classical test statistics."""
+        rng = np.random.default_rng(3421)
+        ability = rng.standard_normal(2000)
+        difficulty = np.linspace(-1.5, 1.5, 8)
+        dataset = (rng.random((8, 2000)) < 
+                   1 / (1 + np.exp(difficulty[:, None] - 1.5 * ability))).astype(int)
+
+        proportions, item_rest, estimates = classical_test_statistics(dataset)
+        self.assertTupleEqual(proportions.shape, (8, 1))
+        self.assertTrue(np.all(np.diff(proportions[:, 0]) < 0))
+        self.assertTrue(np.all(item_rest > 0.2))
+        self.assertAlmostEqual(estimates.mean(), 0)
+        self.assertGreater(np.corrcoef(estimates, ability)[0, 1], 0.75)
+
+        discrimination = classical_discrimination(item_rest)
+        self.assertTrue(np.all(discrimination > 0.25))
+
+        estimated_difficulty = classical_thresholds(proportions[:, 0], discrimination)
+        self.assertGreater(np.corrcoef(estimated_difficulty, difficulty)[0, 1], 0.95)
+
+        # Missing and long format responses give the same statistics
+        missing = tag_missing_data_mcmc(dataset, [0, 1])
+        missing[0, :10] = np.ma.masked
+        item_index, person_index, responses = observed_cells(missing)
+        long_format = LongFormatResponses(person_index, item_index, responses)
+
+        for result, expected in zip(classical_test_statistics(long_format),
+                                    classical_test_statistics(missing)):
+            np.testing.assert_allclose(result, expected)
+
+    def test_classical_polytomous(self):
+        """Testing the classical statistics of polytomous responses."""
+        rng = np.random.default_rng(982)
+        dataset = rng.integers(1, 5, size=(5, 300))
+
+        proportions, item_rest, ability = classical_test_statistics(dataset, 4)
+        self.assertTupleEqual(proportions.shape, (5, 3))
+        self.assertTupleEqual(ability.shape, (300,))
+        self.assertTrue(np.all(np.diff(proportions, axis=1) < 0))
+
+        thresholds = classical_thresholds(proportions, classical_discrimination(item_rest))
+        self.assertTrue(np.all(np.abs(thresholds) <= 4))
+
+
+class TestConvergence(unittest.TestCase):
+    """Test Fixture for the convergence diagnostics."""
+
+    def test_diagnostics(self):
+        """Testing split R-hat and effective sample size."""
+        rng = np.random.default_rng(7732)
+        independent = rng.standard_normal((4, 1000, 3))
+
+        np.testing.assert_allclose(split_rhat(independent), 1, atol=0.01)
+        ess = effective_sample_size(independent)
+        self.assertTupleEqual(ess.shape, (3,))
+        self.assertTrue(np.all(ess > 3000))
+        self.assertTrue(np.all(effective_sample_size(independent, 'tail') > 2000))
+
+        # Autocorrelated chains with a shifted chain
+        correlated = np.zeros((4, 1000, 3))
+        for ndx in range(1, 1000):
+            correlated[:, ndx] = 0.9 * correlated[:, ndx - 1] + rng.standard_normal((4, 3))
+        self.assertTrue(np.all(effective_sample_size(correlated) < 600))
+
+        correlated[1] += 5
+        self.assertTrue(np.all(split_rhat(correlated) > 1.1))
+
+        with self.assertRaises(AssertionError):
+            effective_sample_size(independent, 'median')
+
+    def test_convergence_monitor(self):
+        """Testing the blocks of the convergence monitor."""
+        rng = np.random.default_rng(1094)
+        monitor = ConvergenceMonitor(['Difficulty', 'Constant'], 2, 600, 
+                                     target_ess=500, block_size=100)
+
+        converged = list()
+        for _ in range(600):
+            for chain in range(2):
+                converged.append(monitor.update(chain, {'Difficulty': rng.standard_normal(3),
+                                                        'Constant': np.ones(1)}))
+
+        self.assertListEqual([block['n_draws'] for block in monitor.history],
+                             [100, 200, 300, 400, 500, 600])
+        self.assertFalse(monitor.history[0]['converged'])
+        self.assertTrue(monitor.history[-1]['converged'])
+        self.assertEqual(sum(converged), sum(block['converged'] 
+                                             for block in monitor.history))
+
+
+class TestParallelism(unittest.TestCase):
+    """Test Fixture for the chain, worker and thread layout."""
+
+    def test_resolve_parallelism(self):
+        """Testing the chains, workers and threads of a run."""
+        self.assertGreaterEqual(available_cpus(), physical_cores())
+
+        options = validate_mcmc_options({'n_processors': 2})
+        self.assertDictEqual(resolve_parallelism(options, (10, 100)),
+                             {'n_chains': 2, 'n_cores': 2, 'n_threads': None})
+
+        options = validate_mcmc_options({'n_processors': 2, 'n_chains': 8, 
+                                         'n_threads': 3})
+        self.assertDictEqual(resolve_parallelism(options, (10, 100)),
+                             {'n_chains': 8, 'n_cores': 2, 'n_threads': 3})
+
+        options = validate_mcmc_options({'n_processors': 'auto'})
+        parallelism = resolve_parallelism(options, (10, 100))
+        self.assertEqual(parallelism['n_chains'], 4)
+        self.assertEqual(parallelism['n_cores'], min(4, physical_cores()))
+        self.assertEqual(parallelism['n_threads'], 1)
+
+        # Large problems spend the remaining cores on threads
+        parallelism = resolve_parallelism(options, (100, 100000))
+        self.assertEqual(parallelism['n_threads'], 
+                         max(physical_cores() // parallelism['n_cores'], 1))
+
+    def test_limit_threads(self):
+        """Testing the thread variables are restored."""
+        previous = os.environ.get('OMP_NUM_THREADS')
+
+        with limit_threads(3):
+            self.assertEqual(os.environ['OMP_NUM_THREADS'], '3')
+            self.assertEqual(os.environ['OPENBLAS_NUM_THREADS'], '3')
+
+        self.assertEqual(os.environ.get('OMP_NUM_THREADS'), previous)
+
+        with limit_threads(None):
+            self.assertEqual(os.environ.get('OMP_NUM_THREADS'), previous)
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test Fixture for the lightweight imports."""
+
+    def test_light_imports(self):
+        """Testing the package imports without PyMC3 or Theano."""
+        script = ("import sys, girth_mcmc, girth_mcmc.utils, girth_mcmc.scoring\n"
+                  "print([name for name in ['pymc3', 'theano'] if name in sys.modules])")
+        output = subprocess.run([sys.executable, '-c', script], check=True,
+                                capture_output=True, text=True).stdout
+
+        self.assertEqual(output.strip(), '[]')
+
+
+class TestResultCache(unittest.TestCase):
+    """Test Fixture for the on-disk result cache."""
+
+    def test_cache_key(self):
+        """Testing the key changes with everything that changes the fit."""
+        dataset = np.random.default_rng(231).integers(0, 2, (5, 40))
+        options = default_mcmc_options()
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory)
+            key = cache.key(dataset, '2pl', None, options, {'random_seed': 3})
+
+            self.assertEqual(key, cache.key(dataset.copy(), '2pl', None, options, 
+                                            {'random_seed': 3, 'progressbar': False}))
+            self.assertEqual(key, cache.key(dataset, '2pl', None, 
+                                            dict(options, result_cache=directory),
+                                            {'random_seed': 3}))
+
+            changed = dataset.copy()
+            changed[0, 0] = 1 - changed[0, 0]
+            missing = tag_missing_data_mcmc(dataset, [0])
+            for other_key in [cache.key(changed, '2pl', None, options, {'random_seed': 3}),
+                              cache.key(missing, '2pl', None, options, {'random_seed': 3}),
+                              cache.key(dataset, '1pl', None, options, {'random_seed': 3}),
+                              cache.key(dataset, '2pl', None, dict(options, n_samples=500),
+                                        {'random_seed': 3}),
+                              cache.key(dataset, '2pl', None, options, {'random_seed': 4})]:
+                self.assertNotEqual(key, other_key)
+
+            # Upgrades invalidate the stored fits
+            with mock.patch('girth_mcmc.utils.result_cache._package_versions',
+                            return_value=[('girth_mcmc', '0.0.1'), ('pymc3', '3.0')]):
+                other_key = cache.key(dataset, '2pl', None, options, {'random_seed': 3})
+            self.assertNotEqual(key, other_key)
+
+    def test_cache_eviction(self):
+        """Testing stored fits are read back and evicted by size."""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_size=1)
+            self.assertTupleEqual(cache.get('missing'), (None, None))
+
+            results = {'Difficulty': np.arange(5.), 'Difficulty Sigma': 1.2}
+            draws = {'Ability': np.random.default_rng(5).random((750, 100))}
+            cache.put('first', results, draws)
+
+            cached_results, cached_draws = cache.get('first')
+            np.testing.assert_equal(cached_results, results)
+            np.testing.assert_equal(cached_draws, draws)
+
+            # A second fit pushes the least recently used fit out
+            os.utime(os.path.join(directory, 'first.pkl'), (0, 0))
+            cache.put('second', results, draws)
+
+            self.assertTupleEqual(cache.get('first'), (None, None))
+            self.assertIsNotNone(cache.get('second')[0])
+
 
 class TestDiscriminationIndices(unittest.TestCase):
     """Testing the discrimination indices."""